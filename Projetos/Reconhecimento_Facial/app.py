@@ -5,24 +5,60 @@ import os
 import json
 import numpy as np
 from datetime import datetime
-import glob
-import pickle
 from tqdm import tqdm
 import threading
 import time
 import base64
-from scipy.spatial.distance import cosine
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-# Importações para o tratamento de imagens
+from armazenamento_embeddings import ArmazenamentoEmbeddings
+from backends_facenet import CAMINHO_FACENET_ONNX, carregar_facenet, verificar_backend
+from cache_tratamento import CacheTratamento, hash_arquivo
+from captura_camera import CapturaCamera
+from canal_streaming import SessaoStreaming, separar_frame
+from detector_faces import CAMINHO_MODELO, CAMINHO_PROTOTXT, PoolDetectores, detectar_em_lote
+from extrator_embeddings import gerar_embeddings_lote
+from fila_tratamento import ESTADOS_FINAIS, EXECUTANDO, FilaTratamento, JobCancelado
+from galeria import calcular_prototipos, criar_galeria
+from indice_fotos import IndiceFotos
+from metricas import Metricas
+from micro_lotes import AgrupadorLotes
+from miniaturas import CacheMiniaturas
+from rastreador_faces import GerenciadorRastreadores, RastreadorFaces
+from qualidade_faces import alinhar_face, selecionar_melhores
+from trabalhador_tratamento import avaliar_recortes, detectar_e_recortar, gerar_embeddings_caminhos, inicializar_trabalhador
+from transmissao_mjpeg import TransmissorMJPEG
+
+# Com o método spawn, cada processo do tratamento reexecuta este arquivo
+# como __mp_main__ antes de receber trabalho. As funções enviadas aos pools
+# vêm de trabalhador_tratamento, então lá basta que as definições existam:
+# câmera, banco, fila, caches e extensões do Flask só são criados no
+# processo do servidor
+processo_servidor = __name__ != '__mp_main__'
+
+# Importações para o tratamento de imagens: o DeepFace (e o TensorFlow) só é
+# importado ao carregar o FaceNet, e nem isso com os backends ONNX
+deepface_disponivel = importlib.util.find_spec('deepface') is not None
+if not deepface_disponivel and processo_servidor:
+    print("DeepFace não encontrado. Instale com: pip install deepface")
+
+# Canal WebSocket para o reconhecimento em streaming
 try:
-    from deepface import DeepFace
-    deepface_disponivel = True
+    from flask_sock import Sock
+    from simple_websocket import ConnectionClosed
+    sock_disponivel = True
 except ImportError:
-    deepface_disponivel = False
-    print("DeepFace não encontrado. Instale com: pip install deepface")
+    sock_disponivel = False
+    if processo_servidor:
+        print("flask-sock não encontrado. Instale com: pip install flask-sock")
 
+# Nos processos do tratamento o app só recebe as rotas: nunca é servido
 app = Flask(__name__)
-CORS(app)
+if processo_servidor:
+    CORS(app)
+sock = Sock(app) if sock_disponivel and processo_servidor else None
 
 # Configurações globais para captura
 captura_config = {
@@ -39,7 +75,8 @@ tratamento_config = {
     'total_imagens': 0,
     'imagens_processadas': 0,
     'status_message': 'Pronto para processar',
-    'detector_carregado': False
+    'detector_carregado': False,
+    'processos_embeddings': 2  # Processos com FaceNet no tratamento: cada um carrega o seu modelo
 }
 
 # Configurações globais para reconhecimento
@@ -47,59 +84,122 @@ reconhecimento_config = {
     'modelo_carregado': False,
     'embeddings_carregados': False,
     'total_pessoas': 0,
+    'tipo_galeria': 'auto',  # 'exato', 'ivf', 'prototipos' ou 'auto' (IVF para galerias grandes)
+    'prototipos_por_pessoa': 3,  # Galeria 'prototipos': centróides (ou a média) de cada pessoa
+    'pessoas_candidatas': 3,  # Galeria 'prototipos': pessoas refinadas com a busca exata
+    'precisao_galeria': 'float32',  # 'float32', 'float16' ou 'int8' (verificar com verificar_quantizacao.py)
+    'backend_facenet': 'deepface',  # 'deepface', 'opencv' ou 'onnxruntime' (grafo em CAMINHO_FACENET_ONNX)
+    'lote_max': 8,  # Frames de requisições simultâneas processados juntos
+    'espera_lote_ms': 5,  # Tempo máximo que um frame espera por outros para formar o lote
+    'intervalo_embedding': 10,  # Frames em que a identidade de uma face rastreada é reaproveitada
+    'versao_galeria': None,  # Versão do banco de embeddings carregada neste processo
+    'galeria_desatualizada': False,  # Embeddings de outro pré-processamento: refazer o tratamento completo
     'status_message': 'Sistema não inicializado'
 }
 
 # Variáveis globais
-camera = None
-detector = None
+pool_detectores = None
 model_facenet = None
+observador_galeria = None
 known_embeddings = []
 known_names = []
+galeria = None
+agrupador_reconhecimento = None
+pool_processos = None
+pool_embeddings = None
+
+# Latências por etapa e contadores do reconhecimento, publicados em /metrics
+metricas = Metricas('reconhecimento')
+metricas.descrever('estagio_segundos', 'summary', 'Duração de cada etapa do reconhecimento (etapas de lote valem para o lote inteiro)')
+metricas.descrever('faces_por_frame', 'summary', 'Faces detectadas por frame')
+metricas.descrever('frames_por_lote', 'summary', 'Frames processados juntos em um micro-lote')
+metricas.descrever('frames_total', 'counter', 'Frames reconhecidos')
+metricas.descrever('faces_total', 'counter', 'Faces detectadas')
+metricas.descrever('faces_rastreadas_total', 'counter', 'Faces com identidade reaproveitada do rastreador (sem FaceNet)')
+metricas.descrever('erros_total', 'counter', 'Falhas por etapa')
+metricas.descrever('galeria_embeddings', 'gauge', 'Embeddings ativos na galeria carregada')
+metricas.descrever('galeria_pessoas', 'gauge', 'Pessoas na galeria carregada')
+
+# Pastas de data/ geradas pelo sistema (não são pessoas cadastradas)
+PASTAS_INTERNAS = {'faces_recortadas', 'embeddings_db', 'miniaturas'}
+
+# Recursos do servidor (None nos processos do tratamento)
+camera = transmissor_video = armazenamento = cache_tratamento = None
+fila_tratamento = rastreadores = indice_fotos = cache_miniaturas = None
+if processo_servidor:
+    camera = CapturaCamera(0, largura=640, altura=480, fps=30)
+    # Um único encode JPEG por frame, compartilhado por todos os clientes do /video_feed
+    transmissor_video = TransmissorMJPEG(camera, lambda frame: desenhar_info_captura(frame))
+    armazenamento = ArmazenamentoEmbeddings('data/embeddings_db')
+    cache_tratamento = CacheTratamento('data/cache_tratamento.sqlite')
+    # Jobs de tratamento: sobrevivem a reinícios pelo journal em disco. Com
+    # vários processos servindo o app, todos enfileiram e consultam pelo mesmo
+    # journal, mas só um deles (o que tem a trava do executor) roda os jobs
+    fila_tratamento = FilaTratamento('data/jobs_tratamento.jsonl', lambda job: executar_tratamento(job))
+    rastreadores = GerenciadorRastreadores(intervalo_embedding=reconhecimento_config['intervalo_embedding'])
+    # Pessoas e fotos de data/ em memória, relistadas só quando a pasta muda
+    indice_fotos = IndiceFotos('data', PASTAS_INTERNAS)
+    # Miniaturas da galeria (/foto/...?tamanho=) geradas sob demanda
+    cache_miniaturas = CacheMiniaturas('data/miniaturas')
+
+# Imagens por forward do detector durante o tratamento
+TAMANHO_LOTE_DETECCAO = 8
+
+# Recortes por bloco de embeddings enviado a um processo do tratamento
+TAMANHO_LOTE_EMBEDDINGS = 32
+
+# Processos do tratamento: detecção e qualidade usam todos os núcleos. Os
+# embeddings têm um pool próprio e pequeno (tratamento_config['processos_embeddings']),
+# porque cada processo carrega um FaceNet inteiro (com o DeepFace, um TensorFlow)
+PROCESSOS_TRATAMENTO = os.cpu_count() or 1
+
+# Versões que entram na chave do cache: mudar o modelo ou o critério invalida o cache
+VERSAO_DETECTOR = 'res10_300x300_ssd_iter_140000/confianca_0.8/alinhado_olhos'
+VERSAO_EMBEDDING = 'Facenet/lote_v1'
+# Embeddings do embeddings.pickle antigo: DeepFace.represent em cada recorte,
+# sem o pré-processamento em lote nem o alinhamento pelos olhos das consultas
+VERSAO_EMBEDDING_PICKLE = 'Facenet/deepface_represent_v0'
+VERSAO_QUALIDADE = 'nitidez_tamanho_pose_v1'
+
+# Galeria: recortes abaixo da pontuação mínima (0 a 1) ficam de fora e cada
+# pessoa guarda no máximo os MAX_EMBEDDINGS_POR_PESSOA melhores
+QUALIDADE_MINIMA = 0.35
+MAX_EMBEDDINGS_POR_PESSOA = 20
+
+# Segundos entre duas consultas à versão do banco de embeddings: com vários
+# processos servindo o app, cada um recarrega a galeria quando outro a altera
+INTERVALO_VERIFICACAO_GALERIA = 1.0
 
 # Lock para thread safety
 detector_lock = threading.Lock()
-camera_lock = threading.Lock()
+galeria_lock = threading.Lock()  # Uma recarga da galeria por vez
+fotos_lock = threading.Lock()  # Numeração das fotos capturadas
 
 def inicializar_camera():
-    """Inicializa a câmera se não estiver ativa"""
-    global camera
-    with camera_lock:
-        if camera is None or not camera.isOpened():
-            camera = cv2.VideoCapture(0)
-            # Configurações para melhorar performance
-            camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            camera.set(cv2.CAP_PROP_FPS, 30)
-            camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Reduz buffer para menor latência
-        return camera is not None and camera.isOpened()
+    """Inicializa a câmera e a thread de captura se não estiverem ativas"""
+    return camera.iniciar()
 
 def liberar_camera():
-    """Libera a câmera"""
-    global camera
-    with camera_lock:
-        if camera is not None:
-            camera.release()
-            camera = None
+    """Para a thread de captura e libera a câmera"""
+    camera.parar()
     cv2.destroyAllWindows()
 
 def carregar_detector_facial():
     """Carrega o detector facial do OpenCV"""
-    global detector, tratamento_config
+    global pool_detectores, tratamento_config
     
-    if detector is not None:
+    if pool_detectores is not None:
         return True
     
     try:
-        caminho_prototxt = 'deploy.prototxt'
-        caminho_modelo = 'res10_300x300_ssd_iter_140000.caffemodel'
-        
-        if not os.path.exists(caminho_prototxt) or not os.path.exists(caminho_modelo):
+        if not os.path.exists(CAMINHO_PROTOTXT) or not os.path.exists(CAMINHO_MODELO):
             tratamento_config['status_message'] = 'Arquivos do detector facial não encontrados'
             return False
         
         with detector_lock:
-            detector = cv2.dnn.readNetFromCaffe(caminho_prototxt, caminho_modelo)
+            if pool_detectores is None:
+                # Uma instância por núcleo para as requisições detectarem em paralelo
+                pool_detectores = PoolDetectores()
         
         tratamento_config['detector_carregado'] = True
         return True
@@ -108,60 +208,131 @@ def carregar_detector_facial():
         return False
 
 def carregar_modelo_facenet():
-    """Carrega o modelo FaceNet"""
+    """Carrega o modelo FaceNet no backend de reconhecimento_config['backend_facenet']"""
     global model_facenet, reconhecimento_config
     
-    if not deepface_disponivel:
-        reconhecimento_config['status_message'] = 'DeepFace não disponível'
+    backend = reconhecimento_config['backend_facenet']
+    problema = verificar_backend(backend, CAMINHO_FACENET_ONNX)
+    if problema:
+        reconhecimento_config['status_message'] = problema
         return False
     
     try:
         if model_facenet is None:
-            print("Carregando modelo FaceNet...")
-            model_facenet = DeepFace.build_model('Facenet')
+            print(f"Carregando modelo FaceNet ({backend})...")
+            inicio = time.perf_counter()
+            model_facenet = carregar_facenet(backend, CAMINHO_FACENET_ONNX)
             reconhecimento_config['modelo_carregado'] = True
-            print("Modelo FaceNet carregado com sucesso!")
+            print(f"Modelo FaceNet carregado com sucesso em {time.perf_counter() - inicio:.1f}s!")
         return True
     except Exception as e:
         print(f"Erro ao carregar FaceNet: {e}")
         reconhecimento_config['status_message'] = f'Erro ao carregar FaceNet: {str(e)}'
         return False
 
-def carregar_embeddings():
-    """Carrega os embeddings do banco de dados"""
-    global known_embeddings, known_names, reconhecimento_config
-    
-    caminho_embeddings = 'data/embeddings.pickle'
+def preparar_armazenamento():
+    """Migra o embeddings.pickle antigo para o banco incremental, se necessário"""
+    caminho_pickle = 'data/embeddings.pickle'
     
-    if not os.path.exists(caminho_embeddings):
-        reconhecimento_config['status_message'] = 'Arquivo de embeddings não encontrado'
-        return False
+    if not armazenamento.existe() and os.path.exists(caminho_pickle):
+        print("Migrando embeddings.pickle para o banco incremental...")
+        armazenamento.importar_pickle(caminho_pickle, VERSAO_EMBEDDING_PICKLE)
     
+    return armazenamento.existe()
+
+def carregar_embeddings():
+    """Carrega os embeddings do banco de dados"""
     try:
-        print("Carregando banco de dados de embeddings...")
-        with open(caminho_embeddings, 'rb') as f:
-            database = pickle.load(f)
-        
-        known_embeddings = database['embeddings']
-        known_names = database['names']
-        
-        # Contar pessoas únicas
-        pessoas_unicas = list(set(known_names))
-        reconhecimento_config['total_pessoas'] = len(pessoas_unicas)
-        reconhecimento_config['embeddings_carregados'] = True
-        reconhecimento_config['status_message'] = f'Embeddings carregados: {len(known_embeddings)} faces de {len(pessoas_unicas)} pessoas'
-        
-        print(f"Embeddings carregados: {len(known_embeddings)} faces de {len(pessoas_unicas)} pessoas")
-        return True
-        
+        with galeria_lock:
+            return montar_galeria()
     except Exception as e:
         print(f"Erro ao carregar embeddings: {e}")
         reconhecimento_config['status_message'] = f'Erro ao carregar embeddings: {str(e)}'
         return False
 
+def montar_galeria():
+    """Lê o banco de embeddings e troca a galeria em uso (chamada com galeria_lock)"""
+    global known_embeddings, known_names, galeria
+    
+    if not preparar_armazenamento():
+        reconhecimento_config['status_message'] = 'Arquivo de embeddings não encontrado'
+        return False
+    
+    # Versão lida antes dos dados: uma escrita no meio da carga gera outra recarga
+    versao = armazenamento.versao()
+    
+    print("Carregando banco de dados de embeddings...")
+    # A matriz vem como memmap: nenhuma cópia da galeria é feita aqui, e os
+    # processos que mapeiam o mesmo arquivo compartilham as mesmas páginas
+    matriz, nomes, ativos = armazenamento.carregar()
+        
+    known_embeddings = matriz
+    known_names = nomes
+    galeria = criar_galeria(matriz, nomes, reconhecimento_config['tipo_galeria'], ativos,
+                            reconhecimento_config['precisao_galeria'], **opcoes_galeria())
+    
+    # Contar pessoas únicas
+    total_embeddings = int(ativos.sum())
+    pessoas_unicas = list({nome for nome, ativo in zip(nomes, ativos) if ativo})
+    reconhecimento_config['total_pessoas'] = len(pessoas_unicas)
+    reconhecimento_config['embeddings_carregados'] = True
+    reconhecimento_config['versao_galeria'] = versao
+    reconhecimento_config['status_message'] = f'Embeddings carregados: {total_embeddings} faces de {len(pessoas_unicas)} pessoas'
+    
+    print(f"Embeddings carregados: {total_embeddings} faces de {len(pessoas_unicas)} pessoas")
+    
+    # Galeria de outro pré-processamento (ex.: migrada do pickle): as distâncias
+    # para as consultas atuais mudam, então ela só serve até o próximo tratamento
+    versao_embedding = armazenamento.versao_embedding()
+    desatualizada = versao_embedding is not None and versao_embedding != VERSAO_EMBEDDING
+    reconhecimento_config['galeria_desatualizada'] = desatualizada
+    if desatualizada:
+        aviso = (f'Embeddings gerados com outro pré-processamento ({versao_embedding}): '
+                 f'execute o tratamento de todas as pessoas')
+        print(f"AVISO: {aviso}")
+        reconhecimento_config['status_message'] += f' — {aviso}'
+    return True
+
+def observar_galeria():
+    """Recarrega a galeria quando o banco de embeddings muda (inclusive por outro processo)"""
+    while True:
+        time.sleep(INTERVALO_VERIFICACAO_GALERIA)
+        versao = armazenamento.versao()
+        if versao is not None and versao != reconhecimento_config['versao_galeria']:
+            print(f"Banco de embeddings alterado (versão {versao}): recarregando a galeria")
+            carregar_embeddings()
+
+def iniciar_observador_galeria():
+    """Inicia a thread que acompanha a versão do banco (uma por processo)"""
+    global observador_galeria
+    if observador_galeria is None:
+        observador_galeria = threading.Thread(target=observar_galeria, daemon=True)
+        observador_galeria.start()
+
+def opcoes_galeria():
+    """Parâmetros extras da galeria configurada em reconhecimento_config"""
+    if reconhecimento_config['tipo_galeria'] != 'prototipos':
+        return {}
+    
+    opcoes = {'max_prototipos': reconhecimento_config['prototipos_por_pessoa'],
+              'n_candidatos': reconhecimento_config['pessoas_candidatas']}
+    # Protótipos salvos pelo tratamento; se o banco mudou depois, são recalculados na galeria
+    salvos = armazenamento.carregar_prototipos()
+    if salvos is not None:
+        opcoes['prototipos'], opcoes['nomes_prototipos'] = salvos
+    return opcoes
+
+def atualizar_prototipos():
+    """Recalcula e salva os protótipos por pessoa a partir do banco de embeddings"""
+    matriz, nomes, ativos = armazenamento.carregar()
+    prototipos, nomes_prototipos = calcular_prototipos(matriz, nomes, ativos,
+                                                       reconhecimento_config['prototipos_por_pessoa'])
+    armazenamento.salvar_prototipos(prototipos, nomes_prototipos)
+    return len(nomes_prototipos)
+
 def inicializar_sistema_reconhecimento():
     """Inicializa todos os componentes necessários para reconhecimento"""
-    global reconhecimento_config
+    global reconhecimento_config, agrupador_reconhecimento
     
     reconhecimento_config['status_message'] = 'Inicializando sistema de reconhecimento...'
     
@@ -176,19 +347,76 @@ def inicializar_sistema_reconhecimento():
     # Carregar embeddings
     if not carregar_embeddings():
         return False
+    iniciar_observador_galeria()
+    
+    # Agrupador de requisições simultâneas em micro-lotes: um lote em
+    # execução por instância do pool de detectores
+    if agrupador_reconhecimento is None:
+        agrupador_reconhecimento = AgrupadorLotes(
+            reconhecer_lote,
+            tamanho_max=reconhecimento_config['lote_max'],
+            espera_max=reconhecimento_config['espera_lote_ms'] / 1000,
+            num_trabalhadores=pool_detectores.tamanho
+        )
     
     reconhecimento_config['status_message'] = 'Sistema de reconhecimento pronto!'
     return True
 
-def processar_deteccao_facial(pessoa_especifica=None):
+def obter_pool_processos():
+    """Pool de processos da detecção e da qualidade no tratamento, criado no primeiro job"""
+    global pool_processos
+    
+    if pool_processos is None:
+        pool_processos = ProcessPoolExecutor(
+            max_workers=PROCESSOS_TRATAMENTO,
+            # spawn: o TensorFlow já carregado neste processo não suporta fork
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=inicializar_trabalhador,
+            initargs=(cache_tratamento.caminho, 1, reconhecimento_config['backend_facenet'], CAMINHO_FACENET_ONNX)
+        )
+    return pool_processos
+
+def obter_pool_embeddings():
+    """Pool de processos do FaceNet no tratamento, criado no primeiro bloco de embeddings
+    
+    Poucos processos, cada um com threads de inferência suficientes para
+    ocupar os núcleos: a memória cresce com o número de modelos carregados.
+    """
+    global pool_embeddings
+    
+    if pool_embeddings is None:
+        processos = max(1, min(tratamento_config['processos_embeddings'], PROCESSOS_TRATAMENTO))
+        pool_embeddings = ProcessPoolExecutor(
+            max_workers=processos,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=inicializar_trabalhador,
+            initargs=(cache_tratamento.caminho, max(1, PROCESSOS_TRATAMENTO // processos),
+                      reconhecimento_config['backend_facenet'], CAMINHO_FACENET_ONNX)
+        )
+    return pool_embeddings
+
+def relatar_tratamento(job_id, **campos):
+    """Atualiza o andamento do job (journal) e o resumo em tratamento_config"""
+    tratamento_config.update(campos)
+    if job_id is not None:
+        fila_tratamento.atualizar(job_id, **campos)
+
+def verificar_cancelamento(job_id):
+    """Interrompe o job entre dois blocos se ele foi cancelado"""
+    if job_id is not None and fila_tratamento.cancelado(job_id):
+        raise JobCancelado()
+
+def processar_deteccao_facial(pessoa_especifica=None, job_id=None):
     """Processa imagens para detectar e recortar faces
     
+    As imagens são divididas em blocos de TAMANHO_LOTE_DETECCAO e cada bloco
+    é detectado e recortado por um processo do pool de tratamento.
+    
     Args:
         pessoa_especifica (str, optional): Nome da pessoa específica para processar.
                                          Se None, processa todas as pessoas.
+        job_id (str, optional): Job da fila de tratamento que recebe o andamento.
     """
-    global detector, tratamento_config
-    
     caminho_dados_originais = 'data/'
     caminho_faces_recortadas = 'data/faces_recortadas/'
     
@@ -203,219 +431,400 @@ def processar_deteccao_facial(pessoa_especifica=None):
     if pessoa_especifica:
         pessoas_para_processar = [pessoa_especifica] if pessoa_especifica in os.listdir(caminho_dados_originais) else []
         if not pessoas_para_processar:
-            tratamento_config['status_message'] = f'Pessoa "{pessoa_especifica}" não encontrada'
+            relatar_tratamento(job_id, status_message=f'Pessoa "{pessoa_especifica}" não encontrada')
             return 0, 0
     else:
         pessoas_para_processar = [nome for nome in os.listdir(caminho_dados_originais) 
                                 if os.path.isdir(os.path.join(caminho_dados_originais, nome)) 
-                                and nome != 'faces_recortadas']
+                                and nome not in PASTAS_INTERNAS]
     
-    # Contar total de imagens
-    total_imagens = 0
+    # Listar imagens (origem, recorte de saída)
+    itens = []
     for nome_pessoa in pessoas_para_processar:
         caminho_pessoa = os.path.join(caminho_dados_originais, nome_pessoa)
         for nome_arquivo in os.listdir(caminho_pessoa):
             if nome_arquivo.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')):
-                total_imagens += 1
+                itens.append((os.path.join(caminho_pessoa, nome_arquivo),
+                              os.path.join(caminho_faces_recortadas, f"{nome_pessoa}_{nome_arquivo}")))
     
+    total_imagens = len(itens)
     if total_imagens == 0:
-        tratamento_config['status_message'] = 'Nenhuma imagem encontrada para processar'
+        relatar_tratamento(job_id, status_message='Nenhuma imagem encontrada para processar')
         return 0, 0
     
-    tratamento_config['total_imagens'] = total_imagens
-    tratamento_config['imagens_processadas'] = 0
+    relatar_tratamento(job_id, total_imagens=total_imagens, imagens_processadas=0, total_salvas=0)
     
-    # Processar cada pessoa
-    for nome_pessoa in pessoas_para_processar:
-        caminho_pessoa = os.path.join(caminho_dados_originais, nome_pessoa)
-        
-        tratamento_config['status_message'] = f'Processando imagens de: {nome_pessoa}'
-        
-        # Processar cada imagem da pessoa
-        for nome_arquivo in os.listdir(caminho_pessoa):
-            if not nome_arquivo.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')):
-                continue
-                
-            caminho_imagem = os.path.join(caminho_pessoa, nome_arquivo)
-            
-            # Carregar a imagem
-            imagem = cv2.imread(caminho_imagem)
-            if imagem is None:
-                print(f"Erro ao ler: {nome_arquivo}")
-                total_processadas += 1
-                tratamento_config['imagens_processadas'] = total_processadas
-                continue
-            
-            (h, w) = imagem.shape[:2]
-            
-            # Pré-processamento para a rede neural
-            blob = cv2.dnn.blobFromImage(cv2.resize(imagem, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
-            
-            # Detectar faces usando lock para thread safety
-            with detector_lock:
-                detector.setInput(blob)
-                deteccoes = detector.forward()
-            
-            # Encontrar a melhor detecção
-            if len(deteccoes[0, 0]) > 0:
-                best_detection_index = np.argmax(deteccoes[0, 0, :, 2])
-                confianca = deteccoes[0, 0, best_detection_index, 2]
-                
-                if confianca > 0.8:  # 80% de confiança
-                    # Calcular coordenadas da caixa delimitadora
-                    box = deteccoes[0, 0, best_detection_index, 3:7] * np.array([w, h, w, h])
-                    (startX, startY, endX, endY) = box.astype("int")
-                    
-                    # Garantir que está dentro dos limites
-                    startX = max(0, startX)
-                    startY = max(0, startY)
-                    endX = min(w, endX)
-                    endY = min(h, endY)
-                    
-                    # Recortar o rosto
-                    rosto = imagem[startY:endY, startX:endX]
-                    
-                    if rosto.size != 0:
-                        # Salvar o rosto recortado
-                        nome_saida = f"{nome_pessoa}_{nome_arquivo}"
-                        caminho_saida = os.path.join(caminho_faces_recortadas, nome_saida)
-                        cv2.imwrite(caminho_saida, rosto)
-                        total_salvas += 1
+    # Cada bloco vai para um processo; o cache evita refazer imagens inalteradas
+    pool = obter_pool_processos()
+    futuros = [pool.submit(detectar_e_recortar, itens[i:i + TAMANHO_LOTE_DETECCAO], VERSAO_DETECTOR)
+               for i in range(0, total_imagens, TAMANHO_LOTE_DETECCAO)]
+    try:
+        for futuro in as_completed(futuros):
+            processadas, salvas = futuro.result()
+            total_processadas += processadas
+            total_salvas += salvas
             
-            total_processadas += 1
-            tratamento_config['imagens_processadas'] = total_processadas
-            tratamento_config['progresso'] = int((total_processadas / total_imagens) * 50)  # 50% para detecção
+            relatar_tratamento(
+                job_id,
+                imagens_processadas=total_processadas,
+                total_salvas=total_salvas,
+                progresso=int((total_processadas / total_imagens) * 50),  # 50% para detecção
+                status_message=f'Detectando faces: {total_processadas}/{total_imagens} imagens'
+            )
+            verificar_cancelamento(job_id)
+    finally:
+        # Cancelamento ou erro: blocos que ainda não começaram são descartados
+        for futuro in futuros:
+            futuro.cancel()
+        indice_fotos.invalidar('faces_recortadas')
     
     return total_processadas, total_salvas
 
-def gerar_embeddings(pessoa_especifica=None):
+def gerar_embeddings(pessoa_especifica=None, job_id=None):
     """Gera embeddings das faces recortadas
     
+    Antes do FaceNet os recortes são pontuados (nitidez, tamanho e pose) e
+    só os MAX_EMBEDDINGS_POR_PESSOA melhores de cada pessoa acima de
+    QUALIDADE_MINIMA seguem adiante. Os recortes escolhidos sem embedding no
+    cache são divididos em blocos de TAMANHO_LOTE_EMBEDDINGS e processados
+    pelo FaceNet dos processos do pool de embeddings. A gravação no cache e
+    no banco fica neste processo.
+    
     Args:
         pessoa_especifica (str, optional): Nome da pessoa específica para processar.
                                          Se None, processa todas as faces.
+        job_id (str, optional): Job da fila de tratamento que recebe o andamento.
     """
-    global tratamento_config
-    
-    if not deepface_disponivel:
-        tratamento_config['status_message'] = 'DeepFace não disponível'
-        return False
-    
-    if not carregar_modelo_facenet():
-        tratamento_config['status_message'] = 'Erro ao carregar modelo FaceNet'
+    problema = verificar_backend(reconhecimento_config['backend_facenet'], CAMINHO_FACENET_ONNX)
+    if problema:
+        relatar_tratamento(job_id, status_message=problema)
         return False
     
     caminho_faces_recortadas = 'data/faces_recortadas/'
     
     if not os.path.exists(caminho_faces_recortadas):
-        tratamento_config['status_message'] = 'Pasta de faces recortadas não encontrada'
+        relatar_tratamento(job_id, status_message='Pasta de faces recortadas não encontrada')
         return False
     
-    # Carregar embeddings existentes se houver
-    caminho_embeddings = 'data/embeddings.pickle'
-    known_embeddings = []
-    known_names = []
-    
-    if os.path.exists(caminho_embeddings):
-        try:
-            with open(caminho_embeddings, 'rb') as f:
-                dados_existentes = pickle.load(f)
-                known_embeddings = dados_existentes['embeddings'].tolist()
-                known_names = dados_existentes['names']
-        except Exception as e:
-            print(f"Erro ao carregar embeddings existentes: {e}")
-    
     # Filtrar arquivos de faces para processar
     if pessoa_especifica:
         arquivos_faces = [f for f in os.listdir(caminho_faces_recortadas) 
                          if f.startswith(f"{pessoa_especifica}_") and f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp'))]
-        
-        # Remover embeddings existentes desta pessoa
-        indices_para_remover = [i for i, nome in enumerate(known_names) if nome == pessoa_especifica]
-        for i in reversed(indices_para_remover):  # Remove de trás para frente
-            del known_embeddings[i]
-            del known_names[i]
     else:
         arquivos_faces = [f for f in os.listdir(caminho_faces_recortadas) 
                          if f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp'))]
-        # Se processando tudo, limpa embeddings existentes
-        known_embeddings = []
-        known_names = []
     
-    total_faces = len(arquivos_faces)
-    if total_faces == 0:
-        tratamento_config['status_message'] = f'Nenhuma face encontrada para processar{" para " + pessoa_especifica if pessoa_especifica else ""}'
+    if not arquivos_faces:
+        relatar_tratamento(job_id, status_message=f'Nenhuma face encontrada para processar{" para " + pessoa_especifica if pessoa_especifica else ""}')
         return False
     
-    tratamento_config['status_message'] = f'Gerando embeddings{" para " + pessoa_especifica if pessoa_especifica else ""}...'
+    caminhos_faces = [os.path.join(caminho_faces_recortadas, nome_arquivo) for nome_arquivo in arquivos_faces]
     
-    for i, nome_arquivo in enumerate(arquivos_faces):
-        nome_pessoa = nome_arquivo.split('_')[0]
-        caminho_rosto = os.path.join(caminho_faces_recortadas, nome_arquivo)
-        
+    # Recortes inalterados reaproveitam a pontuação e o embedding do cache
+    hashes_faces = {}
+    for caminho_rosto in caminhos_faces:
         try:
-            embedding_obj = DeepFace.represent(
-                img_path=caminho_rosto,
-                model_name='Facenet',
-                enforce_detection=False
-            )
-            embedding = embedding_obj[0]['embedding']
+            hashes_faces[caminho_rosto] = hash_arquivo(caminho_rosto)
+        except OSError:
+            pass
+    
+    relatar_tratamento(job_id, status_message=f'Avaliando a qualidade de {len(caminhos_faces)} faces...')
+    caminhos_faces = selecionar_recortes(caminhos_faces, hashes_faces, job_id)
+    total_faces = len(caminhos_faces)
+    descartadas = len(arquivos_faces) - total_faces
+    
+    relatar_tratamento(job_id, faces_descartadas=descartadas,
+                       status_message=f'Gerando embeddings{" para " + pessoa_especifica if pessoa_especifica else ""}...')
+    
+    em_cache = cache_tratamento.buscar_embeddings(hashes_faces.values(), VERSAO_EMBEDDING)
+    pendentes = [c for c in caminhos_faces if hashes_faces.get(c) not in em_cache]
+    
+    embeddings_por_caminho = {c: em_cache[hashes_faces[c]] for c in caminhos_faces if c not in pendentes}
+    faces_processadas = len(embeddings_por_caminho)
+    relatar_tratamento(job_id, progresso=50 + int((faces_processadas / total_faces) * 50))
+    
+    # Só as faces novas vão para o FaceNet, um bloco por processo
+    pool = obter_pool_embeddings()
+    futuros = [pool.submit(gerar_embeddings_caminhos, pendentes[i:i + TAMANHO_LOTE_EMBEDDINGS])
+               for i in range(0, len(pendentes), TAMANHO_LOTE_EMBEDDINGS)]
+    try:
+        for futuro in as_completed(futuros):
+            lote = futuro.result()
+            novos_no_cache = []
+            for caminho_rosto, embedding in lote:
+                if embedding is None:
+                    print(f"Erro ao processar {os.path.basename(caminho_rosto)}: imagem não pôde ser lida")
+                    continue
+                
+                embeddings_por_caminho[caminho_rosto] = embedding
+                if caminho_rosto in hashes_faces:
+                    novos_no_cache.append((hashes_faces[caminho_rosto], embedding))
             
-            known_embeddings.append(embedding)
-            known_names.append(nome_pessoa)
+            cache_tratamento.salvar_embeddings(novos_no_cache, VERSAO_EMBEDDING)
             
-        except Exception as e:
-            print(f"Erro ao processar {nome_arquivo}: {e}")
-        
-        # Atualizar progresso (50% para detecção + 50% para embeddings)
-        progresso_embeddings = int(((i + 1) / total_faces) * 50)
-        tratamento_config['progresso'] = 50 + progresso_embeddings
-    
-    # Salvar banco de dados de embeddings atualizado
-    if known_embeddings:
-        dados_embeddings = {
-            "embeddings": np.array(known_embeddings), 
-            "names": known_names
-        }
-        with open(caminho_embeddings, 'wb') as f:
-            pickle.dump(dados_embeddings, f)
-        
-        tratamento_config['status_message'] = f'Processamento concluído! {len(known_embeddings)} embeddings salvos'
-        return True
-    else:
-        tratamento_config['status_message'] = 'Nenhum embedding foi gerado'
+            # Atualizar progresso (50% para detecção + 50% para embeddings)
+            faces_processadas += len(lote)
+            relatar_tratamento(job_id, progresso=50 + int((faces_processadas / total_faces) * 50))
+            verificar_cancelamento(job_id)
+    finally:
+        for futuro in futuros:
+            futuro.cancel()
+    
+    novos_embeddings = []
+    novos_nomes = []
+    novos_arquivos = []
+    for caminho_rosto in caminhos_faces:
+        if caminho_rosto in embeddings_por_caminho:
+            nome_arquivo = os.path.basename(caminho_rosto)
+            novos_embeddings.append(embeddings_por_caminho[caminho_rosto])
+            novos_nomes.append(nome_arquivo.split('_')[0])
+            novos_arquivos.append(nome_arquivo)
+    
+    if not novos_embeddings:
+        relatar_tratamento(job_id, status_message='Nenhum embedding foi gerado')
         return False
+    
+    # Salvar no banco de embeddings: só as linhas da pessoa são escritas
+    if pessoa_especifica:
+        preparar_armazenamento()
+        armazenamento.remover_pessoa(pessoa_especifica)
+        armazenamento.adicionar(np.array(novos_embeddings), novos_nomes, novos_arquivos, VERSAO_EMBEDDING)
+        if armazenamento.precisa_compactar():
+            armazenamento.compactar()
+    else:
+        # Reprocessamento completo: recria o banco do zero
+        armazenamento.substituir(np.array(novos_embeddings), novos_nomes, novos_arquivos, VERSAO_EMBEDDING)
+    
+    # Protótipos da galeria compacta, prontos para o próximo carregamento
+    atualizar_prototipos()
+    
+    relatar_tratamento(job_id, status_message=f'Processamento concluído! {len(novos_embeddings)} embeddings salvos '
+                                              f'({descartadas} faces descartadas pela qualidade)')
+    return True
+
+def selecionar_recortes(caminhos_faces, hashes_faces, job_id=None):
+    """Pontua os recortes e escolhe os que entram na galeria
+    
+    As pontuações ficam no cache pelo hash do recorte; só os recortes novos
+    são avaliados, em blocos distribuídos pelo pool de tratamento.
+    
+    Returns:
+        list: Caminhos escolhidos, na ordem original.
+    """
+    pontuacoes = cache_tratamento.buscar_qualidades(hashes_faces.values(), VERSAO_QUALIDADE)
+    pontuacao_por_caminho = {c: pontuacoes[hashes_faces[c]] for c in caminhos_faces
+                             if hashes_faces.get(c) in pontuacoes}
+    pendentes = [c for c in caminhos_faces if c not in pontuacao_por_caminho]
+    
+    pool = obter_pool_processos()
+    futuros = [pool.submit(avaliar_recortes, pendentes[i:i + TAMANHO_LOTE_EMBEDDINGS])
+               for i in range(0, len(pendentes), TAMANHO_LOTE_EMBEDDINGS)]
+    try:
+        for futuro in as_completed(futuros):
+            novas_no_cache = []
+            for caminho_rosto, pontuacao in futuro.result():
+                if pontuacao is None:
+                    continue
+                pontuacao_por_caminho[caminho_rosto] = pontuacao
+                if caminho_rosto in hashes_faces:
+                    novas_no_cache.append((hashes_faces[caminho_rosto], pontuacao))
+            cache_tratamento.salvar_qualidades(novas_no_cache, VERSAO_QUALIDADE)
+            verificar_cancelamento(job_id)
+    finally:
+        for futuro in futuros:
+            futuro.cancel()
+    
+    selecionados = selecionar_melhores(
+        [(c, os.path.basename(c).split('_')[0], pontuacao) for c, pontuacao in pontuacao_por_caminho.items()],
+        MAX_EMBEDDINGS_POR_PESSOA, QUALIDADE_MINIMA)
+    return [c for c in caminhos_faces if c in selecionados]
+
+def executar_tratamento(job):
+    """Executa um job da fila de tratamento: detecção e recorte, depois embeddings"""
+    job_id = job['id']
+    pessoa_especifica = job['parametros'].get('pessoa_especifica')
+    sufixo = f' para {pessoa_especifica}' if pessoa_especifica else ''
+    
+    relatar_tratamento(job_id, progresso=0, total_imagens=0, imagens_processadas=0,
+                       status_message=f'Iniciando processamento{sufixo}...')
+    
+    # Fase 1: Detecção e recorte de faces
+    relatar_tratamento(job_id, status_message=f'Detectando e recortando faces{" de " + pessoa_especifica if pessoa_especifica else ""}...')
+    total_processadas, total_salvas = processar_deteccao_facial(pessoa_especifica, job_id)
+    verificar_cancelamento(job_id)
+    
+    # Fase 2: Geração de embeddings
+    relatar_tratamento(job_id, status_message=f'Gerando embeddings{sufixo}...')
+    if not gerar_embeddings(pessoa_especifica, job_id):
+        raise RuntimeError(tratamento_config['status_message'])
+    
+    return f'Processamento concluído! {total_salvas} faces detectadas e processadas{sufixo}'
+
+def desenhar_info_captura(frame):
+    """Adiciona texto informativo no frame"""
+    texto = f"Fotos: {captura_config['fotos_capturadas']}/{captura_config['num_fotos']}"
+    cv2.putText(frame, texto, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
 
 def gerar_frames():
     """Gera frames da câmera para streaming"""
-    global camera, captura_config
-    
     if not inicializar_camera():
         return
     
-    while captura_config['capturando']:
-        with camera_lock:
-            if camera is not None and camera.isOpened():
-                ret, frame = camera.read()
-            else:
-                break
-        
-        if not ret:
-            break
-        
-        # Adiciona texto informativo no frame
-        texto = f"Fotos: {captura_config['fotos_capturadas']}/{captura_config['num_fotos']}"
-        cv2.putText(frame, texto, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        
-        # Converte para JPEG
-        ret, buffer = cv2.imencode('.jpg', frame)
-        if ret:
-            frame_bytes = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        
-        # Pequeno delay para não sobrecarregar
-        time.sleep(0.033)  # ~30 FPS
+    # O frame é codificado uma vez pelo transmissor; um cliente lento pula frames
+    yield from transmissor_video.inscrever(lambda: captura_config['capturando'])
+
+def extrair_faces(img, detections):
+    """Seleciona as detecções válidas de um frame
+    
+    Returns:
+        tuple: (faces, results) — recortes das faces e os resultados
+               parciais (confiança e caixa) na mesma ordem.
+    """
+    (h, w) = img.shape[:2]
+    results = []
+    faces = []
+
+    for i in range(0, detections.shape[2]):
+        confidence = detections[0, 0, i, 2]
+
+        if confidence > 0.7:  # Limiar de confiança para detecção
+            box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
+            (startX, startY, endX, endY) = box.astype("int")
+            
+            # Garantir que está dentro dos limites
+            startX = max(0, startX)
+            startY = max(0, startY)
+            endX = min(w, endX)
+            endY = min(h, endY)
+            
+            # Verificar se a região da face é válida
+            if (endX - startX) < 20 or (endY - startY) < 20:
+                continue
+            
+            face = img[startY:endY, startX:endX]
+            
+            if face.size == 0:
+                continue
+
+            faces.append(face)
+            results.append({
+                "confidence": float(confidence),
+                "box": [int(startX), int(startY), int(endX), int(endY)]
+            })
+
+    return faces, results
+
+def identificar_face(galeria_atual, best_match_index, min_distance):
+    """Converte o vizinho mais próximo da galeria em nome e nível de confiança"""
+    # Determinar o nome baseado na distância com limiar mais rigoroso
+    similarity_score = 1 - min_distance
+    
+    # Limiares ajustados para melhor precisão
+    if min_distance < 0.4:  # Limiar mais rigoroso (era 0.5)
+        name = galeria_atual.nome(best_match_index)
+        confidence_level = "Alta"
+    elif min_distance < 0.6:  # Zona de incerteza
+        name = galeria_atual.nome(best_match_index)
+        confidence_level = "Média"
+    else:
+        name = "Desconhecido"
+        confidence_level = "Baixa"
+        similarity_score = 0.0
+    
+    return {
+        "name": name,
+        "similarity": float(similarity_score),
+        "confidence_level": confidence_level,
+        "min_distance": float(min_distance)
+    }
+
+def reconhecer_lote(itens):
+    """Detecta e reconhece as faces de vários frames de uma vez
+    
+    Um forward do detector para todos os frames, um forward do FaceNet para
+    todas as faces encontradas e uma busca na galeria para todos os embeddings.
+    Faces já rastreadas na sessão do cliente reaproveitam a identidade da
+    trilha e ficam fora do FaceNet.
+    
+    Args:
+        itens (list): Pares (imagem, rastreador) — rastreador pode ser None.
+    
+    Returns:
+        list: Para cada frame, a lista de resultados no formato do /reconhecer_faces.
+    """
+    imagens = [img for img, _ in itens]
+    metricas.observar('frames_por_lote', len(imagens))
+
+    # Detectar faces com uma instância exclusiva do pool de detectores
+    with metricas.cronometrar('deteccao'), pool_detectores.usar() as detector:
+        deteccoes_lote = detectar_em_lote(detector, imagens)
+
+    resultados = []
+    recortes = []  # (imagem, caixa) das faces que vão para o FaceNet
+    posicoes = []  # (frame, índice no resultado do frame) de cada face
+    trilhas = []  # (rastreador, trilha_id) de cada face em todas_faces
+
+    for (img, rastreador), detections in zip(itens, deteccoes_lote):
+        faces, results = extrair_faces(img, detections)
+        metricas.observar('faces_por_frame', len(faces))
+        metricas.incrementar('frames_total')
+        metricas.incrementar('faces_total', len(faces))
+
+        if rastreador is None:
+            associacoes = [(None, None)] * len(faces)
+        else:
+            associacoes = rastreador.associar([r["box"] for r in results])
+
+        for j, (trilha_id, identidade) in enumerate(associacoes):
+            if trilha_id is not None:
+                results[j]["track_id"] = trilha_id
+            if identidade is not None:
+                # Mesma face de frames anteriores: identidade em cache
+                results[j].update(identidade)
+                metricas.incrementar('faces_rastreadas_total')
+                continue
+            posicoes.append((len(resultados), j))
+            recortes.append((img, results[j]["box"]))
+            trilhas.append((rastreador, trilha_id))
+
+        resultados.append(results)
+
+    if not recortes:
+        return resultados
+
+    # Mesmo alinhamento pelos olhos dos recortes da galeria
+    with metricas.cronometrar('alinhamento'):
+        todas_faces = [alinhar_face(img, box)[0] for img, box in recortes]
+
+    try:
+        # Gerar os embeddings de todas as faces em um único forward
+        with metricas.cronometrar('embedding'):
+            embeddings = gerar_embeddings_lote(model_facenet, todas_faces)
+    except Exception as e:
+        metricas.incrementar('erros_total', estagio='embedding')
+        # Em caso de erro no reconhecimento, ainda retorna as detecções
+        for i, j in posicoes:
+            resultados[i][j].update({
+                "name": "Erro no reconhecimento",
+                "similarity": 0.0,
+                "confidence_level": "Erro",
+                "min_distance": 1.0
+            })
+        return resultados
+
+    # Comparar todas as faces com a galeria de uma só vez
+    # (referência local: /recarregar_embeddings pode trocar a galeria no meio do lote)
+    galeria_atual = galeria
+    with metricas.cronometrar('busca'):
+        indices, distancias = galeria_atual.buscar(embeddings)
+    for (i, j), (rastreador, trilha_id), best_match_index, min_distance in zip(
+            posicoes, trilhas, indices[:, 0], distancias[:, 0]):
+        identidade = identificar_face(galeria_atual, best_match_index, min_distance)
+        resultados[i][j].update(identidade)
+        if rastreador is not None:
+            rastreador.atualizar_identidade(trilha_id, resultados[i][j]["box"], identidade)
+
+    return resultados
 
 # ================= ROTAS PRINCIPAIS =================
 @app.route('/')
@@ -452,6 +861,7 @@ def iniciar_captura():
     caminho_pessoa = os.path.join('data', nome_pessoa)
     if not os.path.exists(caminho_pessoa):
         os.makedirs(caminho_pessoa)
+        indice_fotos.invalidar(nome_pessoa)
     
     # Configura a captura
     captura_config.update({
@@ -477,28 +887,30 @@ def parar_captura():
 @app.route('/capturar_foto', methods=['POST'])
 def capturar_foto():
     """Captura uma foto"""
-    global camera, captura_config
+    global captura_config
     
     if not captura_config['capturando']:
         return jsonify({'status': 'error', 'message': 'Captura não está ativa'})
     
-    with camera_lock:
-        if camera is None or not camera.isOpened():
-            return jsonify({'status': 'error', 'message': 'Câmera não disponível'})
-        
-        if captura_config['fotos_capturadas'] >= captura_config['num_fotos']:
-            return jsonify({'status': 'error', 'message': 'Número máximo de fotos atingido'})
-        
-        ret, frame = camera.read()
+    if not camera.ativa:
+        return jsonify({'status': 'error', 'message': 'Câmera não disponível'})
     
-    if ret:
-        # Salva a foto
-        nome_pessoa = captura_config['nome_pessoa']
-        caminho_pessoa = os.path.join('data', nome_pessoa)
-        nome_arquivo = os.path.join(caminho_pessoa, f"{captura_config['fotos_capturadas'] + 1}.jpg")
-        
-        cv2.imwrite(nome_arquivo, frame)
-        captura_config['fotos_capturadas'] += 1
+    # Último frame da thread de captura: não disputa a câmera com o stream
+    _, frame = camera.ultimo_frame()
+    
+    if frame is not None:
+        with fotos_lock:
+            if captura_config['fotos_capturadas'] >= captura_config['num_fotos']:
+                return jsonify({'status': 'error', 'message': 'Número máximo de fotos atingido'})
+            
+            # Salva a foto
+            nome_pessoa = captura_config['nome_pessoa']
+            caminho_pessoa = os.path.join('data', nome_pessoa)
+            nome_arquivo = os.path.join(caminho_pessoa, f"{captura_config['fotos_capturadas'] + 1}.jpg")
+            
+            cv2.imwrite(nome_arquivo, frame)
+            captura_config['fotos_capturadas'] += 1
+            indice_fotos.invalidar(nome_pessoa)
         
         # Se atingiu o número máximo, para a captura
         if captura_config['fotos_capturadas'] >= captura_config['num_fotos']:
@@ -527,17 +939,13 @@ def video_feed():
 @app.route('/status_captura')
 def status_captura():
     """Retorna o status atual da captura"""
-    return jsonify(captura_config)
+    # Qualidade JPEG, escala e FPS escolhidos pelo ajuste adaptativo do stream
+    return jsonify({**captura_config, 'transmissao': transmissor_video.estado()})
 
 # ================= ROTAS DE TRATAMENTO =================
 @app.route('/iniciar_tratamento', methods=['POST'])
 def iniciar_tratamento():
-    """Inicia o processamento de tratamento de imagens"""
-    global tratamento_config
-    
-    if tratamento_config['processando']:
-        return jsonify({'status': 'error', 'message': 'Tratamento já em andamento'})
-    
+    """Coloca um job de tratamento de imagens na fila"""
     # Pegar dados da requisição
     dados = request.get_json() if request.is_json else {}
     pessoa_especifica = dados.get('pessoa_especifica', None)  # None = processar todas
@@ -553,107 +961,89 @@ def iniciar_tratamento():
         if not os.path.exists(caminho_pessoa):
             return jsonify({'status': 'error', 'message': f'Pessoa "{pessoa_especifica}" não encontrada'})
     
-    # Contar imagens disponíveis
-    total_imagens = 0
-    pessoas_para_processar = [pessoa_especifica] if pessoa_especifica else [
-        nome for nome in os.listdir(caminho_dados) 
-        if os.path.isdir(os.path.join(caminho_dados, nome)) and nome != 'faces_recortadas'
-    ]
-    
-    for nome_pessoa in pessoas_para_processar:
-        caminho_pessoa = os.path.join(caminho_dados, nome_pessoa)
-        if os.path.isdir(caminho_pessoa):
-            for arquivo in os.listdir(caminho_pessoa):
-                if arquivo.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')):
-                    total_imagens += 1
+    # Contar imagens disponíveis (índice em memória)
+    if pessoa_especifica:
+        total_imagens = len(indice_fotos.fotos(pessoa_especifica) or [])
+    else:
+        total_imagens = sum(total_fotos for _, total_fotos in indice_fotos.pessoas())
     
     if total_imagens == 0:
         return jsonify({'status': 'error', 'message': f'Nenhuma imagem encontrada para processar{" para " + pessoa_especifica if pessoa_especifica else ""}'})
     
-    # Carregar detector facial
+    # Carregar detector facial (valida os arquivos do modelo antes de enfileirar)
     if not carregar_detector_facial():
         return jsonify({'status': 'error', 'message': tratamento_config['status_message']})
     
-    # Verificar se DeepFace está disponível
-    if not deepface_disponivel:
-        return jsonify({'status': 'error', 'message': 'DeepFace não está instalado'})
+    # Verificar se o backend do FaceNet está disponível
+    problema = verificar_backend(reconhecimento_config['backend_facenet'], CAMINHO_FACENET_ONNX)
+    if problema:
+        return jsonify({'status': 'error', 'message': problema})
     
-    # Iniciar processamento em thread separada para não bloquear
-    def processar_em_thread():
-        global tratamento_config
-        
-        try:
-            # Iniciar processamento
-            tratamento_config.update({
-                'processando': True,
-                'progresso': 0,
-                'total_imagens': total_imagens,
-                'imagens_processadas': 0,
-                'status_message': f'Iniciando processamento{" para " + pessoa_especifica if pessoa_especifica else ""}...'
-            })
-            
-            # Fase 1: Detecção e recorte de faces
-            tratamento_config['status_message'] = f'Detectando e recortando faces{" de " + pessoa_especifica if pessoa_especifica else ""}...'
-            total_processadas, total_salvas = processar_deteccao_facial(pessoa_especifica)
-            
-            # Fase 2: Geração de embeddings
-            tratamento_config['status_message'] = f'Gerando embeddings{" para " + pessoa_especifica if pessoa_especifica else ""}...'
-            success = gerar_embeddings(pessoa_especifica)
-            
-            if success:
-                tratamento_config.update({
-                    'processando': False,
-                    'progresso': 100,
-                    'status_message': f'Processamento concluído! {total_salvas} faces detectadas e processadas{" para " + pessoa_especifica if pessoa_especifica else ""}'
-                })
-            else:
-                tratamento_config.update({
-                    'processando': False,
-                    'status_message': 'Erro na geração de embeddings'
-                })
-                
-        except Exception as e:
-            tratamento_config.update({
-                'processando': False,
-                'status_message': f'Erro durante processamento: {str(e)}'
-            })
-    
-    # Iniciar thread de processamento
-    thread_processamento = threading.Thread(target=processar_em_thread)
-    thread_processamento.daemon = True
-    thread_processamento.start()
+    # O job roda nos processos do tratamento; o andamento fica no journal
+    job_id = fila_tratamento.enfileirar({'pessoa_especifica': pessoa_especifica})
+    na_frente = len(fila_tratamento.ativos()) - 1
     
-    return jsonify({'status': 'success', 'message': 'Processamento iniciado'})
+    return jsonify({
+        'status': 'success',
+        'message': 'Processamento iniciado' if na_frente == 0 else f'Processamento na fila ({na_frente} job(s) antes)',
+        'job_id': job_id
+    })
 
 @app.route('/status_tratamento')
 def status_tratamento():
-    """Retorna o status atual do tratamento"""
+    """Retorna o status atual do tratamento (job em execução ou o mais recente)"""
+    fila_tratamento.iniciar()
+    
     # Adicionar informações sobre faces detectadas e embeddings
     status_completo = tratamento_config.copy()
     
-    # Verificar se existe arquivo de embeddings para contar
-    caminho_embeddings = 'data/embeddings.pickle'
-    if os.path.exists(caminho_embeddings):
-        try:
-            with open(caminho_embeddings, 'rb') as f:
-                dados_embeddings = pickle.load(f)
-                status_completo['total_embeddings'] = len(dados_embeddings['names'])
-        except:
-            status_completo['total_embeddings'] = 0
-    else:
+    jobs = fila_tratamento.listar()
+    ativos = [job for job in jobs if job['estado'] not in ESTADOS_FINAIS]
+    em_execucao = [job for job in ativos if job['estado'] == EXECUTANDO]
+    job = em_execucao[0] if em_execucao else (ativos[-1] if ativos else (jobs[0] if jobs else None))
+    
+    if job is not None:
+        for campo in ('progresso', 'total_imagens', 'imagens_processadas', 'total_salvas', 'status_message'):
+            if campo in job:
+                status_completo[campo] = job[campo]
+        status_completo['job_id'] = job['id']
+        status_completo['estado'] = job['estado']
+    status_completo['processando'] = bool(ativos)
+    status_completo['jobs_na_fila'] = len(ativos)
+    
+    # Contar embeddings ativos no banco
+    try:
+        status_completo['total_embeddings'] = len(armazenamento.nomes_ativos()) if preparar_armazenamento() else 0
+    except Exception:
         status_completo['total_embeddings'] = 0
     
     return jsonify(status_completo)
 
+@app.route('/status_tratamento/<job_id>')
+def status_job_tratamento(job_id):
+    """Retorna o estado e o progresso de um job de tratamento"""
+    fila_tratamento.iniciar()
+    job = fila_tratamento.obter(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': f'Job "{job_id}" não encontrado'}), 404
+    return jsonify({'status': 'success', 'job': job})
+
+@app.route('/jobs_tratamento')
+def jobs_tratamento():
+    """Lista os jobs de tratamento, do mais recente para o mais antigo"""
+    fila_tratamento.iniciar()
+    return jsonify({'status': 'success', 'jobs': fila_tratamento.listar()})
+
 @app.route('/parar_tratamento', methods=['POST'])
 def parar_tratamento():
-    """Para o processamento de tratamento"""
-    global tratamento_config
-    tratamento_config.update({
-        'processando': False,
-        'status_message': 'Processamento interrompido pelo usuário'
-    })
-    return jsonify({'status': 'success', 'message': 'Tratamento parado'})
+    """Cancela um job de tratamento (job_id) ou todos os pendentes e em execução"""
+    dados = request.get_json(silent=True) or {}
+    job_id = dados.get('job_id')
+    
+    ids = [job_id] if job_id else [job['id'] for job in fila_tratamento.ativos()]
+    cancelados = [i for i in ids if fila_tratamento.cancelar(i)]
+    
+    return jsonify({'status': 'success', 'message': 'Tratamento parado', 'cancelados': cancelados})
 
 # ================= ROTAS DE RECONHECIMENTO =================
 @app.route('/inicializar_reconhecimento', methods=['POST'])
@@ -668,13 +1058,56 @@ def inicializar_reconhecimento():
     else:
         return jsonify({'status': 'error', 'message': reconhecimento_config['status_message']})
 
+def sistema_reconhecimento_pronto():
+    """Indica se modelo, embeddings e agrupador já foram inicializados"""
+    return (reconhecimento_config['modelo_carregado'] and reconhecimento_config['embeddings_carregados']
+            and agrupador_reconhecimento is not None)
+
+def reconhecer_bytes(dados, rastreador=None):
+    """Decodifica os bytes de um JPEG/PNG e reconhece as faces
+    
+    Args:
+        dados: Bytes da imagem.
+        rastreador (RastreadorFaces): Rastreador da sessão do cliente, se houver.
+    
+    Returns:
+        list: Resultados do reconhecimento, ou None se a imagem for inválida.
+    """
+    if not len(dados):
+        return None
+    
+    # np.frombuffer não copia: o imdecode lê direto do buffer recebido
+    with metricas.cronometrar('imdecode'):
+        img = cv2.imdecode(np.frombuffer(dados, np.uint8), cv2.IMREAD_COLOR)
+
+    if img is None:
+        metricas.incrementar('erros_total', estagio='imdecode')
+        return None
+
+    # Detecção, embedding e busca rodam em micro-lote com outras requisições
+    # ('frame' inclui a espera pelo lote; as etapas do lote são medidas à parte)
+    with metricas.cronometrar('frame'):
+        return agrupador_reconhecimento.processar((img, rastreador))
+
+def rastreador_da_requisicao():
+    """Rastreador da sessão HTTP (cabeçalho X-Sessao ou parâmetro ?sessao=)"""
+    sessao_id = request.headers.get('X-Sessao') or request.args.get('sessao')
+    return rastreadores.obter(sessao_id)
+
+def reconhecer_dados_imagem(dados):
+    """Reconhece as faces de um JPEG/PNG e devolve a resposta JSON do reconhecimento"""
+    results = reconhecer_bytes(dados, rastreador_da_requisicao())
+    
+    if results is None:
+        return jsonify({'status': 'error', 'results': []})
+    
+    return jsonify({'status': 'success', 'results': results})
+
 @app.route('/reconhecer_faces', methods=['POST'])
 def reconhecer_faces():
     """Processa uma imagem e reconhece faces"""
-    global known_embeddings, known_names
-    
     # Verificar se o sistema está inicializado
-    if not reconhecimento_config['modelo_carregado'] or not reconhecimento_config['embeddings_carregados']:
+    if not sistema_reconhecimento_pronto():
         return jsonify({'status': 'error', 'message': 'Sistema não inicializado'})
     
     data = request.get_json()
@@ -687,110 +1120,92 @@ def reconhecer_faces():
         if not encoded:
             return jsonify({'status': 'error', 'results': []})
         
-        image_data = base64.b64decode(encoded)
-        nparr = np.frombuffer(image_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-        if img is None:
-            return jsonify({'status': 'error', 'results': []})
-
-        # Detectar faces usando lock para thread safety
-        with detector_lock:
-            (h, w) = img.shape[:2]
-            blob = cv2.dnn.blobFromImage(cv2.resize(img, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
-            detector.setInput(blob)
-            detections = detector.forward()
-
-        results = []
-
-        for i in range(0, detections.shape[2]):
-            confidence = detections[0, 0, i, 2]
-
-            if confidence > 0.7:  # Limiar de confiança para detecção
-                box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-                (startX, startY, endX, endY) = box.astype("int")
-                
-                # Garantir que está dentro dos limites
-                startX = max(0, startX)
-                startY = max(0, startY)
-                endX = min(w, endX)
-                endY = min(h, endY)
-                
-                # Verificar se a região da face é válida
-                if (endX - startX) < 20 or (endY - startY) < 20:
-                    continue
-                
-                face = img[startY:endY, startX:endX]
-                
-                if face.size == 0:
-                    continue
+        with metricas.cronometrar('base64'):
+            dados = base64.b64decode(encoded)
+        return reconhecer_dados_imagem(dados)
+        
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e), 'results': []})
 
-                try:
-                    # Gerar embedding da face detectada
-                    embedding_obj = DeepFace.represent(
-                        img_path=face, 
-                        model_name='Facenet', 
-                        enforce_detection=False,
-                        detector_backend='opencv'
-                    )
-                    embedding = embedding_obj[0]['embedding']
-                    
-                    # Calcular distâncias para todas as faces conhecidas
-                    min_distance = float('inf')
-                    best_match_index = -1
-                    
-                    for j, known_emb in enumerate(known_embeddings):
-                        distance = cosine(embedding, known_emb)
-                        if distance < min_distance:
-                            min_distance = distance
-                            best_match_index = j
-
-                    # Determinar o nome baseado na distância com limiar mais rigoroso
-                    similarity_score = 1 - min_distance
-                    
-                    # Limiares ajustados para melhor precisão
-                    if min_distance < 0.4:  # Limiar mais rigoroso (era 0.5)
-                        name = known_names[best_match_index]
-                        confidence_level = "Alta"
-                    elif min_distance < 0.6:  # Zona de incerteza
-                        name = known_names[best_match_index]
-                        confidence_level = "Média"
-                    else:
-                        name = "Desconhecido"
-                        confidence_level = "Baixa"
-                        similarity_score = 0.0
-                    
-                    results.append({
-                        "name": name,
-                        "confidence": float(confidence),
-                        "similarity": float(similarity_score),
-                        "confidence_level": confidence_level,
-                        "min_distance": float(min_distance),
-                        "box": [int(startX), int(startY), int(endX), int(endY)]
-                    })
-
-                except Exception as e:
-                    # Em caso de erro no reconhecimento, ainda retorna a detecção
-                    results.append({
-                        "name": "Erro no reconhecimento",
-                        "confidence": float(confidence),
-                        "similarity": 0.0,
-                        "confidence_level": "Erro",
-                        "min_distance": 1.0,
-                        "box": [int(startX), int(startY), int(endX), int(endY)]
-                    })
-                    continue
+@app.route('/reconhecer_faces_binario', methods=['POST'])
+def reconhecer_faces_binario():
+    """Reconhece faces de uma imagem enviada em bytes (sem base64)
+    
+    Aceita o JPEG/PNG como corpo da requisição (application/octet-stream,
+    image/jpeg, image/png) ou no campo 'image' de um multipart/form-data.
+    A resposta tem o mesmo formato do /reconhecer_faces. Com o cabeçalho
+    X-Sessao, as faces são rastreadas entre os frames da mesma sessão.
+    """
+    if not sistema_reconhecimento_pronto():
+        return jsonify({'status': 'error', 'message': 'Sistema não inicializado'})
+    
+    try:
+        if request.mimetype == 'multipart/form-data':
+            arquivo = request.files.get('image')
+            dados = arquivo.read() if arquivo else b''
+        else:
+            dados = request.get_data(cache=False)
         
-        return jsonify({'status': 'success', 'results': results})
+        return reconhecer_dados_imagem(dados)
         
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e), 'results': []})
     
+if sock is not None:
+    @sock.route('/ws/reconhecer')
+    def ws_reconhecer(ws):
+        """Canal de streaming: frames binários entram, resultados JSON saem
+        
+        Cada mensagem do cliente é um frame (id uint32 big-endian + JPEG/PNG).
+        Cada resposta traz o frame_id; frames que ficaram para trás enquanto
+        o servidor estava ocupado voltam com status "dropped".
+        """
+        if not sistema_reconhecimento_pronto():
+            ws.send(json.dumps({'status': 'error', 'message': 'Sistema não inicializado'}))
+            return
+        
+        # A conexão é a sessão: o rastreador vive enquanto o socket estiver aberto
+        rastreador = RastreadorFaces(intervalo_embedding=reconhecimento_config['intervalo_embedding'])
+        sessao = SessaoStreaming(lambda dados: reconhecer_bytes(dados, rastreador), ws.send)
+        try:
+            while True:
+                mensagem = ws.receive()
+                if mensagem is None:
+                    break
+                if isinstance(mensagem, str):
+                    continue  # Só frames binários são processados
+                
+                try:
+                    frame_id, dados = separar_frame(mensagem)
+                except ValueError:
+                    continue
+                sessao.receber(frame_id, dados)
+        except ConnectionClosed:
+            pass
+        finally:
+            sessao.encerrar()
+
 @app.route('/status_reconhecimento')
 def status_reconhecimento():
     """Retorna o status do sistema de reconhecimento"""
     return jsonify(reconhecimento_config)
 
+@app.route('/metrics')
+def metrics():
+    """Métricas do reconhecimento no formato de texto do Prometheus"""
+    galeria_atual = galeria
+    if galeria_atual is not None:
+        metricas.definir('galeria_embeddings', len(galeria_atual) - len(galeria_atual.removidos))
+        metricas.definir('galeria_pessoas', reconhecimento_config['total_pessoas'])
+    return Response(metricas.formato_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/status_lotes')
+def status_lotes():
+    """Retorna os tamanhos de lote alcançados pelo agrupador de reconhecimento"""
+    if agrupador_reconhecimento is None:
+        return jsonify({'status': 'error', 'message': 'Sistema não inicializado'})
+    return jsonify({'status': 'success', **agrupador_reconhecimento.metricas()})
+
 @app.route('/recarregar_embeddings', methods=['POST'])
 def recarregar_embeddings():
     """Recarrega os embeddings do banco de dados"""
@@ -812,34 +1227,20 @@ def buscar_fotos():
     if not nome_pessoa:
         return jsonify({'status': 'error', 'message': 'Nome não fornecido'})
     
-    caminho_pessoa = os.path.join('data', nome_pessoa)
+    # Listagem em memória, já ordenada pelo número/nome da foto
+    fotos_pessoa = indice_fotos.fotos(nome_pessoa)
     
-    if not os.path.exists(caminho_pessoa):
+    if fotos_pessoa is None:
         return jsonify({'status': 'error', 'message': 'Pasta não encontrada', 'fotos': []})
     
-    # Busca todas as imagens na pasta
-    extensoes = ['*.jpg', '*.jpeg', '*.png', '*.bmp']
-    fotos = []
-    
-    for extensao in extensoes:
-        padrao = os.path.join(caminho_pessoa, extensao)
-        for caminho_foto in glob.glob(padrao):
-            nome_arquivo = os.path.basename(caminho_foto)
-            data_criacao = os.path.getctime(caminho_foto)
-            data_formatada = datetime.fromtimestamp(data_criacao).strftime('%Y-%m-%d %H:%M:%S')
-            
-            fotos.append({
-                'nome': nome_arquivo,
-                'caminho': caminho_foto,
-                'url': f'/foto/{nome_pessoa}/{nome_arquivo}',
-                'data': data_formatada
-            })
-    
-    # Ordena as fotos pelo nome
-    try:
-        fotos.sort(key=lambda x: int(os.path.splitext(x['nome'])[0]))
-    except ValueError:
-        fotos.sort(key=lambda x: x['nome'])
+    caminho_pessoa = os.path.join('data', nome_pessoa)
+    fotos = [{
+        'nome': nome_arquivo,
+        'caminho': os.path.join(caminho_pessoa, nome_arquivo),
+        'url': f'/foto/{nome_pessoa}/{nome_arquivo}',
+        'miniatura': f'/foto/{nome_pessoa}/{nome_arquivo}?tamanho=256',
+        'data': datetime.fromtimestamp(data_criacao).strftime('%Y-%m-%d %H:%M:%S')
+    } for nome_arquivo, data_criacao in fotos_pessoa]
     
     return jsonify({
         'status': 'success',
@@ -850,35 +1251,32 @@ def buscar_fotos():
 
 @app.route('/foto/<nome_pessoa>/<nome_arquivo>')
 def servir_foto(nome_pessoa, nome_arquivo):
-    """Serve uma foto específica"""
+    """Serve uma foto específica, ou a sua miniatura com ?tamanho=128|256|512
+    
+    Tamanhos fora da lista usam o menor tamanho fixo que os atende. As
+    respostas levam ETag e Last-Modified; uma requisição com If-None-Match
+    ou If-Modified-Since de uma foto inalterada recebe 304 sem corpo.
+    """
     caminho_foto = os.path.join('data', nome_pessoa, nome_arquivo)
     
     if not os.path.exists(caminho_foto):
         return jsonify({'status': 'error', 'message': 'Foto não encontrada'}), 404
     
-    return send_file(caminho_foto, mimetype='image/jpeg')
+    tamanho = request.args.get('tamanho', type=int)
+    if tamanho:
+        caminho_miniatura = cache_miniaturas.obter(caminho_foto, nome_pessoa, nome_arquivo, tamanho)
+        if caminho_miniatura is not None:
+            caminho_foto = caminho_miniatura
+    
+    # max_age=0: o navegador guarda a foto, mas revalida (304) a cada visita
+    return send_file(caminho_foto, mimetype='image/jpeg', conditional=True, etag=True, max_age=0)
 
 @app.route('/listar_pessoas')
 def listar_pessoas():
     """Lista todas as pessoas com fotos no sistema"""
-    caminho_dados = 'data/'
-    pessoas = []
-    
-    if os.path.exists(caminho_dados):
-        for nome_pasta in os.listdir(caminho_dados):
-            caminho_pasta = os.path.join(caminho_dados, nome_pasta)
-            if os.path.isdir(caminho_pasta) and nome_pasta != 'faces_recortadas':
-                # Contar fotos na pasta
-                extensoes = ['*.jpg', '*.jpeg', '*.png', '*.bmp']
-                total_fotos = 0
-                for extensao in extensoes:
-                    total_fotos += len(glob.glob(os.path.join(caminho_pasta, extensao)))
-                
-                if total_fotos > 0:
-                    pessoas.append({
-                        'nome': nome_pasta,
-                        'total_fotos': total_fotos
-                    })
+    # Contagens do índice em memória
+    pessoas = [{'nome': nome_pasta, 'total_fotos': total_fotos}
+               for nome_pasta, total_fotos in indice_fotos.pessoas() if total_fotos > 0]
     
     return jsonify({
         'status': 'success',
@@ -888,30 +1286,22 @@ def listar_pessoas():
 @app.route('/verificar_embeddings')
 def verificar_embeddings():
     """Verifica e retorna informações sobre os embeddings"""
-    caminho_embeddings = 'data/embeddings.pickle'
-    caminho_faces = 'data/faces_recortadas/'
-    
     total_embeddings = 0
-    total_faces = 0
     pessoas_embeddings = {}
     
     # Contar embeddings
-    if os.path.exists(caminho_embeddings):
-        try:
-            with open(caminho_embeddings, 'rb') as f:
-                dados_embeddings = pickle.load(f)
-                total_embeddings = len(dados_embeddings['names'])
-                # Contar por pessoa
-                for nome in dados_embeddings['names']:
-                    pessoas_embeddings[nome] = pessoas_embeddings.get(nome, 0) + 1
-        except:
-            total_embeddings = 0
+    try:
+        if preparar_armazenamento():
+            nomes = armazenamento.nomes_ativos()
+            total_embeddings = len(nomes)
+            # Contar por pessoa
+            for nome in nomes:
+                pessoas_embeddings[nome] = pessoas_embeddings.get(nome, 0) + 1
+    except Exception:
+        total_embeddings = 0
     
     # Contar faces recortadas
-    if os.path.exists(caminho_faces):
-        extensoes = ['*.jpg', '*.jpeg', '*.png', '*.bmp']
-        for extensao in extensoes:
-            total_faces += len(glob.glob(os.path.join(caminho_faces, extensao)))
+    total_faces = indice_fotos.contar('faces_recortadas')
     
     return jsonify({
         'status': 'success',
@@ -937,4 +1327,12 @@ if __name__ == '__main__':
     print("  - Preview: /preview")
     print("========================================")
     
+    # Retoma os jobs de tratamento interrompidos e passa a observar data/
+    # (se o watchdog estiver instalado). Com debug=True o reloader
+    # executa este bloco em dois processos: só o que atende as requisições
+    # (WERKZEUG_RUN_MAIN) inicia a fila.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        fila_tratamento.iniciar()
+        indice_fotos.observar()
+    
     app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
\ No newline at end of file
@@ -0,0 +1,363 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from galeria import normalizar_embeddings
+from trava_arquivo import TravaArquivo
+
+
+class ArmazenamentoEmbeddings:
+    """Banco de embeddings em disco com inclusão e remoção incrementais
+
+    Estrutura do diretório (uma "geração" por compactação):
+        manifesto.json       dimensão, geração, versão do conteúdo e do embedding
+        embeddings_<g>.f32   matriz float32 (normalizada L2) só com acréscimos
+        nomes_<g>.jsonl      uma linha {"nome", "arquivo"} por linha da matriz
+        removidos_<g>.txt    índices de linhas removidas (tombstones)
+        prototipos.npz       protótipos por pessoa da galeria compacta (opcional)
+        escrita.lock         trava das escritas entre processos
+
+    Incluir ou remover uma pessoa escreve apenas as linhas dela. A leitura
+    devolve a matriz como np.memmap, sem copiar a galeria para a memória.
+
+    Vários processos podem abrir o mesmo banco: o memmap do mesmo arquivo
+    usa as mesmas páginas de memória em todos eles. Toda escrita incrementa
+    a versão do manifesto (trocado de forma atômica); um processo que vê
+    uma versão diferente da que tem em cache relê o índice antes de ler ou
+    escrever, e versao() permite descobrir que é hora de recarregar a galeria.
+    As escritas de processos diferentes são serializadas pela trava de
+    escrita.lock, então dois tratamentos simultâneos não intercalam linhas.
+
+    O manifesto também guarda a versão do pré-processamento/modelo que gerou
+    os embeddings (versao_embedding): ela é definida na criação e em
+    substituir(), e acréscimos não a mudam — um banco com linhas antigas
+    continua marcado com a versão antiga até ser recriado por completo.
+    """
+
+    def __init__(self, diretorio='data/embeddings_db'):
+        self.diretorio = diretorio
+        self.lock = threading.RLock()
+        self._trava_arquivo = TravaArquivo(os.path.join(diretorio, 'escrita.lock'))
+        self._profundidade_trava = 0
+        self._manifesto = None
+        self._nomes = None
+        self._arquivos = None
+        self._removidos = None
+        self._tamanho_nomes = 0
+
+    # ---------- caminhos ----------
+    def _caminho(self, prefixo, extensao, geracao=None):
+        if geracao is None:
+            geracao = self._manifesto['geracao']
+        return os.path.join(self.diretorio, f'{prefixo}_{geracao}.{extensao}')
+
+    def _caminho_manifesto(self):
+        return os.path.join(self.diretorio, 'manifesto.json')
+
+    def existe(self):
+        """Indica se o banco já foi criado"""
+        return os.path.exists(self._caminho_manifesto())
+
+    def versao(self):
+        """Versão atual do conteúdo em disco (muda a cada escrita, de qualquer processo)
+
+        Returns:
+            int: Versão, ou None se o banco não existe.
+        """
+        try:
+            return self._ler_manifesto().get('versao', 0)
+        except (OSError, ValueError):
+            return None
+
+    def versao_embedding(self):
+        """Versão do pré-processamento/modelo dos embeddings (None se o banco não existe ou não a registrou)"""
+        try:
+            return self._ler_manifesto().get('versao_embedding')
+        except (OSError, ValueError):
+            return None
+
+    @contextmanager
+    def _trava_escrita(self):
+        """Exclusão mútua das escritas entre threads e entre processos
+
+        Reentrante na mesma thread: compactar() chama substituir() com a
+        trava já obtida.
+        """
+        with self.lock:
+            if self._profundidade_trava == 0:
+                self._trava_arquivo.adquirir()
+            self._profundidade_trava += 1
+            try:
+                yield
+            finally:
+                self._profundidade_trava -= 1
+                if self._profundidade_trava == 0:
+                    self._trava_arquivo.liberar()
+
+    # ---------- leitura ----------
+    def _ler_manifesto(self):
+        with open(self._caminho_manifesto(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _carregar_indice(self):
+        """Lê manifesto, nomes e removidos
+
+        O índice fica em memória enquanto o manifesto em disco não mudar;
+        uma escrita de outro processo faz com que seja relido.
+        """
+        manifesto = self._ler_manifesto()
+        if manifesto == self._manifesto:
+            return
+        self._manifesto = manifesto
+
+        nomes, arquivos, fins = [], [], [0]
+        caminho_nomes = self._caminho('nomes', 'jsonl')
+        if os.path.exists(caminho_nomes):
+            with open(caminho_nomes, 'rb') as f:
+                for linha in f:
+                    try:
+                        if not linha.endswith(b'\n'):
+                            raise ValueError
+                        registro = json.loads(linha.decode('utf-8'))
+                    except ValueError:
+                        break  # Linha incompleta de uma escrita interrompida
+                    nomes.append(registro['nome'])
+                    arquivos.append(registro.get('arquivo'))
+                    fins.append(fins[-1] + len(linha))
+
+        # Uma escrita interrompida pode deixar matriz e nomes de tamanhos diferentes
+        total = min(len(nomes), self._linhas_matriz())
+        self._nomes = nomes[:total]
+        self._arquivos = arquivos[:total]
+        self._tamanho_nomes = fins[total]
+
+        removidos = set()
+        caminho_removidos = self._caminho('removidos', 'txt')
+        if os.path.exists(caminho_removidos):
+            with open(caminho_removidos, 'r', encoding='utf-8') as f:
+                removidos = {int(linha) for linha in f if linha.strip().isdigit()}
+        self._removidos = {i for i in removidos if i < total}
+
+    def _linhas_matriz(self):
+        caminho = self._caminho('embeddings', 'f32')
+        if not os.path.exists(caminho):
+            return 0
+        return os.path.getsize(caminho) // (4 * self._manifesto['dimensao'])
+
+    def carregar(self):
+        """Carrega o banco para busca
+
+        Returns:
+            tuple: (matriz, nomes, ativos) — matriz é um np.memmap somente
+                   leitura (n, d); ativos é a máscara das linhas não removidas.
+        """
+        with self.lock:
+            self._carregar_indice()
+            total = len(self._nomes)
+            dimensao = self._manifesto['dimensao']
+
+            if total == 0:
+                matriz = np.empty((0, dimensao), dtype=np.float32)
+            else:
+                matriz = np.memmap(self._caminho('embeddings', 'f32'), dtype=np.float32,
+                                   mode='r', shape=(total, dimensao))
+
+            ativos = np.ones(total, dtype=bool)
+            ativos[list(self._removidos)] = False
+            return matriz, list(self._nomes), ativos
+
+    def nomes_ativos(self):
+        """Lista de nomes das linhas não removidas (um por embedding)"""
+        with self.lock:
+            self._carregar_indice()
+            return [nome for i, nome in enumerate(self._nomes) if i not in self._removidos]
+
+    # ---------- escrita ----------
+    def criar(self, dimensao, versao_embedding=None):
+        """Cria um banco vazio (geração 0)"""
+        with self._trava_escrita():
+            self._salvar_manifesto({'dimensao': int(dimensao), 'geracao': 0, 'versao': 0,
+                                    'versao_embedding': versao_embedding})
+            self._nomes, self._arquivos, self._removidos = [], [], set()
+            self._tamanho_nomes = 0
+
+    def _salvar_manifesto(self, manifesto):
+        caminho = self._caminho_manifesto()
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f)
+        os.replace(temporario, caminho)
+        self._manifesto = manifesto
+
+    def _incrementar_versao(self):
+        """Publica uma escrita já concluída para os outros processos"""
+        self._salvar_manifesto({**self._manifesto, 'versao': self._manifesto.get('versao', 0) + 1})
+
+    def adicionar(self, embeddings, nomes, arquivos=None, versao_embedding=None):
+        """Acrescenta embeddings ao final do banco (custo proporcional ao que é incluído)
+
+        versao_embedding só é registrada se o banco ainda não existe.
+        """
+        matriz = normalizar_embeddings(embeddings)
+        if len(matriz) == 0:
+            return
+        if arquivos is None:
+            arquivos = [None] * len(nomes)
+
+        with self._trava_escrita():
+            # Conferido com a trava: outro processo pode ter criado o banco agora
+            if not self.existe():
+                self.criar(matriz.shape[1], versao_embedding)
+
+            self._carregar_indice()
+            if matriz.shape[1] != self._manifesto['dimensao']:
+                raise ValueError('Dimensão do embedding diferente da do banco')
+
+            # Matriz primeiro: linhas sem nome são descartadas na leitura.
+            # Escrever a partir da última linha válida sobrescreve restos de
+            # uma escrita interrompida sem precisar truncar (arquivo pode estar mapeado)
+            caminho_matriz = self._caminho('embeddings', 'f32')
+            with open(caminho_matriz, 'r+b' if os.path.exists(caminho_matriz) else 'wb') as f:
+                f.seek(len(self._nomes) * 4 * self._manifesto['dimensao'])
+                f.write(matriz.tobytes())
+
+            caminho_nomes = self._caminho('nomes', 'jsonl')
+            with open(caminho_nomes, 'r+b' if os.path.exists(caminho_nomes) else 'wb') as f:
+                f.seek(self._tamanho_nomes)
+                f.truncate()
+                for nome, arquivo in zip(nomes, arquivos):
+                    linha = (json.dumps({'nome': nome, 'arquivo': arquivo}, ensure_ascii=False) + '\n').encode('utf-8')
+                    f.write(linha)
+                    self._tamanho_nomes += len(linha)
+
+            self._nomes.extend(nomes)
+            self._arquivos.extend(arquivos)
+            self._incrementar_versao()
+
+    def remover_pessoa(self, nome):
+        """Marca como removidos todos os embeddings de uma pessoa
+
+        Returns:
+            int: Quantidade de embeddings removidos.
+        """
+        if not self.existe():
+            return 0
+
+        with self._trava_escrita():
+            self._carregar_indice()
+            indices = [i for i, n in enumerate(self._nomes) if n == nome and i not in self._removidos]
+            if indices:
+                with open(self._caminho('removidos', 'txt'), 'a', encoding='utf-8') as f:
+                    f.write(''.join(f'{i}\n' for i in indices))
+                self._removidos.update(indices)
+                self._incrementar_versao()
+            return len(indices)
+
+    def substituir(self, embeddings, nomes, arquivos=None, versao_embedding=None):
+        """Recria o banco inteiro em uma nova geração (reprocessamento completo)"""
+        matriz = normalizar_embeddings(embeddings)
+        if arquivos is None:
+            arquivos = [None] * len(nomes)
+
+        with self._trava_escrita():
+            geracao_antiga = None
+            versao = 0
+            if self.existe():
+                self._carregar_indice()
+                geracao_antiga = self._manifesto['geracao']
+                versao = self._manifesto.get('versao', 0) + 1
+            geracao = 0 if geracao_antiga is None else geracao_antiga + 1
+
+            with open(self._caminho('embeddings', 'f32', geracao), 'wb') as f:
+                f.write(matriz.tobytes())
+            with open(self._caminho('nomes', 'jsonl', geracao), 'wb') as f:
+                for nome, arquivo in zip(nomes, arquivos):
+                    f.write((json.dumps({'nome': nome, 'arquivo': arquivo}, ensure_ascii=False) + '\n').encode('utf-8'))
+                tamanho_nomes = f.tell()
+
+            # A troca do manifesto é atômica: leitores veem a geração antiga ou a nova
+            self._salvar_manifesto({'dimensao': int(matriz.shape[1]) if matriz.size else 128,
+                                    'geracao': geracao, 'versao': versao,
+                                    'versao_embedding': versao_embedding})
+            self._nomes, self._arquivos, self._removidos = list(nomes), list(arquivos), set()
+            self._tamanho_nomes = tamanho_nomes
+
+            self._apagar_geracoes_antigas()
+
+    def precisa_compactar(self, limite=0.5):
+        """Indica se a fração de linhas removidas passou do limite"""
+        with self.lock:
+            self._carregar_indice()
+            return bool(self._nomes) and len(self._removidos) / len(self._nomes) > limite
+
+    def compactar(self):
+        """Reescreve o banco sem as linhas removidas"""
+        with self._trava_escrita():
+            matriz, nomes, ativos = self.carregar()
+            if ativos.all():
+                return
+            arquivos = [a for a, ativo in zip(self._arquivos, ativos) if ativo]
+            self.substituir(np.asarray(matriz[ativos]), [n for n, ativo in zip(nomes, ativos) if ativo], arquivos,
+                            self._manifesto.get('versao_embedding'))
+
+    def _apagar_geracoes_antigas(self):
+        atual = self._manifesto['geracao']
+        for nome_arquivo in os.listdir(self.diretorio):
+            prefixo, _, resto = nome_arquivo.partition('_')
+            geracao = resto.split('.', 1)[0]
+            if prefixo in ('embeddings', 'nomes', 'removidos') and geracao.isdigit() and int(geracao) != atual:
+                try:
+                    os.remove(os.path.join(self.diretorio, nome_arquivo))
+                except OSError:
+                    # No Windows o arquivo pode continuar mapeado por um leitor; fica para depois
+                    pass
+
+    # ---------- protótipos ----------
+    def _assinatura(self):
+        """Identifica o conteúdo atual do banco (muda a cada inclusão ou remoção)"""
+        return np.array([self._manifesto['geracao'], self._manifesto.get('versao', 0),
+                         len(self._nomes), len(self._removidos)], dtype=np.int64)
+
+    def salvar_prototipos(self, prototipos, nomes_prototipos):
+        """Grava os protótipos por pessoa calculados a partir do conteúdo atual do banco"""
+        with self._trava_escrita():
+            self._carregar_indice()
+            caminho = os.path.join(self.diretorio, 'prototipos.npz')
+            temporario = caminho + '.tmp'
+            with open(temporario, 'wb') as f:
+                np.savez(f, prototipos=np.asarray(prototipos, dtype=np.float32),
+                         nomes=np.array(nomes_prototipos, dtype=str), assinatura=self._assinatura())
+            os.replace(temporario, caminho)
+
+    def carregar_prototipos(self):
+        """Protótipos salvos, se ainda correspondem ao banco
+
+        Returns:
+            tuple: (prototipos, nomes_prototipos) ou None se não existem ou
+                   o banco mudou depois que foram calculados.
+        """
+        caminho = os.path.join(self.diretorio, 'prototipos.npz')
+        with self.lock:
+            self._carregar_indice()
+            if not os.path.exists(caminho):
+                return None
+            with np.load(caminho) as dados:
+                if not np.array_equal(dados['assinatura'], self._assinatura()):
+                    return None
+                return dados['prototipos'], dados['nomes'].tolist()
+
+    def importar_pickle(self, caminho_pickle, versao_embedding=None):
+        """Migra um embeddings.pickle antigo ({'embeddings', 'names'}) para o banco
+
+        Os embeddings são copiados como estão: versao_embedding deve
+        identificar o pré-processamento com que o pickle foi gerado.
+        """
+        import pickle  # Só para a migração: o banco em si não usa pickle
+
+        with open(caminho_pickle, 'rb') as f:
+            dados = pickle.load(f)
+        self.substituir(np.asarray(dados['embeddings'], dtype=np.float32), list(dados['names']),
+                        versao_embedding=versao_embedding)
@@ -0,0 +1,115 @@
+"""Backends de inferência do FaceNet
+
+'deepface' monta o modelo Keras pelo DeepFace (TensorFlow). 'opencv' e
+'onnxruntime' executam o mesmo grafo convertido para ONNX (ver
+converter_facenet_onnx.py) sem carregar o TensorFlow, o que reduz o tempo
+de inicialização e a memória do processo.
+
+Todos expõem a interface usada por extrator_embeddings: input_shape e
+predict_on_batch(lote), com o lote NHWC em float32 produzido por
+preprocessar_face — o pré-processamento é o mesmo em qualquer backend.
+"""
+import importlib.util
+import os
+import threading
+
+import cv2
+import numpy as np
+
+# ONNX Runtime (opcional): costuma ser mais rápido que o cv2.dnn na CPU
+try:
+    import onnxruntime
+    onnxruntime_disponivel = True
+except ImportError:
+    onnxruntime_disponivel = False
+    print("onnxruntime não encontrado (opcional). Instale com: pip install onnxruntime")
+
+BACKENDS_FACENET = ('deepface', 'opencv', 'onnxruntime')
+CAMINHO_FACENET_ONNX = 'facenet.onnx'
+
+# Entrada do grafo convertido: (lote, altura, largura, canais), como no Keras
+FORMATO_ENTRADA = (None, 160, 160, 3)
+
+
+class FaceNetOpenCV:
+    """FaceNet em ONNX executado pelo cv2.dnn
+
+    Um cv2.dnn.Net não pode ser usado por duas threads ao mesmo tempo; o
+    lock serializa os forwards (no app eles já vêm do agrupador de lotes).
+    """
+
+    input_shape = FORMATO_ENTRADA
+
+    def __init__(self, caminho_onnx=CAMINHO_FACENET_ONNX, threads=None):
+        if threads:
+            cv2.setNumThreads(threads)
+        self.net = cv2.dnn.readNetFromONNX(caminho_onnx)
+        self._lock = threading.Lock()
+
+    def predict_on_batch(self, lote):
+        with self._lock:
+            self.net.setInput(np.ascontiguousarray(lote, dtype=np.float32))
+            return self.net.forward()
+
+
+class FaceNetOnnxRuntime:
+    """FaceNet em ONNX executado pelo ONNX Runtime na CPU"""
+
+    input_shape = FORMATO_ENTRADA
+
+    def __init__(self, caminho_onnx=CAMINHO_FACENET_ONNX, threads=None):
+        opcoes = onnxruntime.SessionOptions()
+        if threads:
+            opcoes.intra_op_num_threads = threads
+            opcoes.inter_op_num_threads = 1
+        self.sessao = onnxruntime.InferenceSession(caminho_onnx, opcoes, providers=['CPUExecutionProvider'])
+        self.nome_entrada = self.sessao.get_inputs()[0].name
+
+    def predict_on_batch(self, lote):
+        return self.sessao.run(None, {self.nome_entrada: np.ascontiguousarray(lote, dtype=np.float32)})[0]
+
+
+def verificar_backend(backend, caminho_onnx=CAMINHO_FACENET_ONNX):
+    """Confere se o backend pode ser carregado, sem carregá-lo
+
+    Returns:
+        str: Mensagem do problema, ou None se o backend está disponível.
+    """
+    if backend == 'deepface':
+        if importlib.util.find_spec('deepface') is None:
+            return 'DeepFace não está instalado'
+        return None
+    if backend not in BACKENDS_FACENET:
+        return f'Backend do FaceNet desconhecido: {backend}'
+    if backend == 'onnxruntime' and not onnxruntime_disponivel:
+        return 'onnxruntime não está instalado (pip install onnxruntime)'
+    if not os.path.exists(caminho_onnx):
+        return f'Modelo {caminho_onnx} não encontrado (gere com converter_facenet_onnx.py)'
+    return None
+
+
+def carregar_facenet(backend='deepface', caminho_onnx=CAMINHO_FACENET_ONNX, threads=None):
+    """Carrega o FaceNet no backend escolhido
+
+    Args:
+        backend (str): 'deepface', 'opencv' ou 'onnxruntime'.
+        caminho_onnx (str): Grafo convertido, usado pelos backends ONNX.
+        threads (int, optional): Limite de threads de inferência.
+    """
+    if backend == 'opencv':
+        return FaceNetOpenCV(caminho_onnx, threads)
+    if backend == 'onnxruntime':
+        return FaceNetOnnxRuntime(caminho_onnx, threads)
+    if backend != 'deepface':
+        raise ValueError(f'Backend do FaceNet desconhecido: {backend}')
+
+    if threads:
+        try:
+            import tensorflow as tf
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+        except Exception:
+            pass  # TensorFlow já inicializado ou ausente: mantém o padrão
+
+    from deepface import DeepFace
+    return DeepFace.build_model('Facenet')
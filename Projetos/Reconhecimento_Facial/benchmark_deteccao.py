@@ -0,0 +1,66 @@
+"""Benchmark da detecção facial SSD em lote (CPU)
+
+Mede imagens por segundo do detector res10 com lotes de 1, 8 e 32 imagens
+montados por cv2.dnn.blobFromImages.
+
+Uso:
+    python benchmark_deteccao.py
+    python benchmark_deteccao.py --imagens data/Rick --lotes 1 8 32
+"""
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from detector_faces import carregar_rede_detector, detectar_em_lote
+
+
+def carregar_imagens(diretorio, quantidade):
+    """Lê imagens de um diretório ou gera frames sintéticos 640x480"""
+    imagens = []
+    if diretorio:
+        for extensao in ('*.jpg', '*.jpeg', '*.png', '*.bmp'):
+            for caminho in glob.glob(os.path.join(diretorio, '**', extensao), recursive=True):
+                imagem = cv2.imread(caminho)
+                if imagem is not None:
+                    imagens.append(imagem)
+
+    if not imagens:
+        rng = np.random.default_rng(0)
+        imagens = [rng.integers(0, 256, (480, 640, 3), dtype=np.uint8) for _ in range(quantidade)]
+
+    # Repete as imagens até ter a quantidade pedida
+    return [imagens[i % len(imagens)] for i in range(quantidade)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da detecção facial em lote')
+    parser.add_argument('--imagens', default=None, help='Diretório com imagens (padrão: frames sintéticos)')
+    parser.add_argument('--quantidade', type=int, default=256, help='Imagens processadas por tamanho de lote')
+    parser.add_argument('--lotes', type=int, nargs='+', default=[1, 8, 32])
+    args = parser.parse_args()
+
+    net = carregar_rede_detector()
+    net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+    net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    imagens = carregar_imagens(args.imagens, args.quantidade)
+
+    # Aquecimento: primeira execução aloca as camadas
+    detectar_em_lote(net, imagens[:max(args.lotes)])
+
+    print(f"{'lote':>6} {'imagens/s':>10} {'ms/imagem':>10}")
+    for tamanho_lote in args.lotes:
+        inicio = time.perf_counter()
+        for i in range(0, len(imagens), tamanho_lote):
+            detectar_em_lote(net, imagens[i:i + tamanho_lote])
+        duracao = time.perf_counter() - inicio
+
+        print(f"{tamanho_lote:>6} {len(imagens) / duracao:>10.1f} {duracao * 1000 / len(imagens):>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
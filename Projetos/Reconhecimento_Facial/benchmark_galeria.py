@@ -0,0 +1,183 @@
+"""Micro-benchmark da busca na galeria de embeddings
+
+Compara o laço original do reconhecer_faces (scipy cosine contra cada
+embedding conhecido) com a GaleriaFaces (um produto de matrizes por frame).
+Com --ivf, mede recall e latência do índice aproximado GaleriaIVF contra a
+busca exata, variando o número de células sondadas. Com --prototipos, mede
+acerto e latência da GaleriaPrototipos (protótipos por pessoa + refinamento)
+variando o número de pessoas candidatas.
+
+Uso:
+    python benchmark_galeria.py
+    python benchmark_galeria.py --tamanhos 1000 10000 100000 --faces 4
+    python benchmark_galeria.py --ivf --tamanhos 100000 300000
+    python benchmark_galeria.py --prototipos --fotos-por-pessoa 20 --ruido 0.6
+"""
+import argparse
+import time
+
+import numpy as np
+from scipy.spatial.distance import cosine
+
+from galeria import GaleriaFaces, GaleriaIVF, GaleriaPrototipos
+
+DIMENSAO = 128  # Tamanho do embedding do FaceNet
+
+
+def buscar_laco(consultas, known_embeddings):
+    """Reproduz a busca original: uma chamada de cosine por embedding conhecido"""
+    resultados = []
+    for embedding in consultas:
+        min_distance = float('inf')
+        best_match_index = -1
+        for j, known_emb in enumerate(known_embeddings):
+            distance = cosine(embedding, known_emb)
+            if distance < min_distance:
+                min_distance = distance
+                best_match_index = j
+        resultados.append((best_match_index, min_distance))
+    return resultados
+
+
+def gerar_galeria_sintetica(rng, tamanho, fotos_por_pessoa=10, ruido=0.35):
+    """Gera embeddings agrupados por pessoa, como acontece com faces reais
+
+    Returns:
+        tuple: (embeddings, centros, pessoas) — pessoas é o índice do centro de cada embedding.
+    """
+    n_pessoas = max(1, tamanho // fotos_por_pessoa)
+    centros = rng.standard_normal((n_pessoas, DIMENSAO))
+    pessoas = rng.integers(n_pessoas, size=tamanho)
+    embeddings = centros[pessoas] + ruido * rng.standard_normal((tamanho, DIMENSAO))
+    return embeddings, centros, pessoas
+
+
+def medir(funcao, repeticoes):
+    """Retorna o tempo médio (ms) de uma chamada"""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) * 1000 / repeticoes
+
+
+def comparar_ivf(args, rng):
+    """Tabela de recall@1 e latência do IVF para diferentes números de sondas"""
+    print(f"{'galeria':>10} {'sondas':>7} {'recall@1':>9} {'exato (ms)':>11} {'ivf (ms)':>9}")
+    for tamanho in args.tamanhos:
+        embeddings, centros, _ = gerar_galeria_sintetica(rng, tamanho)
+        nomes = [f'emb{i}' for i in range(tamanho)]
+
+        # Consultas: novas fotos de pessoas cadastradas
+        pessoas = rng.integers(len(centros), size=args.consultas)
+        consultas = centros[pessoas] + 0.35 * rng.standard_normal((args.consultas, DIMENSAO))
+
+        exata = GaleriaFaces(embeddings, nomes)
+        esperado, _ = exata.buscar(consultas)
+        tempo_exato = medir(lambda: exata.buscar(consultas[:args.faces]), args.repeticoes)
+
+        inicio = time.perf_counter()
+        ivf = GaleriaIVF(embeddings, nomes)
+        tempo_construcao = time.perf_counter() - inicio
+        print(f"{'':>10} índice IVF com {ivf.n_listas} listas construído em {tempo_construcao:.1f}s")
+
+        for n_sondas in args.sondas:
+            ivf.n_sondas = min(n_sondas, ivf.n_listas)
+            obtido, _ = ivf.buscar(consultas)
+            recall = np.mean(obtido[:, 0] == esperado[:, 0])
+            tempo_ivf = medir(lambda: ivf.buscar(consultas[:args.faces]), args.repeticoes)
+            print(f"{tamanho:>10} {ivf.n_sondas:>7} {recall:>9.3f} {tempo_exato:>11.3f} {tempo_ivf:>9.3f}")
+
+
+def decidir(galeria, indices, distancias, limiar=0.6):
+    """Nome decidido para cada consulta, com o mesmo limiar do app ('Desconhecido' acima dele)"""
+    return [galeria.nome(i) if d < limiar else 'Desconhecido'
+            for i, d in zip(indices[:, 0], distancias[:, 0])]
+
+
+def comparar_prototipos(args, rng):
+    """Tabela de acerto e latência da galeria de protótipos contra a busca exata"""
+    print(f"{'galeria':>10} {'pessoas':>8} {'candidatas':>11} {'acerto':>7} {'= exato':>8} "
+          f"{'exato (ms)':>11} {'protót. (ms)':>13}")
+    for tamanho in args.tamanhos:
+        embeddings, centros, pessoas = gerar_galeria_sintetica(rng, tamanho, args.fotos_por_pessoa, args.ruido)
+        nomes = [f'pessoa{p}' for p in pessoas]
+
+        # Metade das consultas são pessoas cadastradas, metade desconhecidas
+        n_conhecidas = args.consultas // 2
+        alvos = rng.integers(len(centros), size=n_conhecidas)
+        desconhecidos = rng.standard_normal((args.consultas - n_conhecidas, DIMENSAO))
+        consultas = np.concatenate([centros[alvos], desconhecidos])
+        consultas += args.ruido * rng.standard_normal(consultas.shape)
+        esperado = [f'pessoa{p}' for p in alvos] + ['Desconhecido'] * len(desconhecidos)
+
+        exata = GaleriaFaces(embeddings, nomes)
+        decisoes_exatas = decidir(exata, *exata.buscar(consultas))
+        acerto_exato = np.mean([d == e for d, e in zip(decisoes_exatas, esperado)])
+        tempo_exato = medir(lambda: exata.buscar(consultas[:args.faces]), args.repeticoes)
+
+        inicio = time.perf_counter()
+        prototipos = GaleriaPrototipos(embeddings, nomes, max_prototipos=args.prototipos_por_pessoa)
+        tempo_construcao = time.perf_counter() - inicio
+        print(f"{'':>10} {len(prototipos.prototipos)} protótipos calculados em {tempo_construcao:.2f}s "
+              f"(busca exata: acerto {acerto_exato:.3f})")
+
+        for n_candidatos in args.candidatas:
+            prototipos.n_candidatos = n_candidatos
+            decisoes = decidir(prototipos, *prototipos.buscar(consultas))
+            acerto = np.mean([d == e for d, e in zip(decisoes, esperado)])
+            iguais = np.mean([d == e for d, e in zip(decisoes, decisoes_exatas)])
+            tempo = medir(lambda: prototipos.buscar(consultas[:args.faces]), args.repeticoes)
+            print(f"{tamanho:>10} {len(prototipos.pessoas):>8} {n_candidatos:>11} {acerto:>7.3f} {iguais:>8.3f} "
+                  f"{tempo_exato:>11.3f} {tempo:>13.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da busca na galeria de faces')
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--faces', type=int, default=4, help='Faces por frame')
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--ivf', action='store_true', help='Comparar o índice IVF com a busca exata')
+    parser.add_argument('--sondas', type=int, nargs='+', default=[1, 4, 8, 16, 32])
+    parser.add_argument('--consultas', type=int, default=500, help='Consultas usadas no cálculo do recall')
+    parser.add_argument('--prototipos', action='store_true',
+                        help='Comparar a galeria de protótipos por pessoa com a busca exata')
+    parser.add_argument('--candidatas', type=int, nargs='+', default=[1, 2, 3, 5],
+                        help='Pessoas refinadas com a busca exata')
+    parser.add_argument('--prototipos-por-pessoa', type=int, default=3)
+    parser.add_argument('--fotos-por-pessoa', type=int, default=10)
+    parser.add_argument('--ruido', type=float, default=0.35, help='Desvio das fotos em torno do centro da pessoa')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+
+    if args.ivf:
+        comparar_ivf(args, rng)
+        return
+    if args.prototipos:
+        comparar_prototipos(args, rng)
+        return
+
+    print(f"{'galeria':>10} {'laço (ms)':>12} {'matriz (ms)':>12} {'ganho':>8}")
+    for tamanho in args.tamanhos:
+        known_embeddings = rng.standard_normal((tamanho, DIMENSAO))
+        known_names = [f'pessoa{i}' for i in range(tamanho)]
+        consultas = rng.standard_normal((args.faces, DIMENSAO))
+
+        galeria = GaleriaFaces(known_embeddings, known_names)
+
+        # Conferir que as duas buscas encontram o mesmo vizinho
+        esperado = [indice for indice, _ in buscar_laco(consultas, known_embeddings)]
+        indices, _ = galeria.buscar(consultas)
+        if esperado != indices[:, 0].tolist():
+            print(f"Aviso: resultados divergentes para galeria de {tamanho}")
+
+        # O laço é lento demais para muitas repetições em galerias grandes
+        repeticoes_laco = max(1, args.repeticoes * 1000 // tamanho)
+        tempo_laco = medir(lambda: buscar_laco(consultas, known_embeddings), repeticoes_laco)
+        tempo_matriz = medir(lambda: galeria.buscar(consultas), args.repeticoes)
+
+        print(f"{tamanho:>10} {tempo_laco:>12.2f} {tempo_matriz:>12.3f} {tempo_laco / tempo_matriz:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""Benchmark offline do reconhecimento: detecção → embedding → busca
+
+Reproduz um diretório de imagens (ou frames sintéticos) pelo mesmo caminho
+do /reconhecer_faces_binario — reconhecer_bytes, micro-lote e
+reconhecer_lote do app — sem webcam nem navegador. Para cada tamanho de
+galeria (embeddings aleatórios agrupados por pessoa) informa frames/s,
+latência de cada etapa (p50/p95/p99, as mesmas medidas do /metrics) e
+memória.
+
+Frames sintéticos não têm rostos: nesse caso, ou com --faces-por-frame, o
+detector SSD é trocado por um detector simulado que devolve caixas fixas,
+para que alinhamento, embedding e busca continuem sendo medidos.
+
+Uso:
+    python benchmark_reconhecimento.py --imagens data/Rick
+    python benchmark_reconhecimento.py --galerias 1000 10000 100000 --faces-por-frame 2
+    python benchmark_reconhecimento.py --imagens data --concorrencia 4 --backend onnxruntime
+"""
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from benchmark_galeria import gerar_galeria_sintetica
+
+# Etapas exibidas, na ordem do pipeline
+ETAPAS = ('imdecode', 'deteccao', 'alinhamento', 'embedding', 'busca', 'frame')
+
+
+class DetectorSimulado:
+    """Substitui o SSD: faces_por_frame caixas fixas com confiança 0.99 em cada imagem
+
+    Mesma interface (setInput/forward) e mesmo formato de saída da rede res10.
+    """
+
+    def __init__(self, faces_por_frame):
+        largura = 1.0 / faces_por_frame
+        self.caixas = [(i * largura + 0.1 * largura, 0.2, (i + 1) * largura - 0.1 * largura, 0.8)
+                       for i in range(faces_por_frame)]
+        self.total_imagens = 0
+
+    def setInput(self, blob):
+        self.total_imagens = blob.shape[0]
+
+    def forward(self):
+        linhas = [[i, 1, 0.99, *caixa] for i in range(self.total_imagens) for caixa in self.caixas]
+        return np.array(linhas, dtype=np.float32).reshape(1, 1, -1, 7)
+
+
+class PoolDetectorSimulado:
+    """Mesma interface do PoolDetectores, com um detector simulado por uso"""
+
+    def __init__(self, faces_por_frame):
+        self.faces_por_frame = faces_por_frame
+        self.tamanho = os.cpu_count() or 1
+
+    @contextmanager
+    def usar(self, timeout=None):
+        yield DetectorSimulado(self.faces_por_frame)
+
+
+def carregar_frames(diretorio, quantidade):
+    """Bytes JPEG/PNG como chegam do cliente: arquivos do diretório ou frames sintéticos 640x480"""
+    frames = []
+    if diretorio:
+        for extensao in ('*.jpg', '*.jpeg', '*.png', '*.bmp'):
+            for caminho in sorted(glob.glob(os.path.join(diretorio, '**', extensao), recursive=True)):
+                with open(caminho, 'rb') as f:
+                    frames.append(f.read())
+
+    if not frames:
+        rng = np.random.default_rng(0)
+        for _ in range(min(quantidade, 16)):
+            imagem = rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+            frames.append(cv2.imencode('.jpg', imagem, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes())
+
+    # Repete os frames até ter a quantidade pedida
+    return [frames[i % len(frames)] for i in range(quantidade)]
+
+
+def memoria_processo_mb():
+    """Memória residente atual do processo (pico no Windows/macOS, se disponível)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return float('nan')
+
+
+def reproduzir(app, frames, concorrencia, rastrear):
+    """Envia os frames ao reconhecimento; retorna a duração total em segundos"""
+    from rastreador_faces import RastreadorFaces
+
+    local = threading.local()
+
+    def reconhecer(dados):
+        # Um rastreador por thread: cada uma faz o papel de um cliente
+        if rastrear and not hasattr(local, 'rastreador'):
+            local.rastreador = RastreadorFaces(intervalo_embedding=app.reconhecimento_config['intervalo_embedding'])
+        return app.reconhecer_bytes(dados, getattr(local, 'rastreador', None))
+
+    inicio = time.perf_counter()
+    if concorrencia <= 1:
+        for dados in frames:
+            reconhecer(dados)
+    else:
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            list(executor.map(reconhecer, frames))
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark offline do pipeline de reconhecimento facial')
+    parser.add_argument('--imagens', default=None, help='Diretório com imagens (padrão: frames sintéticos)')
+    parser.add_argument('--frames', type=int, default=200, help='Frames medidos por tamanho de galeria')
+    parser.add_argument('--aquecimento', type=int, default=5, help='Frames descartados antes de medir')
+    parser.add_argument('--galerias', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Tamanhos de galeria sintética')
+    parser.add_argument('--fotos-por-pessoa', type=int, default=10)
+    parser.add_argument('--tipo-galeria', default='auto', choices=['auto', 'exato', 'ivf', 'prototipos'])
+    parser.add_argument('--precisao', default='float32', choices=['float32', 'float16', 'int8'])
+    parser.add_argument('--backend', default='deepface', choices=['deepface', 'opencv', 'onnxruntime'],
+                        help='Backend do FaceNet')
+    parser.add_argument('--faces-por-frame', type=int, default=None,
+                        help='Usar o detector simulado com esta quantidade de faces por frame')
+    parser.add_argument('--concorrencia', type=int, default=1, help='Clientes simultâneos (micro-lotes)')
+    parser.add_argument('--lote-max', type=int, default=8)
+    parser.add_argument('--rastrear', action='store_true', help='Rastrear faces entre frames (um rastreador por cliente)')
+    parser.add_argument('--json', default=None, help='Salvar os resultados neste arquivo')
+    args = parser.parse_args()
+
+    if args.imagens and not os.path.isdir(args.imagens):
+        print(f"Diretório {args.imagens} não encontrado")
+        return
+
+    # O app é importado depois dos argumentos: --help não carrega Flask e modelos
+    import app
+    from galeria import criar_galeria
+    from metricas import Metricas
+    from micro_lotes import AgrupadorLotes
+
+    frames = carregar_frames(args.imagens, args.aquecimento + args.frames)
+    if args.faces_por_frame is None and not args.imagens:
+        print("Frames sintéticos não têm rostos: usando o detector simulado com 1 face por frame")
+        args.faces_por_frame = 1
+
+    memoria_inicial = memoria_processo_mb()
+
+    if args.faces_por_frame:
+        app.pool_detectores = PoolDetectorSimulado(args.faces_por_frame)
+    elif not app.carregar_detector_facial():
+        print(f"{app.tratamento_config['status_message']} (use --faces-por-frame para o detector simulado)")
+        return
+
+    app.reconhecimento_config['backend_facenet'] = args.backend
+    inicio = time.perf_counter()
+    if not app.carregar_modelo_facenet():
+        print(app.reconhecimento_config['status_message'])
+        return
+    tempo_modelo = time.perf_counter() - inicio
+    memoria_modelos = memoria_processo_mb()
+    print(f"Modelos carregados em {tempo_modelo:.1f}s ({memoria_modelos - memoria_inicial:.0f} MB)\n")
+
+    # Como no app: um micro-lote em execução por instância do pool de detectores
+    app.agrupador_reconhecimento = AgrupadorLotes(app.reconhecer_lote, tamanho_max=args.lote_max,
+                                                  espera_max=app.reconhecimento_config['espera_lote_ms'] / 1000,
+                                                  num_trabalhadores=app.pool_detectores.tamanho)
+
+    rng = np.random.default_rng(0)
+    resultados = []
+    for tamanho in args.galerias:
+        embeddings, _, pessoas = gerar_galeria_sintetica(rng, tamanho, args.fotos_por_pessoa)
+        nomes = [f'pessoa{p}' for p in pessoas]
+        app.galeria = criar_galeria(embeddings, nomes, args.tipo_galeria, precisao=args.precisao)
+        app.reconhecimento_config['total_pessoas'] = len(set(nomes))
+        del embeddings
+
+        # Métricas novas a cada galeria; o aquecimento fica de fora
+        app.metricas = Metricas('benchmark')
+        reproduzir(app, frames[:args.aquecimento], args.concorrencia, args.rastrear)
+        app.metricas = Metricas('benchmark')
+
+        duracao = reproduzir(app, frames[args.aquecimento:], args.concorrencia, args.rastrear)
+
+        etapas = {dict(rotulos)['estagio']: valores
+                  for rotulos, valores in app.metricas.estatisticas('estagio_segundos').items()}
+        faces = app.metricas.estatisticas('faces_por_frame').get((), {}).get('media', 0.0)
+        resultado = {
+            'galeria': tamanho,
+            'tipo_galeria': type(app.galeria).__name__,
+            'frames_por_segundo': args.frames / duracao,
+            'faces_por_frame': faces,
+            'memoria_processo_mb': memoria_processo_mb(),
+            'memoria_galeria_mb': app.galeria.memoria() / 2**20,
+            'etapas_ms': {etapa: {chave: valores[chave] * 1000 for chave in ('p50', 'p95', 'p99', 'media')}
+                          for etapa, valores in etapas.items()},
+        }
+        resultados.append(resultado)
+
+        print(f"Galeria {tamanho} ({resultado['tipo_galeria']}, {args.precisao}): "
+              f"{resultado['frames_por_segundo']:.1f} frames/s, {faces:.1f} faces/frame, "
+              f"processo {resultado['memoria_processo_mb']:.0f} MB, galeria {resultado['memoria_galeria_mb']:.1f} MB")
+        print(f"{'etapa':>12} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'chamadas':>9}")
+        for etapa in ETAPAS:
+            if etapa in etapas:
+                valores = resultado['etapas_ms'][etapa]
+                print(f"{etapa:>12} {valores['p50']:>9.2f} {valores['p95']:>9.2f} {valores['p99']:>9.2f} "
+                      f"{etapas[etapa]['contagem']:>9}")
+        print()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'parametros': vars(args), 'resultados': resultados}, f, ensure_ascii=False, indent=2)
+        print(f"Resultados salvos em {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import sqlite3
+import threading
+
+import numpy as np
+
+
+def hash_conteudo(dados):
+    """Hash SHA-256 do conteúdo de um arquivo já lido (bytes ou np.ndarray)"""
+    return hashlib.sha256(memoryview(dados)).hexdigest()
+
+
+def hash_arquivo(caminho):
+    """Hash SHA-256 do conteúdo de um arquivo"""
+    with open(caminho, 'rb') as f:
+        return hash_conteudo(f.read())
+
+
+class CacheTratamento:
+    """Cache persistente de detecções, qualidades e embeddings indexado pelo conteúdo
+
+    A chave é o hash do arquivo mais a versão do detector/modelo, então
+    renomear uma foto não invalida o cache, mas trocar o modelo sim.
+    Fica em um SQLite para que cada resultado seja gravado sem reescrever
+    o cache inteiro.
+    """
+
+    def __init__(self, caminho='data/cache_tratamento.sqlite'):
+        self.caminho = caminho
+        self.lock = threading.Lock()
+        self._conexao = None
+
+    def _conectar(self):
+        if self._conexao is None:
+            self._conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+            self._conexao.execute('PRAGMA journal_mode=WAL')
+            self._conexao.execute('PRAGMA synchronous=NORMAL')
+            self._conexao.execute('CREATE TABLE IF NOT EXISTS deteccoes ('
+                                  'hash TEXT, versao TEXT, box TEXT, PRIMARY KEY (hash, versao))')
+            self._conexao.execute('CREATE TABLE IF NOT EXISTS embeddings ('
+                                  'hash TEXT, versao TEXT, embedding BLOB, PRIMARY KEY (hash, versao))')
+            self._conexao.execute('CREATE TABLE IF NOT EXISTS qualidades ('
+                                  'hash TEXT, versao TEXT, pontuacao REAL, PRIMARY KEY (hash, versao))')
+        return self._conexao
+
+    def buscar_deteccao(self, hash_imagem, versao):
+        """Busca a detecção de uma imagem
+
+        Returns:
+            tuple: (encontrado, box) — box é [startX, startY, endX, endY] ou
+                   None se a imagem já foi processada e não tinha face.
+        """
+        with self.lock:
+            linha = self._conectar().execute(
+                'SELECT box FROM deteccoes WHERE hash = ? AND versao = ?',
+                (hash_imagem, versao)).fetchone()
+        if linha is None:
+            return False, None
+        return True, json.loads(linha[0])
+
+    def salvar_deteccao(self, hash_imagem, versao, box):
+        """Grava a detecção de uma imagem (box None = nenhuma face encontrada)"""
+        box = None if box is None else [int(v) for v in box]
+        with self.lock:
+            conexao = self._conectar()
+            conexao.execute('INSERT OR REPLACE INTO deteccoes VALUES (?, ?, ?)',
+                            (hash_imagem, versao, json.dumps(box)))
+            conexao.commit()
+
+    def buscar_embeddings(self, hashes, versao):
+        """Retorna {hash: embedding} para os hashes presentes no cache"""
+        encontrados = {}
+        hashes = list(hashes)
+        with self.lock:
+            conexao = self._conectar()
+            # Consultas em blocos para respeitar o limite de parâmetros do SQLite
+            for inicio in range(0, len(hashes), 500):
+                bloco = hashes[inicio:inicio + 500]
+                marcadores = ','.join('?' * len(bloco))
+                for hash_face, dados in conexao.execute(
+                        f'SELECT hash, embedding FROM embeddings WHERE versao = ? AND hash IN ({marcadores})',
+                        [versao] + bloco):
+                    encontrados[hash_face] = np.frombuffer(dados, dtype=np.float32)
+        return encontrados
+
+    def salvar_embeddings(self, itens, versao):
+        """Grava vários embeddings de uma vez
+
+        Args:
+            itens (list): Pares (hash, embedding).
+            versao (str): Versão do modelo de embedding.
+        """
+        with self.lock:
+            conexao = self._conectar()
+            conexao.executemany('INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)',
+                                [(hash_face, versao, np.asarray(embedding, dtype=np.float32).tobytes())
+                                 for hash_face, embedding in itens])
+            conexao.commit()
+
+    def buscar_qualidades(self, hashes, versao):
+        """Retorna {hash: pontuacao} para os recortes já avaliados"""
+        encontradas = {}
+        hashes = list(hashes)
+        with self.lock:
+            conexao = self._conectar()
+            for inicio in range(0, len(hashes), 500):
+                bloco = hashes[inicio:inicio + 500]
+                marcadores = ','.join('?' * len(bloco))
+                for hash_face, pontuacao in conexao.execute(
+                        f'SELECT hash, pontuacao FROM qualidades WHERE versao = ? AND hash IN ({marcadores})',
+                        [versao] + bloco):
+                    encontradas[hash_face] = pontuacao
+        return encontradas
+
+    def salvar_qualidades(self, itens, versao):
+        """Grava a pontuação de qualidade de vários recortes (pares (hash, pontuacao))"""
+        with self.lock:
+            conexao = self._conectar()
+            conexao.executemany('INSERT OR REPLACE INTO qualidades VALUES (?, ?, ?)',
+                                [(hash_face, versao, float(pontuacao)) for hash_face, pontuacao in itens])
+            conexao.commit()
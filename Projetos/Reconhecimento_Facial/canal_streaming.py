@@ -0,0 +1,100 @@
+import json
+import struct
+import threading
+
+# Cabeçalho de cada frame binário: id do frame (uint32 big-endian)
+CABECALHO_FRAME = struct.Struct('>I')
+
+
+def montar_frame(frame_id, dados_imagem):
+    """Monta a mensagem binária de um frame: cabeçalho + bytes do JPEG/PNG"""
+    return CABECALHO_FRAME.pack(frame_id) + dados_imagem
+
+
+def separar_frame(mensagem):
+    """Separa (frame_id, bytes da imagem) de uma mensagem binária"""
+    if len(mensagem) < CABECALHO_FRAME.size:
+        raise ValueError('Mensagem menor que o cabeçalho do frame')
+    (frame_id,) = CABECALHO_FRAME.unpack_from(mensagem)
+    return frame_id, memoryview(mensagem)[CABECALHO_FRAME.size:]
+
+
+class SessaoStreaming:
+    """Sessão de reconhecimento de um cliente conectado por WebSocket
+
+    Os frames recebidos vão para um único espaço "pendente". Uma thread da
+    sessão processa sempre o frame mais recente; se outro chegar antes de o
+    anterior começar a ser processado, o anterior é descartado e o cliente
+    recebe {"frame_id": ..., "status": "dropped"}. Assim o servidor nunca
+    acumula fila quando fica para trás.
+
+    Args:
+        processar (callable): Recebe os bytes da imagem e devolve a lista de
+                              resultados (ou None se a imagem for inválida).
+        enviar (callable): Envia uma mensagem de texto ao cliente.
+    """
+
+    def __init__(self, processar, enviar):
+        self.processar = processar
+        self.enviar = enviar
+        self.recebidos = 0
+        self.processados = 0
+        self.descartados = 0
+
+        self._condicao = threading.Condition()
+        self._pendente = None
+        self._ativa = True
+        self._lock_envio = threading.Lock()
+
+        threading.Thread(target=self._trabalhar, daemon=True).start()
+
+    def receber(self, frame_id, dados):
+        """Registra um novo frame, descartando o pendente mais antigo"""
+        with self._condicao:
+            descartado = self._pendente
+            self._pendente = (frame_id, dados)
+            self.recebidos += 1
+            if descartado is not None:
+                self.descartados += 1
+            self._condicao.notify()
+
+        if descartado is not None:
+            self._responder({'frame_id': descartado[0], 'status': 'dropped'})
+
+    def encerrar(self):
+        """Encerra a thread da sessão (frames pendentes são descartados)"""
+        with self._condicao:
+            self._ativa = False
+            self._pendente = None
+            self._condicao.notify()
+
+    def _trabalhar(self):
+        while True:
+            with self._condicao:
+                while self._pendente is None and self._ativa:
+                    self._condicao.wait()
+                if not self._ativa:
+                    return
+                frame_id, dados = self._pendente
+                self._pendente = None
+
+            try:
+                results = self.processar(dados)
+                if results is None:
+                    resposta = {'frame_id': frame_id, 'status': 'error', 'results': []}
+                else:
+                    resposta = {'frame_id': frame_id, 'status': 'success', 'results': results}
+            except Exception as e:
+                resposta = {'frame_id': frame_id, 'status': 'error', 'message': str(e), 'results': []}
+
+            self.processados += 1
+            self._responder(resposta)
+
+    def _responder(self, resposta):
+        # Recepção e processamento rodam em threads diferentes: envio serializado
+        try:
+            with self._lock_envio:
+                self.enviar(json.dumps(resposta))
+        except Exception:
+            # Conexão fechada pelo cliente
+            self.encerrar()
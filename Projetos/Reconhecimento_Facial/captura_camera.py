@@ -0,0 +1,122 @@
+import threading
+import time
+
+import cv2
+
+
+class CapturaCamera:
+    """Câmera lida continuamente por uma thread dedicada
+
+    A thread de captura chama camera.read() sem parar e publica cada frame
+    em um espaço "último frame" (uma tupla trocada por atribuição, sem lock
+    para quem lê). O stream MJPEG e a captura de fotos leem desse espaço e
+    nunca bloqueiam a câmera nem um ao outro.
+
+    Os frames publicados não devem ser alterados: quem for desenhar sobre
+    um frame precisa copiá-lo antes.
+
+    Args:
+        indice (int): Índice da câmera no cv2.VideoCapture.
+        largura (int): Largura pedida à câmera.
+        altura (int): Altura pedida à câmera.
+        fps (int): FPS pedido à câmera.
+    """
+
+    def __init__(self, indice=0, largura=640, altura=480, fps=30):
+        self.indice = indice
+        self.largura = largura
+        self.altura = altura
+        self.fps = fps
+
+        self._thread = None
+        self._parada = None  # Event da execução atual da thread de captura
+        self._ativa = False
+        self._ultimo = (0, None)  # (número do frame, frame)
+        self._lock = threading.Lock()  # Só para abrir/fechar a câmera
+        self._novo_frame = threading.Condition()
+
+    @property
+    def ativa(self):
+        return self._ativa
+
+    def iniciar(self):
+        """Abre a câmera e inicia a thread de captura (se ainda não estiver ativa)"""
+        with self._lock:
+            if self._ativa:
+                return True
+
+            camera = cv2.VideoCapture(self.indice)
+            if not camera.isOpened():
+                camera.release()
+                return False
+
+            # Configurações para melhorar performance
+            camera.set(cv2.CAP_PROP_FRAME_WIDTH, self.largura)
+            camera.set(cv2.CAP_PROP_FRAME_HEIGHT, self.altura)
+            camera.set(cv2.CAP_PROP_FPS, self.fps)
+            camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Reduz buffer para menor latência
+
+            self._ativa = True
+            self._parada = threading.Event()
+            self._thread = threading.Thread(target=self._capturar, args=(camera, self._parada), daemon=True)
+            self._thread.start()
+            return True
+
+    def parar(self):
+        """Para a thread de captura e libera a câmera"""
+        with self._lock:
+            if not self._ativa:
+                return
+            self._ativa = False
+            self._parada.set()
+            thread = self._thread
+            self._thread = None
+
+        thread.join(timeout=2)
+        with self._novo_frame:
+            self._novo_frame.notify_all()
+
+    def _capturar(self, camera, parada):
+        falhas = 0
+
+        while not parada.is_set():
+            ret, frame = camera.read()
+            if not ret:
+                # Câmera desconectada ou sem frames: desiste após ~1 s de falhas
+                falhas += 1
+                if falhas > 30:
+                    with self._lock:
+                        if not parada.is_set():
+                            self._ativa = False
+                            parada.set()
+                    break
+                time.sleep(0.033)
+                continue
+
+            falhas = 0
+            numero = self._ultimo[0] + 1
+            self._ultimo = (numero, frame)
+            with self._novo_frame:
+                self._novo_frame.notify_all()
+
+        camera.release()
+        self._ultimo = (self._ultimo[0], None)
+        with self._novo_frame:
+            self._novo_frame.notify_all()
+
+    def ultimo_frame(self):
+        """Retorna (número, frame) do frame mais recente, sem bloquear
+
+        O frame é None se a câmera ainda não produziu nenhum ou já foi parada.
+        """
+        return self._ultimo
+
+    def esperar_frame(self, ultimo_numero, timeout=1.0):
+        """Espera um frame mais novo que ultimo_numero e retorna (número, frame)"""
+        numero, frame = self._ultimo
+        if numero > ultimo_numero or not self._ativa:
+            return numero, frame
+
+        with self._novo_frame:
+            self._novo_frame.wait_for(lambda: self._ultimo[0] > ultimo_numero or not self._ativa, timeout)
+        return self._ultimo
@@ -0,0 +1,109 @@
+"""Cliente de teste do canal de reconhecimento em streaming (/ws/reconhecer)
+
+Envia frames em um ritmo fixo pelo WebSocket e mostra, para cada resposta,
+o frame_id, o status e a latência. No final imprime quantos frames foram
+processados e quantos o servidor descartou por estar atrasado.
+
+O sistema precisa estar inicializado (POST /inicializar_reconhecimento).
+
+Uso:
+    python cliente_streaming.py --imagens data/Rick --fps 15 --segundos 10
+    python cliente_streaming.py --url ws://localhost:5000/ws/reconhecer
+"""
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+from simple_websocket import Client, ConnectionClosed
+
+from canal_streaming import montar_frame
+
+
+def carregar_frames(diretorio):
+    """Bytes JPEG das imagens do diretório, ou um frame sintético 640x480"""
+    frames = []
+    if diretorio:
+        for extensao in ('*.jpg', '*.jpeg', '*.png'):
+            for caminho in sorted(glob.glob(os.path.join(diretorio, extensao))):
+                with open(caminho, 'rb') as f:
+                    frames.append(f.read())
+
+    if not frames:
+        imagem = np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+        frames.append(cv2.imencode('.jpg', imagem)[1].tobytes())
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cliente de teste do reconhecimento em streaming')
+    parser.add_argument('--url', default='ws://localhost:5000/ws/reconhecer')
+    parser.add_argument('--imagens', default=None, help='Diretório com imagens a enviar')
+    parser.add_argument('--fps', type=float, default=15)
+    parser.add_argument('--segundos', type=float, default=10)
+    args = parser.parse_args()
+
+    frames = carregar_frames(args.imagens)
+    ws = Client.connect(args.url)
+
+    envios = {}
+    latencias = []
+    contagem = {'success': 0, 'dropped': 0, 'error': 0}
+    fim_envio = threading.Event()
+
+    def receber():
+        while True:
+            try:
+                mensagem = ws.receive(timeout=1)
+            except ConnectionClosed:
+                return
+            if mensagem is None:
+                # Nada chegou em 1 s: termina se o envio já acabou
+                if fim_envio.is_set():
+                    return
+                continue
+
+            resposta = json.loads(mensagem)
+            status = resposta.get('status')
+            contagem[status] = contagem.get(status, 0) + 1
+
+            frame_id = resposta.get('frame_id')
+            if frame_id is None:
+                print(f"Servidor: {resposta.get('message')}")
+                return
+            if status != 'dropped':
+                latencia = (time.perf_counter() - envios.pop(frame_id)) * 1000
+                latencias.append(latencia)
+                nomes = [r.get('name') for r in resposta.get('results', [])]
+                print(f"frame {frame_id:>5} {status:>8} {latencia:8.1f} ms  {nomes}")
+            else:
+                envios.pop(frame_id, None)
+
+    receptor = threading.Thread(target=receber, daemon=True)
+    receptor.start()
+
+    intervalo = 1.0 / args.fps
+    inicio = time.perf_counter()
+    frame_id = 0
+    while time.perf_counter() - inicio < args.segundos and receptor.is_alive():
+        envios[frame_id] = time.perf_counter()
+        ws.send(montar_frame(frame_id, frames[frame_id % len(frames)]))
+        frame_id += 1
+        time.sleep(max(0.0, intervalo - (time.perf_counter() - envios[frame_id - 1])))
+
+    fim_envio.set()
+    receptor.join(timeout=5)
+    ws.close()
+
+    print(f"\nEnviados: {frame_id}  processados: {contagem['success']}  "
+          f"descartados: {contagem['dropped']}  erros: {contagem['error']}")
+    if latencias:
+        print(f"Latência p50: {np.percentile(latencias, 50):.1f} ms  p95: {np.percentile(latencias, 95):.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Compara os backends do FaceNet: inicialização, memória, latência e embeddings
+
+Cada backend é medido em um processo novo, para que o tempo de
+inicialização inclua as importações (TensorFlow no caso do DeepFace) e a
+memória não se misture com a dos outros. Os embeddings das mesmas faces,
+com o mesmo pré-processamento, são comparados com os do primeiro backend.
+
+Uso:
+    python comparar_backends_facenet.py
+    python comparar_backends_facenet.py --faces data/faces_recortadas --lote 16
+    python comparar_backends_facenet.py --backends opencv onnxruntime
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+TOTAL_FACES = 32
+
+
+def carregar_faces(pasta, total):
+    """Recortes de face da pasta, ou faces sintéticas se ela não tiver imagens"""
+    import cv2
+
+    faces = []
+    if pasta and os.path.isdir(pasta):
+        for nome_arquivo in sorted(os.listdir(pasta)):
+            if nome_arquivo.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')):
+                dados = np.fromfile(os.path.join(pasta, nome_arquivo), dtype=np.uint8)
+                face = cv2.imdecode(dados, cv2.IMREAD_COLOR) if dados.size else None
+                if face is not None:
+                    faces.append(face)
+            if len(faces) == total:
+                break
+    if not faces:
+        rng = np.random.default_rng(0)
+        faces = [rng.integers(0, 255, (200, 180, 3), dtype=np.uint8) for _ in range(total)]
+    return faces
+
+
+def medir_backend(args):
+    """Executado no processo filho: carrega um backend e mede"""
+    inicio = time.perf_counter()
+    from backends_facenet import carregar_facenet
+    from extrator_embeddings import gerar_embeddings_lote
+    modelo = carregar_facenet(args.medir)
+    gerar_embeddings_lote(modelo, carregar_faces(None, 1))  # Primeiro forward (inicialização preguiçosa)
+    tempo_inicializacao = time.perf_counter() - inicio
+
+    faces = carregar_faces(args.faces, TOTAL_FACES)
+
+    inicio = time.perf_counter()
+    for face in faces:
+        gerar_embeddings_lote(modelo, [face])
+    por_face_individual = (time.perf_counter() - inicio) * 1000 / len(faces)
+
+    inicio = time.perf_counter()
+    embeddings = gerar_embeddings_lote(modelo, faces, tamanho_lote=args.lote)
+    por_face_lote = (time.perf_counter() - inicio) * 1000 / len(faces)
+
+    memoria_mb = None
+    try:
+        import resource
+        memoria_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB no Linux
+    except ImportError:
+        pass  # Windows: sem o módulo resource
+
+    np.save(args.embeddings, embeddings)
+    print(json.dumps({'inicializacao_s': tempo_inicializacao, 'memoria_mb': memoria_mb,
+                      'ms_face_individual': por_face_individual, 'ms_face_lote': por_face_lote}))
+
+
+def distancia_maxima(referencia, embeddings):
+    """Maior distância de cosseno entre embeddings correspondentes"""
+    cossenos = np.sum(referencia * embeddings, axis=1) / (
+        np.linalg.norm(referencia, axis=1) * np.linalg.norm(embeddings, axis=1))
+    return float(1 - cossenos.min())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Comparação dos backends do FaceNet')
+    parser.add_argument('--backends', nargs='+', default=['deepface', 'opencv', 'onnxruntime'])
+    parser.add_argument('--faces', default=os.path.join('data', 'faces_recortadas'),
+                        help='Pasta com recortes de face (sem imagens: faces sintéticas)')
+    parser.add_argument('--lote', type=int, default=8, help='Faces por forward na medida em lote')
+    parser.add_argument('--medir', help=argparse.SUPPRESS)
+    parser.add_argument('--embeddings', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        medir_backend(args)
+        return
+
+    from backends_facenet import verificar_backend
+
+    print(f"{'backend':>12} {'inicialização (s)':>18} {'memória (MB)':>13} {'ms/face (1)':>12} "
+          f"{f'ms/face ({args.lote})':>13} {'Δ cosseno':>10}")
+
+    referencia = None
+    with tempfile.TemporaryDirectory() as pasta_temporaria:
+        for backend in args.backends:
+            problema = verificar_backend(backend)
+            if problema:
+                print(f"{backend:>12} indisponível: {problema}")
+                continue
+
+            caminho_embeddings = os.path.join(pasta_temporaria, f'{backend}.npy')
+            processo = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--medir', backend, '--embeddings', caminho_embeddings,
+                 '--faces', args.faces, '--lote', str(args.lote)],
+                capture_output=True, text=True)
+            if processo.returncode != 0:
+                print(f"{backend:>12} falhou: {processo.stderr.strip().splitlines()[-1:]}")
+                continue
+
+            medidas = json.loads(processo.stdout.strip().splitlines()[-1])
+            embeddings = np.load(caminho_embeddings)
+            if referencia is None:
+                referencia = embeddings
+            memoria = f"{medidas['memoria_mb']:.0f}" if medidas['memoria_mb'] is not None else '-'
+
+            print(f"{backend:>12} {medidas['inicializacao_s']:>18.2f} {memoria:>13} "
+                  f"{medidas['ms_face_individual']:>12.2f} {medidas['ms_face_lote']:>13.2f} "
+                  f"{distancia_maxima(referencia, embeddings):>10.2e}")
+
+
+if __name__ == '__main__':
+    main()
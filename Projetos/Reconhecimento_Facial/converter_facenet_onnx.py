@@ -0,0 +1,52 @@
+"""Converte o FaceNet do DeepFace para ONNX (backends 'opencv' e 'onnxruntime')
+
+Precisa do DeepFace/TensorFlow e do tf2onnx apenas nesta conversão; depois
+o app roda o grafo sem eles. Ao final os embeddings do grafo convertido são
+comparados com os do Keras sobre as mesmas entradas.
+
+Uso:
+    pip install tf2onnx
+    python converter_facenet_onnx.py
+    python converter_facenet_onnx.py --saida facenet.onnx --opset 13
+"""
+import argparse
+
+import numpy as np
+
+from backends_facenet import CAMINHO_FACENET_ONNX, FORMATO_ENTRADA, carregar_facenet, onnxruntime_disponivel
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Conversão do FaceNet (Keras) para ONNX')
+    parser.add_argument('--saida', default=CAMINHO_FACENET_ONNX)
+    parser.add_argument('--opset', type=int, default=13)
+    args = parser.parse_args()
+
+    try:
+        import tensorflow as tf
+        import tf2onnx
+    except ImportError:
+        print("A conversão precisa do TensorFlow e do tf2onnx. Instale com: pip install tf2onnx")
+        return
+
+    modelo = carregar_facenet('deepface')
+
+    # Entrada NHWC com lote variável, igual à do Keras: o pré-processamento não muda
+    assinatura = (tf.TensorSpec(FORMATO_ENTRADA, tf.float32, name='entrada'),)
+    tf2onnx.convert.from_keras(modelo, input_signature=assinatura, opset=args.opset, output_path=args.saida)
+    print(f"Modelo salvo em {args.saida}")
+
+    # Conferir o grafo convertido contra o Keras
+    lote = np.random.default_rng(0).random((8,) + FORMATO_ENTRADA[1:], dtype=np.float32)
+    esperado = np.asarray(modelo.predict_on_batch(lote), dtype=np.float32)
+    backends = ['opencv'] + (['onnxruntime'] if onnxruntime_disponivel else [])
+    for backend in backends:
+        obtido = np.asarray(carregar_facenet(backend, args.saida).predict_on_batch(lote), dtype=np.float32)
+        cossenos = np.sum(esperado * obtido, axis=1) / (
+            np.linalg.norm(esperado, axis=1) * np.linalg.norm(obtido, axis=1))
+        print(f"{backend}: diferença máxima {np.abs(esperado - obtido).max():.2e}, "
+              f"distância de cosseno máxima {1 - cossenos.min():.2e}")
+
+
+if __name__ == '__main__':
+    main()
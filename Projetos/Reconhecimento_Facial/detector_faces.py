@@ -0,0 +1,137 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from qualidade_faces import TAMANHO_MINIMO_FACE, alinhar_face
+
+# Entrada do detector SSD res10 (Caffe)
+TAMANHO_SSD = (300, 300)
+MEDIA_SSD = (104.0, 177.0, 123.0)
+
+CAMINHO_PROTOTXT = 'deploy.prototxt'
+CAMINHO_MODELO = 'res10_300x300_ssd_iter_140000.caffemodel'
+
+
+def carregar_rede_detector(caminho_prototxt=CAMINHO_PROTOTXT, caminho_modelo=CAMINHO_MODELO):
+    """Carrega uma instância do detector facial SSD do OpenCV"""
+    return cv2.dnn.readNetFromCaffe(caminho_prototxt, caminho_modelo)
+
+
+def detectar_em_lote(net, imagens):
+    """Detecta faces em várias imagens com um único forward
+
+    As imagens são redimensionadas para 300x300 e empilhadas em um blob
+    NCHW com cv2.dnn.blobFromImages. A saída do SSD traz na coluna 0 o
+    índice da imagem de cada detecção, usado para devolvê-las à origem.
+
+    Args:
+        net: Rede carregada por carregar_rede_detector (não é thread-safe).
+        imagens (list): Imagens BGR de qualquer tamanho.
+
+    Returns:
+        list: Para cada imagem, um array (1, 1, k, 7) no mesmo formato da
+              saída de detector.forward() para uma imagem só.
+    """
+    if not imagens:
+        return []
+
+    redimensionadas = [cv2.resize(imagem, TAMANHO_SSD) for imagem in imagens]
+    blob = cv2.dnn.blobFromImages(redimensionadas, 1.0, TAMANHO_SSD, MEDIA_SSD)
+
+    net.setInput(blob)
+    saida = net.forward()
+    deteccoes = saida.reshape(-1, saida.shape[-1])
+
+    indices_imagem = deteccoes[:, 0].astype(int)
+    return [deteccoes[indices_imagem == i][None, None] for i in range(len(imagens))]
+
+
+def melhor_deteccao(deteccoes, w, h, confianca_minima):
+    """Retorna a caixa [startX, startY, endX, endY] da detecção mais confiável, ou None"""
+    if len(deteccoes[0, 0]) == 0:
+        return None
+
+    best_detection_index = np.argmax(deteccoes[0, 0, :, 2])
+    if deteccoes[0, 0, best_detection_index, 2] <= confianca_minima:
+        return None
+
+    # Calcular coordenadas da caixa delimitadora
+    box = deteccoes[0, 0, best_detection_index, 3:7] * np.array([w, h, w, h])
+    (startX, startY, endX, endY) = box.astype("int")
+
+    # Garantir que está dentro dos limites
+    return [max(0, startX), max(0, startY), min(w, endX), min(h, endY)]
+
+
+def salvar_recorte(imagem, box, caminho_saida):
+    """Recorta o rosto alinhado pelos olhos e salva
+
+    Returns:
+        bool: False se o recorte for vazio ou menor que TAMANHO_MINIMO_FACE.
+    """
+    (startX, startY, endX, endY) = box
+    if min(endX - startX, endY - startY) < TAMANHO_MINIMO_FACE:
+        return False
+
+    rosto, _ = alinhar_face(imagem, box)
+    if rosto.size == 0:
+        return False
+
+    cv2.imwrite(caminho_saida, rosto)
+    return True
+
+
+class PoolDetectores:
+    """Pool de instâncias independentes do detector SSD
+
+    Um cv2.dnn.Net não pode ser usado por duas threads ao mesmo tempo, então
+    cada requisição pega uma instância do pool e devolve ao terminar. As
+    instâncias são criadas sob demanda até o tamanho máximo (por padrão, o
+    número de núcleos); acima disso a requisição espera uma ser devolvida.
+    """
+
+    def __init__(self, tamanho=None, caminho_prototxt=CAMINHO_PROTOTXT, caminho_modelo=CAMINHO_MODELO):
+        self.tamanho = max(1, tamanho or os.cpu_count() or 1)
+        self.caminho_prototxt = caminho_prototxt
+        self.caminho_modelo = caminho_modelo
+        self._livres = queue.Queue()
+        self._criadas = 0
+        self._lock = threading.Lock()
+
+        # Uma instância já na criação para validar os arquivos do modelo
+        self._livres.put(self._nova_instancia())
+
+    def _nova_instancia(self):
+        net = carregar_rede_detector(self.caminho_prototxt, self.caminho_modelo)
+        self._criadas += 1
+        return net
+
+    def retirar(self, timeout=None):
+        """Retira uma instância do pool (bloqueia se todas estiverem em uso)"""
+        try:
+            return self._livres.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._criadas < self.tamanho:
+                return self._nova_instancia()
+
+        return self._livres.get(timeout=timeout)
+
+    def devolver(self, net):
+        """Devolve ao pool uma instância retirada"""
+        self._livres.put(net)
+
+    @contextmanager
+    def usar(self, timeout=None):
+        """Context manager: with pool.usar() as net: ..."""
+        net = self.retirar(timeout)
+        try:
+            yield net
+        finally:
+            self.devolver(net)
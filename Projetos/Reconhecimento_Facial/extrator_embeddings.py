@@ -0,0 +1,123 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+# Tamanho de entrada do FaceNet usado pelo DeepFace
+TAMANHO_FACENET = (160, 160)
+
+
+def tamanho_entrada(modelo):
+    """Retorna (altura, largura) esperados pelo modelo Keras"""
+    try:
+        altura, largura = modelo.input_shape[1:3]
+        if altura and largura:
+            return (altura, largura)
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return TAMANHO_FACENET
+
+
+def preprocessar_face(face, tamanho=TAMANHO_FACENET):
+    """Prepara um recorte de face da mesma forma que o DeepFace.represent
+
+    Redimensiona mantendo a proporção, completa com bordas pretas até o
+    tamanho de entrada e escala os pixels para [0, 1].
+
+    Args:
+        face (np.ndarray): Recorte BGR da face.
+        tamanho (tuple): (altura, largura) de entrada do modelo.
+    """
+    altura, largura = tamanho
+    fator = min(altura / face.shape[0], largura / face.shape[1])
+    dsize = (max(1, int(face.shape[1] * fator)), max(1, int(face.shape[0] * fator)))
+    face = cv2.resize(face, dsize)
+
+    diff_0 = altura - face.shape[0]
+    diff_1 = largura - face.shape[1]
+    face = np.pad(face, ((diff_0 // 2, diff_0 - diff_0 // 2),
+                         (diff_1 // 2, diff_1 - diff_1 // 2),
+                         (0, 0)), 'constant')
+
+    if face.shape[:2] != (altura, largura):
+        face = cv2.resize(face, (largura, altura))
+
+    return face.astype(np.float32) / 255.0
+
+
+def gerar_embeddings_lote(modelo, faces, tamanho_lote=32):
+    """Gera os embeddings de várias faces com forwards em lote
+
+    Args:
+        modelo: Modelo FaceNet carregado por DeepFace.build_model('Facenet').
+        faces (list): Recortes BGR das faces.
+        tamanho_lote (int): Máximo de faces por forward.
+
+    Returns:
+        np.ndarray: Embeddings no formato (len(faces), d), na ordem das faces.
+    """
+    if not faces:
+        return np.empty((0, 0), dtype=np.float32)
+
+    tamanho = tamanho_entrada(modelo)
+    lote = np.stack([preprocessar_face(face, tamanho) for face in faces])
+    return inferir_lote(modelo, lote, tamanho_lote)
+
+
+def inferir_lote(modelo, lote, tamanho_lote=32):
+    """Executa o modelo sobre faces já pré-processadas, em fatias de tamanho_lote"""
+    embeddings = []
+    for inicio in range(0, len(lote), tamanho_lote):
+        # predict_on_batch evita o overhead do predict() para lotes pequenos
+        saida = modelo.predict_on_batch(lote[inicio:inicio + tamanho_lote])
+        embeddings.append(np.asarray(saida, dtype=np.float32))
+
+    return np.concatenate(embeddings)
+
+
+def ler_face(caminho, tamanho=TAMANHO_FACENET):
+    """Lê e pré-processa um recorte de face do disco (None se não puder ser lido)"""
+    # np.fromfile + imdecode aceita caminhos com acentos, ao contrário do imread no Windows
+    dados = np.fromfile(caminho, dtype=np.uint8)
+    face = cv2.imdecode(dados, cv2.IMREAD_COLOR) if dados.size else None
+    if face is None or face.size == 0:
+        return None
+    return preprocessar_face(face, tamanho)
+
+
+def gerar_embeddings_arquivos(modelo, caminhos, tamanho_lote=32, num_threads=None):
+    """Gera embeddings de arquivos de face com leitura paralela e inferência em lote
+
+    A leitura e o pré-processamento do próximo lote rodam em um pool de
+    threads enquanto o lote atual passa pelo modelo.
+
+    Args:
+        modelo: Modelo FaceNet carregado.
+        caminhos (list): Caminhos dos recortes de face.
+        tamanho_lote (int): Faces por forward do modelo.
+        num_threads (int, optional): Threads de leitura (padrão do ThreadPoolExecutor).
+
+    Yields:
+        list: Para cada lote, pares (caminho, embedding) na ordem de entrada;
+              o embedding é None quando o arquivo não pôde ser lido.
+    """
+    tamanho = tamanho_entrada(modelo)
+    lotes = [caminhos[i:i + tamanho_lote] for i in range(0, len(caminhos), tamanho_lote)]
+    if not lotes:
+        return
+
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        pendentes = [executor.submit(ler_face, caminho, tamanho) for caminho in lotes[0]]
+
+        for i, lote in enumerate(lotes):
+            faces = [futuro.result() for futuro in pendentes]
+
+            # Dispara a leitura do próximo lote antes da inferência deste
+            if i + 1 < len(lotes):
+                pendentes = [executor.submit(ler_face, caminho, tamanho) for caminho in lotes[i + 1]]
+
+            validas = [face for face in faces if face is not None]
+            embeddings = iter(inferir_lote(modelo, np.stack(validas), tamanho_lote)) if validas else iter(())
+
+            yield [(caminho, next(embeddings) if face is not None else None)
+                   for caminho, face in zip(lote, faces)]
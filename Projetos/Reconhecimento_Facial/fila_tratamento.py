@@ -0,0 +1,266 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from trava_arquivo import TravaArquivo
+
+# Estados de um job
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDO = 'concluido'
+ERRO = 'erro'
+CANCELADO = 'cancelado'
+
+ESTADOS_FINAIS = {CONCLUIDO, ERRO, CANCELADO}
+
+
+class JobCancelado(Exception):
+    """Levantada pela função do job quando ele foi cancelado no meio da execução"""
+
+
+class FilaTratamento:
+    """Fila de jobs de tratamento com journal em disco
+
+    Cada mudança de um job (criação, progresso, fim, pedido de cancelamento)
+    é acrescentada como uma linha JSON ao journal, que é o estado da fila.
+    Vários processos do servidor podem abrir a mesma fila: as escritas são
+    serializadas pela trava <journal>.lock e cada processo aplica as linhas
+    novas antes de responder, então qualquer um deles enfileira, consulta e
+    cancela jobs.
+
+    Os jobs rodam um de cada vez, só no processo que tem a trava
+    <journal>.executor; nos outros a thread da fila fica esperando por ela
+    e assume se o executor parar. Ao assumir, jobs que estavam em execução
+    (interrompidos pela queda) voltam para a fila e o journal é reescrito
+    só com o estado atual de cada job.
+
+    A thread executora chama executar(job); a função reporta o andamento
+    com atualizar() e deve consultar cancelado() entre as etapas.
+
+    Args:
+        caminho_journal (str): Arquivo .jsonl do journal.
+        executar (callable): Recebe o dict do job (id e parametros) e retorna
+                             a mensagem final; exceções marcam o job com erro.
+        max_finalizados (int): Jobs finalizados mantidos no histórico.
+        max_linhas (int): Linhas no journal a partir das quais ele é compactado.
+        intervalo_verificacao (float): Segundos entre duas procuras por jobs
+                                       enfileirados por outros processos.
+    """
+
+    def __init__(self, caminho_journal, executar, max_finalizados=50, max_linhas=10000,
+                 intervalo_verificacao=1.0):
+        self.caminho_journal = caminho_journal
+        self.executar = executar
+        self.max_finalizados = max_finalizados
+        self.max_linhas = max_linhas
+        self.intervalo_verificacao = intervalo_verificacao
+
+        self._jobs = {}
+        self._condicao = threading.Condition()
+        self._trava_journal = TravaArquivo(caminho_journal + '.lock')
+        self._trava_executor = TravaArquivo(caminho_journal + '.executor')
+        self._identidade = None  # (st_dev, st_ino) do journal lido: muda quando ele é reescrito
+        self._posicao = 0  # Bytes do journal já aplicados
+        self._linhas = 0
+        self._thread = None
+
+    # ---------- journal ----------
+
+    @contextmanager
+    def _journal(self):
+        """Trava o journal (threads e processos) e aplica as linhas que outros escreveram"""
+        with self._condicao, self._trava_journal:
+            self._sincronizar()
+            yield
+
+    def _sincronizar(self):
+        """Aplica as linhas do journal ainda não lidas por este processo (chamada com a trava)"""
+        try:
+            estado = os.stat(self.caminho_journal)
+        except FileNotFoundError:
+            return
+
+        identidade = (estado.st_dev, estado.st_ino)
+        if identidade != self._identidade or estado.st_size < self._posicao:
+            # Journal reescrito por outro processo: relê do início
+            self._jobs, self._posicao, self._linhas = {}, 0, 0
+            self._identidade = identidade
+        if estado.st_size == self._posicao:
+            return
+
+        with open(self.caminho_journal, 'rb') as f:
+            f.seek(self._posicao)
+            for linha in f:
+                if not linha.endswith(b'\n'):
+                    break  # Última linha cortada por uma queda no meio da escrita
+                self._posicao += len(linha)
+                self._linhas += 1
+                try:
+                    registro = json.loads(linha.decode('utf-8'))
+                except ValueError:
+                    continue
+                job_id = registro.pop('id', None)
+                if job_id is None:
+                    continue
+                self._jobs.setdefault(job_id, {'id': job_id}).update(registro)
+        self._descartar_antigos()
+
+    def _reescrever_journal(self):
+        """Grava um journal novo com o estado atual de cada job (troca atômica)"""
+        temporario = self.caminho_journal + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            for job in self._jobs.values():
+                f.write(json.dumps(job, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.caminho_journal)
+
+        estado = os.stat(self.caminho_journal)
+        self._identidade = (estado.st_dev, estado.st_ino)
+        self._posicao = estado.st_size
+        self._linhas = len(self._jobs)
+
+    def _registrar(self, job_id, **campos):
+        """Aplica campos ao job e acrescenta a mudança ao journal (chamada com a trava)"""
+        campos['atualizado_em'] = time.time()
+        self._jobs.setdefault(job_id, {'id': job_id}).update(campos)
+        with open(self.caminho_journal, 'ab') as f:
+            f.write((json.dumps({'id': job_id, **campos}, ensure_ascii=False) + '\n').encode('utf-8'))
+            f.flush()
+            estado = os.fstat(f.fileno())
+        # O journal estava sincronizado: a linha escrita é a última
+        self._identidade = (estado.st_dev, estado.st_ino)
+        self._posicao = estado.st_size
+        self._linhas += 1
+
+        # Cada atualização de progresso é uma linha: compacta de tempos em tempos
+        if self._linhas > self.max_linhas:
+            self._reescrever_journal()
+
+    def _descartar_antigos(self):
+        finalizados = [job for job in self._jobs.values() if job.get('estado') in ESTADOS_FINAIS]
+        finalizados.sort(key=lambda job: job.get('atualizado_em', 0))
+        for job in finalizados[:max(0, len(finalizados) - self.max_finalizados)]:
+            del self._jobs[job['id']]
+
+    # ---------- ciclo de vida ----------
+
+    def iniciar(self):
+        """Inicia a thread da fila: executa os jobs ou espera a vez deste processo"""
+        with self._condicao:
+            if self._thread is not None:
+                return
+
+            diretorio = os.path.dirname(self.caminho_journal)
+            if diretorio:
+                os.makedirs(diretorio, exist_ok=True)
+
+            self._thread = threading.Thread(target=self._trabalhar, daemon=True)
+            self._thread.start()
+
+    def _assumir(self):
+        """Processo executor novo: retoma os jobs que o anterior deixou em execução"""
+        with self._journal():
+            for job in self._jobs.values():
+                if job.get('estado') != EXECUTANDO:
+                    continue
+                if job.get('cancelamento_solicitado'):
+                    job.update(estado=CANCELADO, finalizado_em=time.time(),
+                               status_message='Processamento interrompido pelo usuário')
+                else:
+                    job.update(estado=PENDENTE, retomado=True,
+                               status_message='Retomado após reinício do servidor')
+            self._descartar_antigos()
+            self._reescrever_journal()
+
+    def _proximo(self):
+        """Marca como em execução o job pendente mais antigo (de qualquer processo)"""
+        with self._journal():
+            pendentes = [job for job in self._jobs.values() if job.get('estado') == PENDENTE]
+            if not pendentes:
+                return None
+            job_id = min(pendentes, key=lambda job: job.get('criado_em', 0))['id']
+            self._registrar(job_id, estado=EXECUTANDO, iniciado_em=time.time())
+            return dict(self._jobs[job_id])
+
+    def _trabalhar(self):
+        # Um único executor: os outros processos ficam bloqueados aqui
+        self._trava_executor.adquirir()
+        self._assumir()
+
+        while True:
+            job = self._proximo()
+            if job is None:
+                with self._condicao:
+                    self._condicao.wait(self.intervalo_verificacao)
+                continue
+
+            try:
+                mensagem = self.executar(job)
+                final = {'estado': CONCLUIDO, 'progresso': 100, 'status_message': mensagem}
+            except JobCancelado:
+                final = {'estado': CANCELADO, 'status_message': 'Processamento interrompido pelo usuário'}
+            except Exception as e:
+                final = {'estado': ERRO, 'status_message': f'Erro durante processamento: {str(e)}'}
+
+            with self._journal():
+                self._registrar(job['id'], finalizado_em=time.time(), **final)
+
+    # ---------- API ----------
+
+    def enfileirar(self, parametros):
+        """Cria um job pendente e retorna o seu id"""
+        self.iniciar()
+        job_id = uuid.uuid4().hex[:12]
+        with self._journal():
+            self._registrar(job_id, parametros=parametros, estado=PENDENTE, criado_em=time.time(),
+                            progresso=0, status_message='Aguardando na fila')
+            self._condicao.notify()
+        return job_id
+
+    def atualizar(self, job_id, **campos):
+        """Registra o andamento de um job (progresso, contadores, mensagem)"""
+        with self._journal():
+            if job_id in self._jobs:
+                self._registrar(job_id, **campos)
+
+    def cancelar(self, job_id):
+        """Cancela um job pendente ou em execução; retorna False se já terminou
+
+        Um job em execução recebe o pedido de cancelamento no journal; o
+        executor, em qualquer processo, o interrompe na próxima etapa.
+        """
+        with self._journal():
+            job = self._jobs.get(job_id)
+            if job is None or job.get('estado') in ESTADOS_FINAIS:
+                return False
+
+            if job.get('estado') == PENDENTE:
+                self._registrar(job_id, estado=CANCELADO, finalizado_em=time.time(),
+                                status_message='Cancelado antes de iniciar')
+            else:
+                self._registrar(job_id, cancelamento_solicitado=True)
+            return True
+
+    def cancelado(self, job_id):
+        with self._journal():
+            return bool(self._jobs.get(job_id, {}).get('cancelamento_solicitado'))
+
+    def obter(self, job_id):
+        """Cópia do estado de um job, ou None"""
+        with self._journal():
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def listar(self):
+        """Todos os jobs conhecidos, do mais recente para o mais antigo"""
+        with self._journal():
+            jobs = [dict(job) for job in self._jobs.values()]
+        return sorted(jobs, key=lambda job: job.get('criado_em', 0), reverse=True)
+
+    def ativos(self):
+        """Jobs pendentes ou em execução"""
+        return [job for job in self.listar() if job.get('estado') not in ESTADOS_FINAIS]
@@ -0,0 +1,409 @@
+import numpy as np
+
+# Acima deste tamanho a galeria automática passa a usar o índice IVF
+LIMIAR_IVF = 100000
+
+# Formatos de armazenamento da matriz da galeria (bytes por dimensão: 4, 2, 1)
+PRECISOES = ('float32', 'float16', 'int8')
+
+
+class GaleriaFaces:
+    """Galeria de embeddings conhecidos para busca por vizinho mais próximo
+
+    Os embeddings são normalizados (L2) uma única vez no carregamento e
+    guardados em uma matriz float32 contígua. Assim a distância de cosseno
+    de todas as faces de um frame contra toda a galeria sai de um único
+    produto de matrizes.
+
+    Uma matriz float32 já normalizada (como o memmap do armazenamento de
+    embeddings) é usada sem cópia. Linhas com ativos=False são ignoradas
+    na busca.
+
+    Com precisao='float16' ou 'int8' a matriz fica guardada compactada
+    (2x ou ~4x menor); a busca converte blocos de linhas para float32 e
+    acumula os produtos em float32. No int8 cada linha tem a sua escala
+    (maior valor absoluto / 127).
+    """
+
+    def __init__(self, embeddings, nomes, ativos=None, precisao='float32'):
+        self.nomes = list(nomes)
+        self.precisao = precisao
+        self.matriz, self.escalas = quantizar(normalizar_embeddings(embeddings), precisao)
+
+        if self.matriz.shape[0] != len(self.nomes):
+            raise ValueError('Quantidade de embeddings e de nomes não confere')
+
+        if ativos is None:
+            self.ativos = np.ones(len(self.nomes), dtype=bool)
+        else:
+            self.ativos = np.asarray(ativos, dtype=bool)
+        self.removidos = np.flatnonzero(~self.ativos)
+
+    def __len__(self):
+        return self.matriz.shape[0]
+
+    def memoria(self):
+        """Bytes ocupados pelos vetores da galeria (matriz e escalas)"""
+        return self.matriz.nbytes + (0 if self.escalas is None else self.escalas.nbytes)
+
+    def vetores(self, linhas):
+        """Linhas da galeria em float32 (desquantizadas)"""
+        return desquantizar(self.matriz[linhas], None if self.escalas is None else self.escalas[linhas])
+
+    def buscar(self, consultas, k=1):
+        """Busca os k vizinhos mais próximos de cada consulta
+
+        Args:
+            consultas (array-like): Embeddings das faces, formato (n, d) ou (d,).
+            k (int): Número de vizinhos retornados por face.
+
+        Returns:
+            tuple: (indices, distancias), ambos com formato (n, k), ordenados
+                   da menor para a maior distância de cosseno.
+        """
+        consultas = normalizar_embeddings(consultas)
+        n = consultas.shape[0]
+
+        if n == 0 or len(self) == 0:
+            return resultado_vazio(n, k)
+
+        k = min(k, len(self))
+        similaridades = produto_quantizado(consultas, self.matriz, self.escalas)
+
+        # Linhas removidas ficam com a maior distância de cosseno possível (2)
+        if len(self.removidos):
+            similaridades[:, self.removidos] = -1.0
+
+        if k == 1:
+            indices = np.argmax(similaridades, axis=1)[:, None]
+        else:
+            # argpartition evita ordenar a galeria inteira
+            indices = np.argpartition(-similaridades, k - 1, axis=1)[:, :k]
+            ordem = np.argsort(-np.take_along_axis(similaridades, indices, axis=1), axis=1)
+            indices = np.take_along_axis(indices, ordem, axis=1)
+
+        distancias = 1.0 - np.take_along_axis(similaridades, indices, axis=1)
+        return indices, distancias
+
+    def nome(self, indice):
+        """Retorna o nome associado a um índice da galeria"""
+        return self.nomes[indice]
+
+
+class GaleriaIVF(GaleriaFaces):
+    """Galeria com índice aproximado do tipo IVF (inverted file)
+
+    Os embeddings são agrupados por k-means esférico em n_listas células.
+    Cada consulta só é comparada com os embeddings das n_sondas células de
+    centróide mais próximo, trocando um pouco de recall por uma busca que
+    cresce com N / n_listas * n_sondas em vez de N.
+    """
+
+    def __init__(self, embeddings, nomes, ativos=None, n_listas=None, n_sondas=8, iteracoes=10, semente=0,
+                 precisao='float32'):
+        super().__init__(embeddings, nomes, ativos, precisao)
+
+        total = int(self.ativos.sum())
+        if n_listas is None:
+            n_listas = int(4 * np.sqrt(total))
+        self.n_listas = max(1, min(n_listas, total))
+        self.n_sondas = max(1, min(n_sondas, self.n_listas))
+
+        self.centroides = self._treinar_centroides(iteracoes, semente)
+        linhas_ativas = np.flatnonzero(self.ativos)
+        celulas = self._atribuir(linhas_ativas)
+
+        # Reordenar a matriz para que cada célula fique contígua na memória
+        self.ordem = linhas_ativas[np.argsort(celulas, kind='stable')]
+        self.matriz_listas = np.ascontiguousarray(self.matriz[self.ordem])
+        self.escalas_listas = None if self.escalas is None else self.escalas[self.ordem]
+        contagem = np.bincount(celulas, minlength=self.n_listas)
+        self.inicios = np.concatenate(([0], np.cumsum(contagem)))
+
+    def _treinar_centroides(self, iteracoes, semente):
+        """K-means esférico sobre uma amostra da galeria"""
+        rng = np.random.default_rng(semente)
+        linhas_ativas = np.flatnonzero(self.ativos)
+        total = len(linhas_ativas)
+        if total == 0:
+            return np.empty((0, self.matriz.shape[1]), dtype=np.float32)
+
+        tamanho_amostra = min(total, 64 * self.n_listas)
+        amostra = self.vetores(rng.choice(linhas_ativas, tamanho_amostra, replace=False))
+        return kmeans_esferico(amostra, self.n_listas, iteracoes, rng)
+
+    def _atribuir(self, linhas, tamanho_bloco=16384):
+        """Retorna a célula de cada linha, processando em blocos para limitar memória"""
+        celulas = np.empty(len(linhas), dtype=np.int64)
+        for inicio in range(0, len(linhas), tamanho_bloco):
+            bloco = self.vetores(linhas[inicio:inicio + tamanho_bloco])
+            celulas[inicio:inicio + tamanho_bloco] = np.argmax(bloco @ self.centroides.T, axis=1)
+        return celulas
+
+    def buscar(self, consultas, k=1):
+        """Busca aproximada dos k vizinhos mais próximos (mesma interface da GaleriaFaces)"""
+        consultas = normalizar_embeddings(consultas)
+        n = consultas.shape[0]
+
+        if n == 0 or len(self.ordem) == 0:
+            return resultado_vazio(n, k)
+
+        k = min(k, len(self))
+        indices, distancias = resultado_vazio(n, k)
+
+        sondas = np.argsort(-(consultas @ self.centroides.T), axis=1)[:, :self.n_sondas]
+
+        for q in range(n):
+            posicoes = np.concatenate([np.arange(self.inicios[c], self.inicios[c + 1]) for c in sondas[q]])
+            if len(posicoes) == 0:
+                continue
+
+            escalas = None if self.escalas_listas is None else self.escalas_listas[posicoes]
+            similaridades = produto_quantizado(consultas[q:q + 1], self.matriz_listas[posicoes], escalas)[0]
+            kq = min(k, len(posicoes))
+            melhores = np.argpartition(-similaridades, kq - 1)[:kq]
+            melhores = melhores[np.argsort(-similaridades[melhores])]
+
+            indices[q, :kq] = self.ordem[posicoes[melhores]]
+            distancias[q, :kq] = 1.0 - similaridades[melhores]
+
+        return indices, distancias
+
+
+class GaleriaPrototipos(GaleriaFaces):
+    """Galeria em dois estágios: protótipos por pessoa, depois busca exata
+
+    Cada pessoa é resumida em até max_prototipos vetores (a média dos seus
+    embeddings ou centróides de k-means). A consulta é comparada primeiro
+    com os protótipos; só os embeddings das n_candidatos pessoas mais
+    próximas entram na busca exata. O custo passa a crescer com o número de
+    pessoas em vez do número de fotos, e o resultado continua sendo um
+    índice da galeria completa.
+
+    Protótipos já calculados (por exemplo, salvos pelo armazenamento) podem
+    ser passados prontos; senão são calculados aqui.
+    """
+
+    def __init__(self, embeddings, nomes, ativos=None, prototipos=None, nomes_prototipos=None,
+                 max_prototipos=3, n_candidatos=3, precisao='float32'):
+        super().__init__(embeddings, nomes, ativos, precisao)
+        self.n_candidatos = max(1, n_candidatos)
+
+        if prototipos is None:
+            prototipos, nomes_prototipos = calcular_prototipos(self.vetores(slice(None)), self.nomes,
+                                                               self.ativos, max_prototipos)
+        prototipos = normalizar_embeddings(prototipos)
+
+        # Linhas ativas de cada pessoa, na ordem da lista de pessoas
+        linhas_por_pessoa = {}
+        for linha in np.flatnonzero(self.ativos):
+            linhas_por_pessoa.setdefault(self.nomes[linha], []).append(linha)
+        self.pessoas = sorted(linhas_por_pessoa)
+        self.linhas_pessoa = [np.array(linhas_por_pessoa[nome], dtype=np.int64) for nome in self.pessoas]
+
+        # Protótipos recebidos podem estar desatualizados: os de pessoas que
+        # saíram são descartados e quem não tem protótipo recebe a média
+        posicao = {nome: i for i, nome in enumerate(self.pessoas)}
+        pessoa_prototipo = np.array([posicao.get(nome, -1) for nome in nomes_prototipos], dtype=np.int64)
+        validos = pessoa_prototipo >= 0
+        prototipos, pessoa_prototipo = prototipos[validos], pessoa_prototipo[validos]
+
+        sem_prototipo = np.setdiff1d(np.arange(len(self.pessoas)), pessoa_prototipo)
+        if len(sem_prototipo):
+            medias = normalizar_embeddings([self.vetores(self.linhas_pessoa[p]).mean(axis=0) for p in sem_prototipo])
+            prototipos = np.concatenate([prototipos, medias])
+            pessoa_prototipo = np.concatenate([pessoa_prototipo, sem_prototipo])
+
+        # Protótipos agrupados por pessoa: o máximo de cada grupo sai de um reduceat
+        ordem = np.argsort(pessoa_prototipo, kind='stable')
+        self.prototipos = np.ascontiguousarray(prototipos[ordem])
+        self.inicios_pessoa = np.searchsorted(pessoa_prototipo[ordem], np.arange(len(self.pessoas)))
+
+    def buscar(self, consultas, k=1):
+        """Busca em dois estágios (mesma interface da GaleriaFaces)"""
+        consultas = normalizar_embeddings(consultas)
+        n = consultas.shape[0]
+
+        if n == 0 or not self.pessoas:
+            return resultado_vazio(n, k)
+
+        k = min(k, len(self))
+        indices, distancias = resultado_vazio(n, k)
+
+        # Similaridade de cada pessoa = a do seu protótipo mais próximo
+        por_pessoa = np.maximum.reduceat(consultas @ self.prototipos.T, self.inicios_pessoa, axis=1)
+
+        n_candidatos = min(self.n_candidatos, len(self.pessoas))
+        candidatas = np.argpartition(-por_pessoa, n_candidatos - 1, axis=1)[:, :n_candidatos]
+
+        for q in range(n):
+            linhas = np.concatenate([self.linhas_pessoa[p] for p in candidatas[q]])
+            escalas = None if self.escalas is None else self.escalas[linhas]
+            similaridades = produto_quantizado(consultas[q:q + 1], self.matriz[linhas], escalas)[0]
+            kq = min(k, len(linhas))
+            melhores = np.argpartition(-similaridades, kq - 1)[:kq]
+            melhores = melhores[np.argsort(-similaridades[melhores])]
+
+            indices[q, :kq] = linhas[melhores]
+            distancias[q, :kq] = 1.0 - similaridades[melhores]
+
+        return indices, distancias
+
+
+def calcular_prototipos(embeddings, nomes, ativos=None, max_prototipos=3, iteracoes=10, semente=0):
+    """Resume os embeddings de cada pessoa em até max_prototipos vetores
+
+    Com um protótipo (ou poucas fotos) o resumo é a média normalizada;
+    com mais, os centróides de um k-means esférico sobre as fotos da pessoa,
+    o que preserva variações como óculos ou iluminação diferente.
+
+    Returns:
+        tuple: (prototipos, nomes_prototipos) — matriz float32 normalizada
+               (m, d) e o nome da pessoa de cada linha.
+    """
+    matriz = normalizar_embeddings(embeddings)
+    if ativos is None:
+        ativos = np.ones(len(nomes), dtype=bool)
+
+    linhas_por_pessoa = {}
+    for linha in np.flatnonzero(ativos):
+        linhas_por_pessoa.setdefault(nomes[linha], []).append(linha)
+
+    rng = np.random.default_rng(semente)
+    prototipos, nomes_prototipos = [], []
+    for nome in sorted(linhas_por_pessoa):
+        fotos = matriz[linhas_por_pessoa[nome]]
+        # Cada centróide precisa de algumas fotos para não virar uma foto isolada
+        k = min(max_prototipos, len(fotos) // 3)
+        if k <= 1:
+            centroides = normalizar_embeddings(fotos.mean(axis=0))
+        else:
+            centroides = kmeans_esferico(fotos, k, iteracoes, rng)
+        prototipos.append(centroides)
+        nomes_prototipos.extend([nome] * len(centroides))
+
+    if not prototipos:
+        return np.empty((0, matriz.shape[1]), dtype=np.float32), []
+    return np.concatenate(prototipos), nomes_prototipos
+
+
+def kmeans_esferico(amostra, k, iteracoes, rng):
+    """Centróides (norma 1) de um k-means por similaridade de cosseno
+
+    Args:
+        amostra (np.ndarray): Linhas normalizadas, formato (n, d), n >= k.
+        k (int): Número de centróides.
+        iteracoes (int): Iterações de Lloyd.
+        rng (np.random.Generator): Gerador usado na inicialização.
+    """
+    tamanho_amostra = amostra.shape[0]
+    centroides = amostra[rng.choice(tamanho_amostra, k, replace=False)].copy()
+
+    for _ in range(iteracoes):
+        celulas = np.argmax(amostra @ centroides.T, axis=1)
+        somas = np.zeros_like(centroides)
+        np.add.at(somas, celulas, amostra)
+
+        # Células vazias reiniciam em pontos aleatórios da amostra
+        vazias = np.bincount(celulas, minlength=k) == 0
+        somas[vazias] = amostra[rng.integers(tamanho_amostra, size=int(vazias.sum()))]
+        centroides = normalizar_embeddings(somas)
+
+    return centroides
+
+
+def criar_galeria(embeddings, nomes, tipo='auto', ativos=None, precisao='float32', **opcoes):
+    """Cria a galeria de busca adequada ao tamanho do banco de embeddings
+
+    Args:
+        embeddings (array-like): Embeddings conhecidos, formato (n, d).
+        nomes (list): Nome de cada embedding.
+        tipo (str): 'exato', 'ivf', 'prototipos' ou 'auto' (IVF a partir de
+                    LIMIAR_IVF embeddings).
+        ativos (array-like, optional): Máscara das linhas válidas (False = removida).
+        precisao (str): Armazenamento da matriz: 'float32', 'float16' ou 'int8'.
+        **opcoes: Parâmetros repassados ao índice IVF (n_listas, n_sondas...)
+                  ou à galeria de protótipos (prototipos, n_candidatos...).
+    """
+    if tipo == 'auto':
+        tipo = 'ivf' if len(nomes) >= LIMIAR_IVF else 'exato'
+
+    if tipo == 'ivf':
+        return GaleriaIVF(embeddings, nomes, ativos, precisao=precisao, **opcoes)
+    if tipo == 'prototipos':
+        return GaleriaPrototipos(embeddings, nomes, ativos, precisao=precisao, **opcoes)
+    if tipo == 'exato':
+        return GaleriaFaces(embeddings, nomes, ativos, precisao)
+
+    raise ValueError(f'Tipo de galeria desconhecido: {tipo}')
+
+
+def quantizar(matriz, precisao):
+    """Converte a matriz normalizada para o formato de armazenamento
+
+    Returns:
+        tuple: (dados, escalas) — escalas (float32, uma por linha) só no int8.
+    """
+    if precisao == 'float32':
+        return matriz, None
+    if precisao == 'float16':
+        return matriz.astype(np.float16), None
+    if precisao == 'int8':
+        escalas = np.abs(matriz).max(axis=1) / 127.0 if matriz.size else np.empty(0, dtype=np.float32)
+        escalas[escalas == 0] = 1.0
+        dados = np.round(matriz / escalas[:, None]).astype(np.int8)
+        return dados, escalas.astype(np.float32)
+    raise ValueError(f'Precisão desconhecida: {precisao}')
+
+
+def desquantizar(dados, escalas):
+    """Volta linhas armazenadas para float32"""
+    matriz = dados.astype(np.float32)
+    if escalas is not None:
+        matriz *= escalas[:, None]
+    return matriz
+
+
+def produto_quantizado(consultas, dados, escalas, tamanho_bloco=16384):
+    """Similaridades consultas @ dados.T com acumulação em float32
+
+    Matrizes float16/int8 são convertidas em blocos de linhas, para não
+    criar uma cópia float32 da galeria inteira a cada busca. No int8 a
+    escala de cada linha é aplicada depois do produto.
+    """
+    if dados.dtype == np.float32:
+        return consultas @ dados.T
+
+    similaridades = np.empty((consultas.shape[0], dados.shape[0]), dtype=np.float32)
+    for inicio in range(0, dados.shape[0], tamanho_bloco):
+        bloco = dados[inicio:inicio + tamanho_bloco].astype(np.float32)
+        similaridades[:, inicio:inicio + tamanho_bloco] = consultas @ bloco.T
+    if escalas is not None:
+        similaridades *= escalas
+    return similaridades
+
+
+def resultado_vazio(n, k):
+    """Resultado de busca sem candidatos: índice -1 e distância máxima (2)"""
+    return (np.full((n, k), -1, dtype=np.int64),
+            np.full((n, k), 2.0, dtype=np.float32))
+
+
+def normalizar_embeddings(embeddings):
+    """Converte para matriz float32 contígua com linhas de norma 1
+
+    Se a entrada já for float32 contígua e normalizada, é devolvida sem cópia.
+    """
+    matriz = np.asarray(embeddings, dtype=np.float32)
+    if matriz.size == 0:
+        return np.empty((0, matriz.shape[-1] if matriz.ndim == 2 else 0), dtype=np.float32)
+    if matriz.ndim == 1:
+        matriz = matriz[None, :]
+
+    # einsum calcula as normas sem criar uma cópia temporária da matriz
+    normas = np.sqrt(np.einsum('ij,ij->i', matriz, matriz))[:, None]
+    if matriz.flags['C_CONTIGUOUS'] and np.allclose(normas, 1.0, atol=1e-4):
+        return matriz
+
+    normas[normas == 0] = 1.0
+    return np.ascontiguousarray(matriz / normas)
@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+
+# Observação de diretórios por eventos do sistema (inotify/FSEvents/ReadDirectoryChangesW)
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    watchdog_disponivel = True
+except ImportError:
+    watchdog_disponivel = False
+    print("watchdog não encontrado (opcional). Instale com: pip install watchdog")
+
+EXTENSOES_IMAGEM = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def chave_ordenacao_foto(nome_arquivo):
+    """Fotos numeradas (1.jpg, 2.jpg, ...) em ordem numérica, as demais pelo nome"""
+    base = os.path.splitext(nome_arquivo)[0]
+    return (0, int(base), '') if base.isdigit() else (1, 0, nome_arquivo)
+
+
+class _Pasta:
+    """Listagem em cache de uma pasta de imagens"""
+
+    def __init__(self):
+        self.mtime = None  # mtime_ns da pasta na última listagem
+        self.itens = []  # (nome, ctime) ordenados
+        self.verificada_em = 0.0
+
+
+class IndiceFotos:
+    """Índice em memória das pessoas e fotos de data/
+
+    Cada pasta é listada uma vez e guardada com o mtime do diretório; criar,
+    apagar ou renomear um arquivo muda esse mtime e a pasta é relistada na
+    próxima consulta. As verificações de mtime acontecem no máximo a cada
+    intervalo_verificacao segundos por pasta. Com o watchdog instalado, os
+    eventos do sistema de arquivos marcam as pastas alteradas e nem o stat
+    é necessário.
+
+    Args:
+        raiz (str): Pasta com uma subpasta por pessoa.
+        pastas_internas (set): Subpastas geradas pelo sistema (não são pessoas).
+        intervalo_verificacao (float): Segundos entre dois stat da mesma pasta.
+    """
+
+    def __init__(self, raiz='data', pastas_internas=(), intervalo_verificacao=1.0):
+        self.raiz = raiz
+        self.pastas_internas = set(pastas_internas)
+        self.intervalo_verificacao = intervalo_verificacao
+
+        self._lock = threading.Lock()
+        self._raiz = _Pasta()  # Itens: (nome_subpasta, 0)
+        self._pastas = {}
+        self._sujas = set()
+        self._observador = None
+
+    # ---------- observação ----------
+
+    def observar(self):
+        """Passa a usar eventos do sistema de arquivos, se o watchdog estiver disponível"""
+        if not watchdog_disponivel or self._observador is not None or not os.path.isdir(self.raiz):
+            return self._observador is not None
+
+        indice = self
+
+        class _Eventos(FileSystemEventHandler):
+            def on_any_event(self, evento):
+                caminhos = [evento.src_path, getattr(evento, 'dest_path', '')]
+                with indice._lock:
+                    for caminho in caminhos:
+                        if caminho:
+                            indice._marcar_suja(caminho)
+
+        observador = Observer()
+        observador.schedule(_Eventos(), self.raiz, recursive=True)
+        observador.daemon = True
+        observador.start()
+        self._observador = observador
+        return True
+
+    def _marcar_suja(self, caminho):
+        relativo = os.path.relpath(caminho, self.raiz)
+        partes = relativo.split(os.sep)
+        if partes[0] in ('.', '..'):
+            return
+        if len(partes) == 1:
+            self._sujas.add(None)  # Pasta criada, apagada ou renomeada na raiz
+        self._sujas.add(partes[0])
+
+    # ---------- atualização ----------
+
+    def invalidar(self, nome_pasta):
+        """Força a verificação de uma pasta alterada pelo próprio app na próxima consulta"""
+        with self._lock:
+            self._sujas.update((None, nome_pasta))
+
+    def _precisa_verificar(self, chave, pasta):
+        if pasta.mtime is None or chave in self._sujas:
+            return True
+        if self._observador is not None:
+            return False
+        return time.monotonic() - pasta.verificada_em >= self.intervalo_verificacao
+
+    def _atualizar(self, chave, caminho, pasta, listar):
+        """Relista a pasta se o mtime mudou desde a última listagem"""
+        if not self._precisa_verificar(chave, pasta):
+            return
+        self._sujas.discard(chave)
+        pasta.verificada_em = time.monotonic()
+
+        try:
+            mtime = os.stat(caminho).st_mtime_ns
+        except OSError:
+            pasta.mtime, pasta.itens = None, []
+            return
+
+        if mtime != pasta.mtime:
+            pasta.itens = listar(caminho)
+            pasta.mtime = mtime
+
+    @staticmethod
+    def _listar_fotos(caminho):
+        fotos = []
+        with os.scandir(caminho) as entradas:
+            for entrada in entradas:
+                if entrada.name.lower().endswith(EXTENSOES_IMAGEM) and entrada.is_file():
+                    fotos.append((entrada.name, entrada.stat().st_ctime))
+        fotos.sort(key=lambda foto: chave_ordenacao_foto(foto[0]))
+        return fotos
+
+    @staticmethod
+    def _listar_subpastas(caminho):
+        with os.scandir(caminho) as entradas:
+            return sorted((entrada.name, 0) for entrada in entradas if entrada.is_dir())
+
+    def _subpastas(self):
+        self._atualizar(None, self.raiz, self._raiz, self._listar_subpastas)
+        return [nome for nome, _ in self._raiz.itens]
+
+    def _fotos_da_pasta(self, nome_pasta):
+        pasta = self._pastas.setdefault(nome_pasta, _Pasta())
+        self._atualizar(nome_pasta, os.path.join(self.raiz, nome_pasta), pasta, self._listar_fotos)
+        return pasta.itens
+
+    # ---------- consultas ----------
+
+    def pessoas(self):
+        """Lista (nome, total_fotos) das pastas de pessoas"""
+        with self._lock:
+            subpastas = self._subpastas()
+
+            # Pastas apagadas saem do cache
+            for nome in set(self._pastas) - set(subpastas):
+                del self._pastas[nome]
+
+            return [(nome, len(self._fotos_da_pasta(nome)))
+                    for nome in subpastas if nome not in self.pastas_internas]
+
+    def fotos(self, nome_pessoa):
+        """Lista (nome_arquivo, ctime) das fotos de uma pessoa, ou None se a pasta não existe"""
+        with self._lock:
+            if nome_pessoa not in self._subpastas():
+                return None
+            return list(self._fotos_da_pasta(nome_pessoa))
+
+    def contar(self, nome_pasta):
+        """Quantidade de imagens em uma subpasta (inclusive as internas)"""
+        with self._lock:
+            if nome_pasta not in self._subpastas():
+                return 0
+            return len(self._fotos_da_pasta(nome_pasta))
@@ -0,0 +1,161 @@
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Quantis publicados para cada série de amostras
+QUANTIS = (0.5, 0.95, 0.99)
+
+
+class JanelaAmostras:
+    """Últimas amostras de uma série, para quantis que acompanham a carga atual
+
+    Guarda no máximo `tamanho` valores; contagem e soma acumulam desde o
+    início, como no summary do Prometheus.
+    """
+
+    def __init__(self, tamanho=1024):
+        self.amostras = deque(maxlen=tamanho)
+        self.contagem = 0
+        self.soma = 0.0
+
+    def adicionar(self, valor):
+        self.amostras.append(valor)
+        self.contagem += 1
+        self.soma += valor
+
+    def quantis(self, quantis=QUANTIS):
+        if not self.amostras:
+            return [float('nan')] * len(quantis)
+        return np.quantile(np.fromiter(self.amostras, dtype=np.float64), quantis).tolist()
+
+
+class Metricas:
+    """Contadores, medidores e latências por etapa, exportados no formato do Prometheus
+
+    Cada métrica tem um nome e, opcionalmente, rótulos (ex.: estagio="deteccao").
+    Amostras (observar/cronometrar) viram um summary com p50/p95/p99 da
+    janela recente; contadores só crescem; medidores guardam o último valor.
+
+    Args:
+        prefixo (str): Prefixo dos nomes exportados.
+        tamanho_janela (int): Amostras mantidas por série para os quantis.
+    """
+
+    def __init__(self, prefixo='reconhecimento', tamanho_janela=1024):
+        self.prefixo = prefixo
+        self.tamanho_janela = tamanho_janela
+        self._lock = threading.Lock()
+        self._tipos = {}  # nome -> 'summary' | 'counter' | 'gauge'
+        self._descricoes = {}
+        self._series = {}  # (nome, rótulos) -> JanelaAmostras | float
+
+    def descrever(self, nome, tipo, descricao):
+        """Declara o tipo e o texto de ajuda (# HELP) de uma métrica"""
+        with self._lock:
+            self._tipos[nome] = tipo
+            self._descricoes[nome] = descricao
+
+    def _chave(self, nome, tipo, rotulos):
+        self._tipos.setdefault(nome, tipo)
+        return nome, tuple(sorted(rotulos.items()))
+
+    def observar(self, nome, valor, **rotulos):
+        """Acrescenta uma amostra à série (summary)"""
+        with self._lock:
+            chave = self._chave(nome, 'summary', rotulos)
+            janela = self._series.get(chave)
+            if janela is None:
+                janela = self._series[chave] = JanelaAmostras(self.tamanho_janela)
+            janela.adicionar(float(valor))
+
+    @contextmanager
+    def cronometrar(self, estagio):
+        """with metricas.cronometrar('deteccao'): ... — registra a duração em segundos"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar('estagio_segundos', time.perf_counter() - inicio, estagio=estagio)
+
+    def incrementar(self, nome, valor=1, **rotulos):
+        """Soma ao contador"""
+        with self._lock:
+            chave = self._chave(nome, 'counter', rotulos)
+            self._series[chave] = self._series.get(chave, 0) + valor
+
+    def definir(self, nome, valor, **rotulos):
+        """Atualiza o medidor"""
+        with self._lock:
+            self._series[self._chave(nome, 'gauge', rotulos)] = float(valor)
+
+    def estatisticas(self, nome):
+        """Quantis, contagem e média de cada série de amostras de uma métrica
+
+        Returns:
+            dict: {rótulos (tupla de pares): {'p50', 'p95', 'p99', 'contagem', 'media'}}
+        """
+        with self._lock:
+            series = {rotulos: janela for (nome_serie, rotulos), janela in self._series.items()
+                      if nome_serie == nome and isinstance(janela, JanelaAmostras)}
+            resultado = {}
+            for rotulos, janela in series.items():
+                p50, p95, p99 = janela.quantis((0.5, 0.95, 0.99))
+                resultado[rotulos] = {'p50': p50, 'p95': p95, 'p99': p99, 'contagem': janela.contagem,
+                                      'media': janela.soma / janela.contagem if janela.contagem else 0.0}
+        return resultado
+
+    def formato_prometheus(self):
+        """Texto no formato de exposição do Prometheus (text/plain; version=0.0.4)"""
+        with self._lock:
+            por_nome = {}
+            for (nome, rotulos), valor in self._series.items():
+                if isinstance(valor, JanelaAmostras):
+                    valor = (valor.quantis(), valor.contagem, valor.soma)
+                por_nome.setdefault(nome, []).append((rotulos, valor))
+            tipos = dict(self._tipos)
+            descricoes = dict(self._descricoes)
+
+        linhas = []
+        for nome in sorted(por_nome):
+            completo = f'{self.prefixo}_{nome}'
+            if nome in descricoes:
+                linhas.append(f'# HELP {completo} {descricoes[nome]}')
+            linhas.append(f'# TYPE {completo} {tipos[nome]}')
+
+            for rotulos, valor in sorted(por_nome[nome]):
+                if tipos[nome] == 'summary':
+                    valores_quantis, contagem, soma = valor
+                    for quantil, valor_quantil in zip(QUANTIS, valores_quantis):
+                        texto = _rotulos(rotulos + (('quantile', str(quantil)),))
+                        linhas.append(f'{completo}{texto} {_numero(valor_quantil)}')
+                    linhas.append(f'{completo}_sum{_rotulos(rotulos)} {_numero(soma)}')
+                    linhas.append(f'{completo}_count{_rotulos(rotulos)} {contagem}')
+                else:
+                    linhas.append(f'{completo}{_rotulos(rotulos)} {_numero(valor)}')
+
+        return '\n'.join(linhas) + '\n'
+
+
+def _numero(valor):
+    """Valor com precisão total: contadores grandes não podem virar 1.23457e+06"""
+    valor = float(valor)
+    if math.isnan(valor):
+        return 'NaN'
+    if math.isinf(valor):
+        return '+Inf' if valor > 0 else '-Inf'
+    return repr(valor)
+
+
+def _rotulos(rotulos):
+    if not rotulos:
+        return ''
+    pares = ','.join(f'{chave}="{_escapar(valor)}"' for chave, valor in rotulos)
+    return '{' + pares + '}'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,85 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+
+class AgrupadorLotes:
+    """Agrupa requisições concorrentes em micro-lotes
+
+    Cada chamada a processar() entra em uma fila e espera o resultado. Uma
+    thread trabalhadora junta os itens que chegam dentro de espera_max
+    segundos (até tamanho_max), chama funcao_lote uma única vez com a lista
+    e devolve a cada requisição o seu resultado.
+
+    Args:
+        funcao_lote (callable): Recebe uma lista de itens e retorna uma
+                                lista de resultados na mesma ordem.
+        tamanho_max (int): Máximo de itens por lote.
+        espera_max (float): Tempo máximo, em segundos, que o primeiro item
+                            de um lote espera por companhia.
+        num_trabalhadores (int): Threads executando lotes em paralelo.
+    """
+
+    def __init__(self, funcao_lote, tamanho_max=8, espera_max=0.005, num_trabalhadores=1):
+        self.funcao_lote = funcao_lote
+        self.tamanho_max = tamanho_max
+        self.espera_max = espera_max
+        self._fila = queue.Queue()
+        self._lock = threading.Lock()
+        self._histograma = Counter()
+
+        for _ in range(num_trabalhadores):
+            threading.Thread(target=self._trabalhar, daemon=True).start()
+
+    def processar(self, item, timeout=None):
+        """Envia um item para o próximo lote e bloqueia até o resultado"""
+        futuro = Future()
+        self._fila.put((item, futuro))
+        return futuro.result(timeout)
+
+    def _coletar_lote(self):
+        """Espera o primeiro item e junta os que chegarem até o prazo"""
+        lote = [self._fila.get()]
+        prazo = time.monotonic() + self.espera_max
+
+        while len(lote) < self.tamanho_max:
+            restante = prazo - time.monotonic()
+            try:
+                lote.append(self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _trabalhar(self):
+        while True:
+            lote = self._coletar_lote()
+            itens = [item for item, _ in lote]
+
+            with self._lock:
+                self._histograma[len(lote)] += 1
+
+            try:
+                resultados = self.funcao_lote(itens)
+                for (_, futuro), resultado in zip(lote, resultados):
+                    futuro.set_result(resultado)
+            except Exception as e:
+                for _, futuro in lote:
+                    futuro.set_exception(e)
+
+    def metricas(self):
+        """Tamanhos de lote alcançados: total, média e histograma"""
+        with self._lock:
+            histograma = dict(sorted(self._histograma.items()))
+
+        total_lotes = sum(histograma.values())
+        total_itens = sum(tamanho * quantidade for tamanho, quantidade in histograma.items())
+        return {
+            'tamanho_max': self.tamanho_max,
+            'espera_max_ms': self.espera_max * 1000,
+            'total_lotes': total_lotes,
+            'total_itens': total_itens,
+            'tamanho_medio': total_itens / total_lotes if total_lotes else 0.0,
+            'histograma': {str(tamanho): quantidade for tamanho, quantidade in histograma.items()}
+        }
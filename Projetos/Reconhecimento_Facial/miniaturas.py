@@ -0,0 +1,105 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+
+# Lado maior, em pixels, das miniaturas geradas
+TAMANHOS_MINIATURA = (128, 256, 512)
+
+
+def escolher_tamanho(tamanho_pedido, tamanhos=TAMANHOS_MINIATURA):
+    """Menor tamanho fixo que atende ao pedido (ou o maior disponível)"""
+    for tamanho in sorted(tamanhos):
+        if tamanho >= tamanho_pedido:
+            return tamanho
+    return max(tamanhos)
+
+
+def redimensionar(imagem, lado_maior):
+    """Reduz a imagem para que o lado maior tenha lado_maior pixels (nunca amplia)"""
+    altura, largura = imagem.shape[:2]
+    escala = lado_maior / max(altura, largura)
+    if escala >= 1.0:
+        return imagem
+    tamanho = (max(1, round(largura * escala)), max(1, round(altura * escala)))
+    return cv2.resize(imagem, tamanho, interpolation=cv2.INTER_AREA)
+
+
+class CacheMiniaturas:
+    """Miniaturas JPEG das fotos, geradas sob demanda e guardadas em disco
+
+    Cada miniatura fica em <diretorio>/<tamanho>/<pessoa>/<arquivo>.jpg com
+    o mesmo mtime da foto original. O nome inclui a extensão da foto
+    (foto.png.jpg), para que foto.png e foto.jpg não dividam a miniatura. Se a foto mudar, os mtimes deixam de
+    bater e a miniatura é refeita na próxima requisição; como o mtime vira
+    o Last-Modified (e entra no ETag) da resposta, o navegador também
+    descarta a cópia antiga.
+
+    Args:
+        diretorio (str): Pasta das miniaturas.
+        tamanhos (tuple): Tamanhos fixos permitidos (lado maior, em pixels).
+        qualidade (int): Qualidade JPEG das miniaturas.
+    """
+
+    def __init__(self, diretorio='data/miniaturas', tamanhos=TAMANHOS_MINIATURA, qualidade=85):
+        self.diretorio = diretorio
+        self.tamanhos = tuple(sorted(tamanhos))
+        self.qualidade = qualidade
+        self._lock = threading.Lock()
+        self._gerando = {}  # caminho da miniatura -> Lock (evita gerar duas vezes)
+
+    def caminho(self, tamanho, nome_pessoa, nome_arquivo):
+        return os.path.join(self.diretorio, str(tamanho), nome_pessoa, nome_arquivo + '.jpg')
+
+    def obter(self, caminho_original, nome_pessoa, nome_arquivo, tamanho_pedido):
+        """Caminho da miniatura atualizada da foto, gerando-a se preciso
+
+        Returns:
+            str: Caminho da miniatura, ou None se a foto não pôde ser lida.
+        """
+        tamanho = escolher_tamanho(tamanho_pedido, self.tamanhos)
+        caminho_miniatura = self.caminho(tamanho, nome_pessoa, nome_arquivo)
+        mtime_original = os.stat(caminho_original).st_mtime_ns
+
+        if self._atualizada(caminho_miniatura, mtime_original):
+            return caminho_miniatura
+
+        # Requisições simultâneas da mesma miniatura esperam uma única geração
+        with self._lock:
+            lock = self._gerando.setdefault(caminho_miniatura, threading.Lock())
+        with lock:
+            try:
+                if not self._atualizada(caminho_miniatura, mtime_original):
+                    if not self._gerar(caminho_original, caminho_miniatura, tamanho, mtime_original):
+                        return None
+            finally:
+                with self._lock:
+                    self._gerando.pop(caminho_miniatura, None)
+        return caminho_miniatura
+
+    @staticmethod
+    def _atualizada(caminho_miniatura, mtime_original):
+        try:
+            return os.stat(caminho_miniatura).st_mtime_ns == mtime_original
+        except OSError:
+            return False
+
+    def _gerar(self, caminho_original, caminho_miniatura, tamanho, mtime_original):
+        dados = np.fromfile(caminho_original, dtype=np.uint8)
+        imagem = cv2.imdecode(dados, cv2.IMREAD_COLOR) if dados.size else None
+        if imagem is None:
+            return False
+
+        ret, buffer = cv2.imencode('.jpg', redimensionar(imagem, tamanho),
+                                   [cv2.IMWRITE_JPEG_QUALITY, self.qualidade])
+        if not ret:
+            return False
+
+        # Escrita atômica: quem lê nunca vê uma miniatura pela metade
+        os.makedirs(os.path.dirname(caminho_miniatura), exist_ok=True)
+        temporario = f'{caminho_miniatura}.{threading.get_ident()}.tmp'
+        buffer.tofile(temporario)
+        os.utime(temporario, ns=(mtime_original, mtime_original))
+        os.replace(temporario, caminho_miniatura)
+        return True
@@ -0,0 +1,160 @@
+import math
+import os
+
+import cv2
+import numpy as np
+
+# Menor lado aceito para um recorte de face, em pixels
+TAMANHO_MINIMO_FACE = 40
+
+# Referências da pontuação: acima delas o critério vale 1
+NITIDEZ_REFERENCIA = 150.0  # Variância do Laplaciano no recorte reduzido a 160x160
+TAMANHO_REFERENCIA = 160  # Entrada do FaceNet
+DESVIO_FRONTAL_MAXIMO = 0.25  # Deslocamento dos olhos em relação ao centro, em larguras de face
+
+# Pose usada quando os olhos não são encontrados (nem frontal nem descartada)
+POSE_DESCONHECIDA = 0.3
+
+CAMINHO_CASCADE_OLHOS = os.path.join(cv2.data.haarcascades, 'haarcascade_eye.xml')
+
+_detector_olhos = None
+
+
+def carregar_detector_olhos():
+    """Cascade de olhos do OpenCV (o mesmo do alinhamento 'opencv' do DeepFace)
+
+    Returns:
+        cv2.CascadeClassifier ou None se o cascade não acompanha o OpenCV instalado
+        (sem ele as faces não são giradas e a pose fica em POSE_DESCONHECIDA).
+    """
+    global _detector_olhos
+    if _detector_olhos is None:
+        try:
+            cascade = cv2.CascadeClassifier(CAMINHO_CASCADE_OLHOS)
+            _detector_olhos = cascade if not cascade.empty() else False
+        except (AttributeError, cv2.error):
+            _detector_olhos = False  # Build do OpenCV sem os cascades Haar
+    return _detector_olhos or None
+
+
+def localizar_olhos(face):
+    """Centros (esquerdo, direito) dos olhos no recorte, ou None
+
+    Procura na metade de cima da face e fica com os dois maiores candidatos.
+    """
+    detector = carregar_detector_olhos()
+    if detector is None or face.size == 0:
+        return None
+
+    cinza = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+    metade = cinza[:max(1, cinza.shape[0] // 2)]
+    olhos = detector.detectMultiScale(metade, scaleFactor=1.1, minNeighbors=5)
+    if len(olhos) < 2:
+        return None
+
+    maiores = sorted(olhos, key=lambda olho: olho[2] * olho[3], reverse=True)[:2]
+    centros = sorted((x + w / 2, y + h / 2) for x, y, w, h in maiores)
+    return centros[0], centros[1]
+
+
+def alinhar_face(imagem, box):
+    """Recorta a face com os olhos na horizontal
+
+    A rotação em torno do ponto médio dos olhos lê da imagem inteira (os
+    cantos da face não ficam pretos), mas só os pixels do recorte são
+    calculados: o custo por face não depende do tamanho do frame.
+
+    Returns:
+        tuple: (recorte, olhos) — olhos são os centros no recorte alinhado,
+               ou None quando não foram encontrados (recorte sem rotação).
+    """
+    (startX, startY, endX, endY) = box
+    face = imagem[startY:endY, startX:endX]
+    olhos = localizar_olhos(face)
+    if olhos is None:
+        return face, None
+
+    (xe, ye), (xd, yd) = olhos
+    angulo = math.degrees(math.atan2(yd - ye, xd - xe))
+    centro = (startX + (xe + xd) / 2, startY + (ye + yd) / 2)
+
+    # Translação da caixa na matriz: a saída do warp já é o recorte
+    matriz = cv2.getRotationMatrix2D(centro, angulo, 1.0)
+    matriz[:, 2] -= (startX, startY)
+    alinhada = cv2.warpAffine(imagem, matriz, (endX - startX, endY - startY),
+                              flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+    # Depois da rotação os olhos ficam na altura do centro, mantendo a distância entre eles
+    distancia = math.hypot(xd - xe, yd - ye)
+    cx, cy = centro[0] - startX, centro[1] - startY
+    olhos_alinhados = ((cx - distancia / 2, cy), (cx + distancia / 2, cy))
+    return alinhada, olhos_alinhados
+
+
+def avaliar_face(face, olhos=None):
+    """Pontua a qualidade de um recorte de face entre 0 e 1
+
+    Combina nitidez (variância do Laplaciano), tamanho e pose frontal
+    (posição do ponto médio dos olhos em relação ao centro da face).
+
+    Args:
+        face (np.ndarray): Recorte BGR.
+        olhos: Centros dos olhos no recorte; se None, são procurados.
+
+    Returns:
+        dict: nitidez, tamanho, pose e pontuacao.
+    """
+    altura, largura = face.shape[:2]
+    lado = min(altura, largura)
+
+    cinza = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+    reduzida = cv2.resize(cinza, (TAMANHO_REFERENCIA, TAMANHO_REFERENCIA), interpolation=cv2.INTER_AREA)
+    nitidez = float(cv2.Laplacian(reduzida, cv2.CV_64F).var())
+
+    if olhos is None:
+        olhos = localizar_olhos(face)
+    if olhos is None:
+        pose = POSE_DESCONHECIDA
+    else:
+        meio = (olhos[0][0] + olhos[1][0]) / 2
+        desvio = abs(meio - largura / 2) / largura
+        pose = max(0.0, 1.0 - desvio / DESVIO_FRONTAL_MAXIMO)
+
+    pontuacao = (0.4 * min(1.0, nitidez / NITIDEZ_REFERENCIA)
+                 + 0.2 * min(1.0, lado / TAMANHO_REFERENCIA)
+                 + 0.4 * pose)
+    return {'nitidez': nitidez, 'tamanho': lado, 'pose': pose, 'pontuacao': pontuacao}
+
+
+def selecionar_melhores(itens, max_por_pessoa, pontuacao_minima):
+    """Escolhe os recortes que entram na galeria
+
+    Descarta os recortes abaixo da pontuação mínima e mantém no máximo
+    max_por_pessoa por pessoa, os de maior pontuação. Uma pessoa sem
+    nenhum recorte acima do mínimo fica com o seu melhor recorte.
+
+    Args:
+        itens (list): Tuplas (caminho, pessoa, pontuacao).
+
+    Returns:
+        set: Caminhos selecionados.
+    """
+    por_pessoa = {}
+    for caminho, pessoa, pontuacao in itens:
+        por_pessoa.setdefault(pessoa, []).append((pontuacao, caminho))
+
+    selecionados = set()
+    for recortes in por_pessoa.values():
+        recortes.sort(reverse=True)
+        bons = [caminho for pontuacao, caminho in recortes if pontuacao >= pontuacao_minima]
+        selecionados.update(bons[:max_por_pessoa] or [recortes[0][1]])
+    return selecionados
+
+
+def ler_e_avaliar(caminho):
+    """Pontuação de um recorte salvo em disco, ou None se não puder ser lido"""
+    dados = np.fromfile(caminho, dtype=np.uint8)
+    face = cv2.imdecode(dados, cv2.IMREAD_COLOR) if dados.size else None
+    if face is None:
+        return None
+    return avaliar_face(face)['pontuacao']
@@ -0,0 +1,173 @@
+import itertools
+import threading
+import time
+
+import numpy as np
+
+
+def calcular_iou(box_a, box_b):
+    """Interseção sobre união de duas caixas [startX, startY, endX, endY]"""
+    x1 = max(box_a[0], box_b[0])
+    y1 = max(box_a[1], box_b[1])
+    x2 = min(box_a[2], box_b[2])
+    y2 = min(box_a[3], box_b[3])
+
+    intersecao = max(0, x2 - x1) * max(0, y2 - y1)
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    uniao = area_a + area_b - intersecao
+    return intersecao / uniao if uniao > 0 else 0.0
+
+
+def distancia_centros(box_a, box_b):
+    """Distância entre os centros das caixas, relativa à largura média delas"""
+    centro_a = np.array([(box_a[0] + box_a[2]) / 2, (box_a[1] + box_a[3]) / 2])
+    centro_b = np.array([(box_b[0] + box_b[2]) / 2, (box_b[1] + box_b[3]) / 2])
+    largura = ((box_a[2] - box_a[0]) + (box_b[2] - box_b[0])) / 2
+    return np.linalg.norm(centro_a - centro_b) / max(largura, 1)
+
+
+class Trilha:
+    """Uma face acompanhada entre frames"""
+
+    def __init__(self, trilha_id, box):
+        self.id = trilha_id
+        self.box = box
+        self.box_embedding = None  # Caixa no último embedding calculado
+        self.identidade = None  # Resultado do último reconhecimento
+        self.frames_desde_embedding = 0
+        self.frames_perdida = 0
+
+
+class RastreadorFaces:
+    """Rastreador de faces por IoU/centro para uma sessão de cliente
+
+    Associa as detecções de cada frame às trilhas do frame anterior e guarda
+    a identidade reconhecida de cada trilha. O FaceNet só precisa rodar de
+    novo para uma trilha nova, a cada intervalo_embedding frames ou quando
+    a caixa mudou muito desde o último embedding.
+
+    Args:
+        iou_minimo (float): IoU mínima para associar detecção e trilha.
+        distancia_maxima (float): Associação alternativa pelo centro, em
+                                  larguras de caixa, quando a IoU não basta.
+        intervalo_embedding (int): Frames entre dois embeddings da mesma trilha.
+        iou_reembedding (float): IoU com a caixa do último embedding abaixo da
+                                 qual o embedding é refeito.
+        max_frames_perdida (int): Frames sem detecção antes de a trilha ser apagada.
+    """
+
+    def __init__(self, iou_minimo=0.3, distancia_maxima=0.5, intervalo_embedding=10,
+                 iou_reembedding=0.5, max_frames_perdida=5):
+        self.iou_minimo = iou_minimo
+        self.distancia_maxima = distancia_maxima
+        self.intervalo_embedding = intervalo_embedding
+        self.iou_reembedding = iou_reembedding
+        self.max_frames_perdida = max_frames_perdida
+
+        self.trilhas = {}
+        self._ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.ultimo_uso = time.monotonic()
+
+    def _associar_caixas(self, boxes):
+        """Pareamento guloso detecção -> trilha (maior IoU primeiro, depois centro)"""
+        trilhas = list(self.trilhas.values())
+        pares = {}
+        livres_det = set(range(len(boxes)))
+        livres_tr = set(range(len(trilhas)))
+
+        ious = [(calcular_iou(box, trilha.box), d, t)
+                for d, box in enumerate(boxes) for t, trilha in enumerate(trilhas)]
+        for iou, d, t in sorted(ious, reverse=True):
+            if iou < self.iou_minimo:
+                break
+            if d in livres_det and t in livres_tr:
+                pares[d] = trilhas[t]
+                livres_det.discard(d)
+                livres_tr.discard(t)
+
+        # Movimentos rápidos: caixa deslocada mas com o centro próximo
+        distancias = [(distancia_centros(boxes[d], trilhas[t].box), d, t)
+                      for d in livres_det for t in livres_tr]
+        for distancia, d, t in sorted(distancias):
+            if distancia > self.distancia_maxima:
+                break
+            if d in livres_det and t in livres_tr:
+                pares[d] = trilhas[t]
+                livres_det.discard(d)
+                livres_tr.discard(t)
+
+        return pares, [trilhas[t] for t in livres_tr]
+
+    def associar(self, boxes):
+        """Associa as caixas de um frame às trilhas
+
+        Returns:
+            list: Para cada caixa, (trilha_id, identidade) — identidade é None
+                  quando a face precisa de um novo embedding.
+        """
+        with self.lock:
+            self.ultimo_uso = time.monotonic()
+            pares, perdidas = self._associar_caixas(boxes)
+
+            for trilha in perdidas:
+                trilha.frames_perdida += 1
+                if trilha.frames_perdida > self.max_frames_perdida:
+                    del self.trilhas[trilha.id]
+
+            saida = []
+            for d, box in enumerate(boxes):
+                trilha = pares.get(d)
+                if trilha is None:
+                    trilha = Trilha(next(self._ids), box)
+                    self.trilhas[trilha.id] = trilha
+
+                trilha.box = box
+                trilha.frames_perdida = 0
+                trilha.frames_desde_embedding += 1
+
+                precisa_embedding = (
+                    trilha.identidade is None
+                    or trilha.frames_desde_embedding >= self.intervalo_embedding
+                    or calcular_iou(box, trilha.box_embedding) < self.iou_reembedding
+                )
+                saida.append((trilha.id, None if precisa_embedding else trilha.identidade))
+
+            return saida
+
+    def atualizar_identidade(self, trilha_id, box, identidade):
+        """Guarda a identidade recém-calculada de uma trilha"""
+        with self.lock:
+            trilha = self.trilhas.get(trilha_id)
+            if trilha is not None:
+                trilha.identidade = dict(identidade)
+                trilha.box_embedding = box
+                trilha.frames_desde_embedding = 0
+
+
+class GerenciadorRastreadores:
+    """Um RastreadorFaces por sessão de cliente, descartado após inatividade"""
+
+    def __init__(self, tempo_inativo=60.0, **opcoes):
+        self.tempo_inativo = tempo_inativo
+        self.opcoes = opcoes
+        self._rastreadores = {}
+        self._lock = threading.Lock()
+
+    def obter(self, sessao_id):
+        """Retorna o rastreador da sessão (None se não houver id de sessão)"""
+        if not sessao_id:
+            return None
+
+        agora = time.monotonic()
+        with self._lock:
+            # Limpar sessões abandonadas
+            for chave in [c for c, r in self._rastreadores.items() if agora - r.ultimo_uso > self.tempo_inativo]:
+                del self._rastreadores[chave]
+
+            rastreador = self._rastreadores.get(sessao_id)
+            if rastreador is None:
+                rastreador = RastreadorFaces(**self.opcoes)
+                self._rastreadores[sessao_id] = rastreador
+            return rastreador
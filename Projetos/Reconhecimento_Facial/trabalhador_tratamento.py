@@ -0,0 +1,132 @@
+"""Etapas do tratamento executadas nos processos trabalhadores
+
+O app distribui blocos de imagens para os pools de processos do
+tratamento; cada processo carrega o detector ou o FaceNet (conforme as
+etapas que recebe) uma única vez e abre a sua própria conexão com o cache
+SQLite. Este módulo não importa o app, mas com o método spawn o script
+principal (app.py) é reexecutado como __mp_main__ em cada processo: por
+isso o app só cria câmera, banco, fila e caches quando não é __mp_main__.
+"""
+import os
+
+import cv2
+import numpy as np
+
+from backends_facenet import CAMINHO_FACENET_ONNX, carregar_facenet
+from cache_tratamento import CacheTratamento, hash_conteudo
+from detector_faces import carregar_rede_detector, detectar_em_lote, melhor_deteccao, salvar_recorte
+from extrator_embeddings import gerar_embeddings_arquivos
+from qualidade_faces import ler_e_avaliar
+
+# Estado de cada processo trabalhador
+_cache = None
+_detector = None
+_modelo_facenet = None
+_threads = 1
+_backend_facenet = ('deepface', CAMINHO_FACENET_ONNX)
+
+
+def inicializar_trabalhador(caminho_cache, threads_por_processo=1, backend_facenet='deepface',
+                            caminho_onnx=CAMINHO_FACENET_ONNX):
+    """Initializer do pool: limita as threads internas e abre o cache"""
+    global _cache, _threads, _backend_facenet
+    _threads = threads_por_processo
+    _backend_facenet = (backend_facenet, caminho_onnx)
+
+    # Os núcleos já são divididos entre os processos
+    cv2.setNumThreads(threads_por_processo)
+    _cache = CacheTratamento(caminho_cache)
+
+
+def _carregar_detector():
+    global _detector
+    if _detector is None:
+        _detector = carregar_rede_detector()
+    return _detector
+
+
+def _carregar_facenet():
+    global _modelo_facenet
+    if _modelo_facenet is None:
+        # Mesmo backend do reconhecimento, para que galeria e consultas batam
+        backend, caminho_onnx = _backend_facenet
+        _modelo_facenet = carregar_facenet(backend, caminho_onnx, threads=_threads)
+    return _modelo_facenet
+
+
+def detectar_e_recortar(itens, versao_detector, confianca_minima=0.8):
+    """Detecta a face de cada imagem e salva o recorte
+
+    Imagens inalteradas (mesmo hash) reaproveitam a detecção do cache; as
+    demais passam pelo detector em um único forward.
+
+    Args:
+        itens (list): Pares (caminho_imagem, caminho_saida).
+        versao_detector (str): Versão que entra na chave do cache.
+        confianca_minima (float): Confiança mínima da detecção.
+
+    Returns:
+        tuple: (imagens processadas, recortes salvos)
+    """
+    total_salvas = 0
+    pendentes = []  # (imagem, hash, caminho_saida) que precisam do detector
+
+    for caminho_imagem, caminho_saida in itens:
+        # Carregar a imagem e consultar o cache pelo conteúdo
+        dados_imagem = np.fromfile(caminho_imagem, dtype=np.uint8)
+        hash_imagem = hash_conteudo(dados_imagem)
+        encontrado, box_cache = _cache.buscar_deteccao(hash_imagem, versao_detector)
+
+        if encontrado and (box_cache is None or os.path.exists(caminho_saida)):
+            # Imagem inalterada: recorte já salvo (ou sem face) em uma execução anterior
+            if box_cache is not None:
+                total_salvas += 1
+            continue
+
+        imagem = cv2.imdecode(dados_imagem, cv2.IMREAD_COLOR) if dados_imagem.size else None
+        if imagem is None:
+            print(f"Erro ao ler: {caminho_imagem}")
+            continue
+
+        if encontrado:
+            # Detecção em cache, só falta refazer o recorte apagado
+            if salvar_recorte(imagem, box_cache, caminho_saida):
+                total_salvas += 1
+            continue
+
+        pendentes.append((imagem, hash_imagem, caminho_saida))
+
+    if pendentes:
+        deteccoes_lote = detectar_em_lote(_carregar_detector(), [imagem for imagem, _, _ in pendentes])
+
+        for (imagem, hash_imagem, caminho_saida), deteccoes in zip(pendentes, deteccoes_lote):
+            box = melhor_deteccao(deteccoes, imagem.shape[1], imagem.shape[0], confianca_minima)
+            _cache.salvar_deteccao(hash_imagem, versao_detector, box)
+
+            if box is not None and salvar_recorte(imagem, box, caminho_saida):
+                total_salvas += 1
+
+    return len(itens), total_salvas
+
+
+def avaliar_recortes(caminhos):
+    """Pontuação de qualidade de um bloco de recortes
+
+    Returns:
+        list: Pares (caminho, pontuacao) — pontuacao None se o arquivo não pôde ser lido.
+    """
+    return [(caminho, ler_e_avaliar(caminho)) for caminho in caminhos]
+
+
+def gerar_embeddings_caminhos(caminhos, tamanho_lote=32):
+    """Embeddings FaceNet de um bloco de recortes
+
+    Returns:
+        list: Pares (caminho, embedding) — embedding None se o arquivo não pôde ser lido.
+    """
+    modelo = _carregar_facenet()
+    resultados = []
+    for lote in gerar_embeddings_arquivos(modelo, caminhos, tamanho_lote, num_threads=2):
+        resultados.extend(lote)
+    return resultados
+
@@ -0,0 +1,220 @@
+import threading
+import time
+
+import cv2
+
+
+def montar_parte_mjpeg(jpeg):
+    """Parte do multipart/x-mixed-replace com um frame JPEG"""
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+
+
+class AjusteQualidade:
+    """Escolhe qualidade JPEG e fator de redução pelo tempo de envio medido
+
+    Se enviar um frame demora mais que tempo_alvo, a qualidade cai um passo
+    e, quando já está no mínimo, a imagem é reduzida. Com folga (menos da
+    metade do alvo) o caminho inverso é feito: primeiro volta a resolução,
+    depois a qualidade. Cada mudança espera intervalo_ajuste segundos para
+    que o efeito apareça na medição antes da próxima.
+
+    Args:
+        tempo_alvo (float): Tempo de envio por frame desejado, em segundos.
+        qualidade (int): Qualidade JPEG inicial.
+        qualidade_min (int): Menor qualidade usada antes de reduzir a imagem.
+        qualidade_max (int): Maior qualidade usada.
+        passo_qualidade (int): Variação da qualidade a cada ajuste.
+        escala_min (float): Menor fator de redução da imagem.
+        passo_escala (float): Variação do fator a cada ajuste.
+        intervalo_ajuste (float): Segundos mínimos entre dois ajustes.
+    """
+
+    def __init__(self, tempo_alvo=1 / 30, qualidade=80, qualidade_min=40, qualidade_max=90,
+                 passo_qualidade=10, escala_min=0.5, passo_escala=0.25, intervalo_ajuste=0.5):
+        self.tempo_alvo = tempo_alvo
+        self.qualidade = qualidade
+        self.qualidade_min = qualidade_min
+        self.qualidade_max = qualidade_max
+        self.passo_qualidade = passo_qualidade
+        self.escala = 1.0
+        self.escala_min = escala_min
+        self.passo_escala = passo_escala
+        self.intervalo_ajuste = intervalo_ajuste
+        self._ultimo_ajuste = 0.0
+
+    def ajustar(self, tempo_envio):
+        """Atualiza qualidade e escala a partir do tempo de envio atual"""
+        agora = time.monotonic()
+        if tempo_envio is None or agora - self._ultimo_ajuste < self.intervalo_ajuste:
+            return
+
+        if tempo_envio > self.tempo_alvo:
+            if self.qualidade > self.qualidade_min:
+                self.qualidade = max(self.qualidade_min, self.qualidade - self.passo_qualidade)
+            elif self.escala > self.escala_min:
+                self.escala = max(self.escala_min, self.escala - self.passo_escala)
+            else:
+                return
+        elif tempo_envio < self.tempo_alvo / 2:
+            if self.escala < 1.0:
+                self.escala = min(1.0, self.escala + self.passo_escala)
+            elif self.qualidade < self.qualidade_max:
+                self.qualidade = min(self.qualidade_max, self.qualidade + self.passo_qualidade)
+            else:
+                return
+        else:
+            return
+
+        self._ultimo_ajuste = agora
+
+
+class TransmissorMJPEG:
+    """Codifica cada frame da câmera uma única vez para todos os espectadores
+
+    Enquanto houver inscritos, uma thread lê os frames da CapturaCamera,
+    reduz a imagem se preciso, aplica preparar_frame (texto informativo
+    etc.), codifica em JPEG e publica a parte MJPEG pronta. Cada inscrito
+    envia sempre a parte mais recente: um espectador lento pula frames em
+    vez de acumular fila ou atrasar os outros.
+
+    Só se codifica um frame novo quando algum inscrito terminou de enviar o
+    anterior, e qualidade/resolução seguem o tempo de envio do espectador
+    mais lento (AjusteQualidade).
+
+    Args:
+        camera (CapturaCamera): Fonte dos frames.
+        preparar_frame (callable): Recebe o frame (já uma cópia) e pode desenhar nele.
+        ajuste (AjusteQualidade): Controle de qualidade/resolução (padrão: alvo de 30 FPS).
+    """
+
+    def __init__(self, camera, preparar_frame=None, ajuste=None):
+        self.camera = camera
+        self.preparar_frame = preparar_frame
+        self.ajuste = ajuste or AjusteQualidade()
+
+        self._condicao = threading.Condition()
+        self._ultimo = (0, None)  # (número do frame, parte MJPEG)
+        self._inscritos = 0
+        self._aguardando = 0  # Inscritos que já enviaram o último frame
+        self._tempos_envio = {}  # Média móvel do tempo de envio de cada inscrito
+        self._proximo_inscrito = 0
+        self._thread = None
+        self.frames_codificados = 0
+
+        self._fps = 0.0
+        self._janela_fps = (time.monotonic(), 0)  # (início da janela, frames na janela)
+
+    @property
+    def inscritos(self):
+        return self._inscritos
+
+    def estado(self):
+        """Configuração atual do encode e taxas medidas"""
+        with self._condicao:
+            tempo_envio = max(self._tempos_envio.values(), default=None)
+        return {
+            'qualidade_jpeg': self.ajuste.qualidade,
+            'escala': self.ajuste.escala,
+            'fps': round(self._fps, 1) if self._inscritos else 0.0,
+            'tempo_envio_ms': round(tempo_envio * 1000, 1) if tempo_envio is not None else None,
+            'espectadores': self._inscritos
+        }
+
+    def _contar_fps(self):
+        inicio, frames = self._janela_fps
+        agora = time.monotonic()
+        frames += 1
+        if agora - inicio >= 1.0:
+            self._fps = frames / (agora - inicio)
+            self._janela_fps = (agora, 0)
+        else:
+            self._janela_fps = (inicio, frames)
+
+    def _codificar(self):
+        numero = 0
+        while True:
+            with self._condicao:
+                # Não codifica frames que ninguém está pronto para receber
+                self._condicao.wait_for(lambda: self._aguardando > 0 or self._inscritos == 0, timeout=1.0)
+                if self._inscritos == 0:
+                    self._thread = None
+                    return
+                if self._aguardando == 0:
+                    continue
+                tempo_envio = max(self._tempos_envio.values(), default=None)
+
+            numero, frame = self.camera.esperar_frame(numero)
+            if frame is None:
+                if not self.camera.ativa:
+                    break
+                continue
+
+            self.ajuste.ajustar(tempo_envio)
+            escala = self.ajuste.escala
+            if escala < 1.0:
+                frame = cv2.resize(frame, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+            else:
+                # O frame é compartilhado com a captura de fotos: desenhar em uma cópia
+                frame = frame.copy()
+            if self.preparar_frame is not None:
+                self.preparar_frame(frame)
+
+            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.ajuste.qualidade])
+            if not ret:
+                continue
+
+            with self._condicao:
+                self._ultimo = (self._ultimo[0] + 1, montar_parte_mjpeg(buffer.tobytes()))
+                self.frames_codificados += 1
+                self._contar_fps()
+                self._condicao.notify_all()
+
+        # Câmera parada: acorda os inscritos para que encerrem
+        with self._condicao:
+            self._ultimo = (self._ultimo[0] + 1, None)
+            self._thread = None
+            self._condicao.notify_all()
+
+    def inscrever(self, continuar=lambda: True):
+        """Gerador das partes MJPEG para um espectador
+
+        Termina quando continuar() retorna False ou a câmera é parada.
+        """
+        with self._condicao:
+            self._inscritos += 1
+            inscrito = self._proximo_inscrito
+            self._proximo_inscrito += 1
+            if self._thread is None:
+                self._ultimo = (self._ultimo[0], None)
+                self._thread = threading.Thread(target=self._codificar, daemon=True)
+                self._thread.start()
+            enviado = self._ultimo[0]
+
+        try:
+            while continuar():
+                with self._condicao:
+                    self._aguardando += 1
+                    self._condicao.notify_all()
+                    self._condicao.wait_for(lambda: self._ultimo[0] > enviado, timeout=1.0)
+                    self._aguardando -= 1
+                    numero, parte = self._ultimo
+
+                if numero == enviado:
+                    continue  # Sem frame novo no último segundo
+                if parte is None:
+                    break
+                enviado = numero
+
+                # O servidor só pede a próxima parte depois de escrever esta no socket
+                inicio = time.perf_counter()
+                yield parte
+                duracao = time.perf_counter() - inicio
+
+                with self._condicao:
+                    anterior = self._tempos_envio.get(inscrito, duracao)
+                    self._tempos_envio[inscrito] = 0.8 * anterior + 0.2 * duracao
+        finally:
+            with self._condicao:
+                self._inscritos -= 1
+                self._tempos_envio.pop(inscrito, None)
@@ -0,0 +1,71 @@
+import os
+import time
+
+# Trava de arquivo entre processos: fcntl no Linux/macOS, msvcrt no Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class TravaArquivo:
+    """Trava exclusiva entre processos sobre um arquivo
+
+    O arquivo é criado se não existir e nunca é apagado: serve só de ponto
+    de encontro. A trava não é reentrante nem protege threads do mesmo
+    processo entre si; quem a usa combina com um lock de thread.
+
+    Uso:
+        with TravaArquivo('data/banco/escrita.lock'):
+            ...
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._arquivo = None
+
+    def adquirir(self, bloquear=True):
+        """Obtém a trava; com bloquear=False retorna False se outro processo a tem"""
+        diretorio = os.path.dirname(self.caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        arquivo = open(self.caminho, 'a+b')
+
+        try:
+            if fcntl is not None:
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | (0 if bloquear else fcntl.LOCK_NB))
+            else:
+                arquivo.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not bloquear:
+                            raise
+                        time.sleep(0.05)
+        except OSError:
+            arquivo.close()
+            if bloquear:
+                raise
+            return False
+
+        self._arquivo = arquivo
+        return True
+
+    def liberar(self):
+        arquivo, self._arquivo = self._arquivo, None
+        if fcntl is not None:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+        else:
+            arquivo.seek(0)
+            msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+        arquivo.close()
+
+    def __enter__(self):
+        self.adquirir()
+        return self
+
+    def __exit__(self, *_):
+        self.liberar()
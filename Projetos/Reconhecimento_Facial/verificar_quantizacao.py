@@ -0,0 +1,103 @@
+"""Verifica o efeito da galeria compactada (float16 / int8) nas decisões
+
+Cada embedding da galeria é usado como consulta contra os demais
+(leave-one-out) com a precisão float32 e com as compactadas. O relatório
+mostra a memória da matriz, a latência da busca e quantas decisões mudam
+nos limiares do reconhecimento: 0.4 (confiança "Alta") e 0.6 (nome ou
+"Desconhecido").
+
+Uso:
+    python verificar_quantizacao.py                      # banco em data/embeddings_db
+    python verificar_quantizacao.py --tipo prototipos
+    python verificar_quantizacao.py --sintetico --tamanho 100000 --ruido 0.6
+"""
+import argparse
+import os
+
+import numpy as np
+
+from armazenamento_embeddings import ArmazenamentoEmbeddings
+from benchmark_galeria import gerar_galeria_sintetica, medir
+from galeria import PRECISOES, criar_galeria
+
+# Mesmos limiares de identificar_face no app
+LIMIAR_ALTA = 0.4
+LIMIAR_MEDIA = 0.6
+
+
+def carregar_embeddings(args, rng):
+    """Embeddings e nomes do banco, ou de uma galeria sintética"""
+    if not args.sintetico:
+        armazenamento = ArmazenamentoEmbeddings(args.banco)
+        if armazenamento.existe():
+            matriz, nomes, ativos = armazenamento.carregar()
+            return np.asarray(matriz[ativos]), [n for n, ativo in zip(nomes, ativos) if ativo]
+        print(f"Banco não encontrado em {args.banco}: usando galeria sintética")
+
+    embeddings, _, pessoas = gerar_galeria_sintetica(rng, args.tamanho, args.fotos_por_pessoa, args.ruido)
+    return embeddings, [f'pessoa{p}' for p in pessoas]
+
+
+def vizinho_sem_a_propria(galeria, consultas, linhas):
+    """Vizinho mais próximo de cada consulta ignorando a própria linha (leave-one-out)"""
+    indices, distancias = galeria.buscar(consultas, k=2)
+    propria = indices[:, 0] == linhas
+    return (np.where(propria, indices[:, 1], indices[:, 0]),
+            np.where(propria, distancias[:, 1], distancias[:, 0]))
+
+
+def decisoes(galeria, indices, distancias, limiar):
+    """Nome decidido por consulta no limiar ('Desconhecido' acima dele)"""
+    return np.array([galeria.nome(i) if d < limiar else 'Desconhecido' for i, d in zip(indices, distancias)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verificação da galeria float16/int8 contra float32')
+    parser.add_argument('--banco', default=os.path.join('data', 'embeddings_db'))
+    parser.add_argument('--tipo', default='exato', choices=['exato', 'ivf', 'prototipos'])
+    parser.add_argument('--consultas', type=int, default=2000, help='Embeddings usados como consulta')
+    parser.add_argument('--faces', type=int, default=4, help='Faces por busca na medida de latência')
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--sintetico', action='store_true', help='Ignorar o banco e usar embeddings sintéticos')
+    parser.add_argument('--tamanho', type=int, default=10000)
+    parser.add_argument('--fotos-por-pessoa', type=int, default=10)
+    parser.add_argument('--ruido', type=float, default=0.5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    embeddings, nomes = carregar_embeddings(args, rng)
+    if len(nomes) < 2:
+        print("São necessários pelo menos 2 embeddings")
+        return
+
+    linhas = rng.choice(len(nomes), min(args.consultas, len(nomes)), replace=False)
+    consultas = np.asarray(embeddings[linhas], dtype=np.float32)
+    print(f"Galeria {args.tipo} com {len(nomes)} embeddings de {len(set(nomes))} pessoas, "
+          f"{len(linhas)} consultas leave-one-out\n")
+
+    print(f"{'precisão':>9} {'memória (MB)':>13} {'bytes/emb':>10} {'busca (ms)':>11} {'Δ dist máx':>11} "
+          f"{'muda @0.4':>10} {'muda @0.6':>10}")
+
+    referencia = None
+    for precisao in PRECISOES:
+        galeria = criar_galeria(embeddings, nomes, args.tipo, precisao=precisao)
+        indices, distancias = vizinho_sem_a_propria(galeria, consultas, linhas)
+        decisao_alta = decisoes(galeria, indices, distancias, LIMIAR_ALTA)
+        decisao_media = decisoes(galeria, indices, distancias, LIMIAR_MEDIA)
+        tempo = medir(lambda: galeria.buscar(consultas[:args.faces]), args.repeticoes)
+
+        if referencia is None:
+            referencia = (distancias, decisao_alta, decisao_media)
+        erro = np.abs(distancias - referencia[0]).max()
+        mudancas_alta = int((decisao_alta != referencia[1]).sum())
+        mudancas_media = int((decisao_media != referencia[2]).sum())
+
+        print(f"{precisao:>9} {galeria.memoria() / 2**20:>13.2f} {galeria.memoria() / len(galeria):>10.0f} "
+              f"{tempo:>11.3f} {erro:>11.5f} {mudancas_alta:>10} {mudancas_media:>10}")
+
+    print(f"\n'muda': decisões (nome ou Desconhecido) diferentes das da galeria float32, "
+          f"em {len(linhas)} consultas")
+
+
+if __name__ == '__main__':
+    main()